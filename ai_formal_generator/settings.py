@@ -74,6 +74,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'generator.context_processors.render_jobs',
             ],
         },
     },
@@ -84,6 +85,10 @@ TEMPLATES = [
 # --------------------------------------------------
 WSGI_APPLICATION = 'ai_formal_generator.wsgi.application'
 
+# AI body generation views are async; serve them through ASGI, e.g.
+#   uvicorn ai_formal_generator.asgi:application
+ASGI_APPLICATION = 'ai_formal_generator.asgi.application'
+
 # --------------------------------------------------
 # DATABASE
 # --------------------------------------------------
@@ -134,6 +139,74 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# --------------------------------------------------
+# RENDER CACHE (rendered PDFs, shared by all workers on this host)
+# --------------------------------------------------
+RENDER_CACHE_DIR = os.getenv('RENDER_CACHE_DIR', str(BASE_DIR / 'cache' / 'renders'))
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# --------------------------------------------------
+# PDF RENDERER POOL (0 workers = render inline in the request process)
+# --------------------------------------------------
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', str(os.cpu_count() or 1)))
+PDF_RENDER_QUEUE_SIZE = int(os.getenv('PDF_RENDER_QUEUE_SIZE', str(2 * PDF_RENDER_WORKERS)))
+PDF_RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT', '30'))
+
+# Hindi PDFs use the fonts in generator/fonts, subset per glyph set and cached
+# (in memory per worker, and on disk apart from the render cache)
+PDF_EMBED_FONTS = os.getenv('PDF_EMBED_FONTS', 'True').lower() in ('true', '1', 'yes')
+FONT_SUBSET_CACHE_SIZE = int(os.getenv('FONT_SUBSET_CACHE_SIZE', '64'))
+FONT_SUBSET_CACHE_DIR = os.getenv('FONT_SUBSET_CACHE_DIR', str(BASE_DIR / 'cache' / 'fonts'))
+FONT_SUBSET_CACHE_MAX_BYTES = int(os.getenv('FONT_SUBSET_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Policy attachment limits (which also bound merge memory) and opt-in merge
+# memory diagnostics
+POLICY_ATTACHMENT_MAX_BYTES = int(os.getenv('POLICY_ATTACHMENT_MAX_BYTES', str(50 * 1024 * 1024)))
+POLICY_ATTACHMENT_MAX_PAGES = int(os.getenv('POLICY_ATTACHMENT_MAX_PAGES', '500'))
+POLICY_UPLOAD_TTL_HOURS = float(os.getenv('POLICY_UPLOAD_TTL_HOURS', '24'))
+PDF_MERGE_TRACE_MEMORY = os.getenv('PDF_MERGE_TRACE_MEMORY', 'False').lower() in ('true', '1', 'yes')
+PDF_MERGE_MEMORY_BUDGET = int(os.getenv('PDF_MERGE_MEMORY_BUDGET', str(64 * 1024 * 1024)))
+
+# Rasterized attachment pages for policy DOCX export
+POLICY_DOCX_DPI = int(os.getenv('POLICY_DOCX_DPI', '200'))
+POLICY_DOCX_IMAGE_FORMAT = os.getenv('POLICY_DOCX_IMAGE_FORMAT', 'png')  # png or jpeg (scans)
+POLICY_DOCX_JPEG_QUALITY = int(os.getenv('POLICY_DOCX_JPEG_QUALITY', '85'))
+RASTER_WORKERS = int(os.getenv('RASTER_WORKERS', '2'))
+RASTER_CACHE_DIR = os.getenv('RASTER_CACHE_DIR', str(BASE_DIR / 'cache' / 'rasters'))
+RASTER_CACHE_MAX_BYTES = int(os.getenv('RASTER_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# DocumentLog rows are buffered in-process and written in batches; records
+# that cannot be written are spilled to DOCUMENT_LOG_SPILL_DIR and replayed.
+DOCUMENT_LOG_BATCH_SIZE = int(os.getenv('DOCUMENT_LOG_BATCH_SIZE', '50'))
+DOCUMENT_LOG_FLUSH_INTERVAL = float(os.getenv('DOCUMENT_LOG_FLUSH_INTERVAL', '2'))
+DOCUMENT_LOG_MAX_BUFFER = int(os.getenv('DOCUMENT_LOG_MAX_BUFFER', '10000'))
+DOCUMENT_LOG_SPILL_DIR = os.getenv('DOCUMENT_LOG_SPILL_DIR', str(BASE_DIR / 'cache' / 'document_log'))
+
+# Previewed payloads are kept server-side as drafts (the session holds only
+# their id); `manage.py purge_drafts` deletes them after this many hours.
+DOCUMENT_DRAFT_TTL_HOURS = float(os.getenv('DOCUMENT_DRAFT_TTL_HOURS', '24'))
+
+# Queued downloads: with RENDER_JOBS_ENABLED the result pages enqueue renders
+# for `manage.py render_worker` and poll for the file instead of rendering
+# inside the request.
+RENDER_JOBS_ENABLED = os.getenv('RENDER_JOBS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+RENDER_JOB_WORKERS = int(os.getenv('RENDER_JOB_WORKERS', '2'))
+RENDER_JOB_LEASE = float(os.getenv('RENDER_JOB_LEASE', '120'))
+RENDER_JOB_MAX_ATTEMPTS = int(os.getenv('RENDER_JOB_MAX_ATTEMPTS', '3'))
+RENDER_JOB_POLL_INTERVAL = float(os.getenv('RENDER_JOB_POLL_INTERVAL', '1'))
+RENDER_JOB_TTL_HOURS = float(os.getenv('RENDER_JOB_TTL_HOURS', '24'))
+
+# Bulk generation (ZIP endpoint): documents in progress at once, the most per
+# request, and how long a prompt-only entry may wait for AI quota.
+BULK_CONCURRENCY = int(os.getenv('BULK_CONCURRENCY', str(PDF_RENDER_WORKERS or 1)))
+BULK_MAX_DOCUMENTS = int(os.getenv('BULK_MAX_DOCUMENTS', '1000'))
+BULK_AI_WAIT = float(os.getenv('BULK_AI_WAIT', '600'))
+
+# Seconds between mtime checks of the logo, PDF stylesheets and templates.
+ASSET_CHECK_INTERVAL = float(os.getenv('ASSET_CHECK_INTERVAL', '2'))
+# Seconds between inode/mtime checks of config/*.json (edits apply without a restart).
+CONFIG_CHECK_INTERVAL = float(os.getenv('CONFIG_CHECK_INTERVAL', '2'))
+
 # --------------------------------------------------
 # DEFAULT PRIMARY KEY
 # --------------------------------------------------
@@ -144,6 +217,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # --------------------------------------------------
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 
+# AI backend: "gemini", "local" (offline deterministic stand-in for load
+# tests and CI) or a dotted path to an AIBackend subclass.
+AI_BACKEND = os.getenv('AI_BACKEND', 'gemini')
+AI_GEMINI_MODEL = os.getenv('AI_GEMINI_MODEL', 'gemini-2.5-flash-lite')
+AI_LOCAL_BACKEND = {
+    'latency': {
+        'distribution': os.getenv('AI_LOCAL_LATENCY', 'lognormal'),
+        'median': float(os.getenv('AI_LOCAL_LATENCY_MEDIAN', '0.8')),
+        'sigma': float(os.getenv('AI_LOCAL_LATENCY_SIGMA', '0.4')),
+        'seconds': float(os.getenv('AI_LOCAL_LATENCY_MEDIAN', '0.8')),
+        'low': float(os.getenv('AI_LOCAL_LATENCY_LOW', '0.2')),
+        'high': float(os.getenv('AI_LOCAL_LATENCY_HIGH', '2.0')),
+    },
+    'error_rate': float(os.getenv('AI_LOCAL_ERROR_RATE', '0')),
+    'error_statuses': [429, 503],
+    'chunk_words': int(os.getenv('AI_LOCAL_CHUNK_WORDS', '4')),
+    'chunk_delay': float(os.getenv('AI_LOCAL_CHUNK_DELAY', '0.05')),
+    'seed': os.getenv('AI_LOCAL_SEED') or None,
+}
+
+# Concurrent Gemini calls per process and the per-call timeout in seconds.
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', '200'))
+AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', '30'))
+
+# Gemini quota per worker process (divide the project quota by the number of
+# workers), how long a call may queue for quota before a 503 "busy", and the
+# retry policy for 429/5xx answers.
+AI_REQUESTS_PER_MINUTE = int(os.getenv('AI_REQUESTS_PER_MINUTE', '60'))
+AI_TOKENS_PER_MINUTE = int(os.getenv('AI_TOKENS_PER_MINUTE', '250000'))
+AI_OUTPUT_TOKENS_ESTIMATE = int(os.getenv('AI_OUTPUT_TOKENS_ESTIMATE', '400'))
+AI_QUEUE_DEADLINE = float(os.getenv('AI_QUEUE_DEADLINE', '10'))
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '3'))
+AI_BACKOFF_BASE = float(os.getenv('AI_BACKOFF_BASE', '0.5'))
+AI_BACKOFF_MAX = float(os.getenv('AI_BACKOFF_MAX', '8'))
+
+# Cross-worker coalescing: lifetime of the lease the calling worker renews
+# while its call runs, and how long other workers wait on it before a 504.
+AI_LEASE_TTL = float(os.getenv('AI_LEASE_TTL', '10'))
+AI_LEASE_WAIT = float(os.getenv('AI_LEASE_WAIT', str(AI_TIMEOUT)))
+
+# Cache of generated bodies (SQLite file shared by all workers on this host).
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', str(BASE_DIR / 'cache' / 'ai_bodies.sqlite3'))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', str(7 * 24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '10000'))
+# Seconds between writes of the buffered hit/miss counters and access times.
+AI_CACHE_FLUSH_INTERVAL = float(os.getenv('AI_CACHE_FLUSH_INTERVAL', '5'))
+
 # --------------------------------------------------
 # LOGGING
 # --------------------------------------------------
@@ -1,8 +1,17 @@
 from django.contrib import admin
-from .models import DocumentLog
+from .models import DocumentLog, RenderJob
 
 @admin.register(DocumentLog)
 class DocumentLogAdmin(admin.ModelAdmin):
     list_display = ("document_type", "language", "reference_id", "created_at")
-    search_fields = ("reference_id", "content")
+    search_fields = ("reference_id",)
     list_filter = ("document_type", "language", "created_at")
+    raw_id_fields = ("body",)
+    readonly_fields = ("content",)
+
+
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "doc_type", "format", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "doc_type", "format")
+    readonly_fields = ("lease_owner", "lease_expires_at", "result_path")
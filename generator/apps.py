@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class GeneratorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'generator'
+
+    def ready(self):
+        # Load letterhead assets and stylesheets once at start-up.
+        from .services.assets import get_asset_registry
+        get_asset_registry()
@@ -0,0 +1,9 @@
+"""
+Template context shared by every page.
+"""
+from django.conf import settings
+
+
+def render_jobs(request):
+    """Whether download buttons should go through the render job queue."""
+    return {"render_jobs_enabled": getattr(settings, "RENDER_JOBS_ENABLED", False)}
@@ -0,0 +1,38 @@
+"""
+Inspect or clear the AI body cache.
+
+    python manage.py ai_cache            # hit/miss/coalescing counters and size
+    python manage.py ai_cache --evict    # drop expired / over-limit entries
+    python manage.py ai_cache --clear    # empty the cache and reset counters
+"""
+from django.core.management.base import BaseCommand
+
+from generator.services.ai_cache import get_ai_cache
+
+
+class Command(BaseCommand):
+    help = "Show AI body cache statistics, or evict/clear entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--evict", action="store_true", help="Drop expired and over-limit entries.")
+        parser.add_argument("--clear", action="store_true", help="Remove every entry and reset counters.")
+
+    def handle(self, *args, **options):
+        cache = get_ai_cache()
+        if options["clear"]:
+            cache.clear()
+        elif options["evict"]:
+            cache.evict()
+
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups if lookups else 0.0
+        self.stdout.write(
+            f"entries={stats['entries']} hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={ratio:.1%}"
+        )
+        self.stdout.write(
+            f"upstream_calls={stats['upstream_calls']} coalesced_local={stats['coalesced_local']} "
+            f"coalesced_remote={stats['coalesced_remote']} coalescing_ratio={stats['coalescing_ratio']:.1%}"
+        )
+        self.stdout.write(f"retries={stats['retries']} busy={stats['busy']}")
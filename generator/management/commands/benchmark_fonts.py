@@ -0,0 +1,114 @@
+"""
+Benchmark Hindi PDF output with system fonts and with embedded font subsets.
+
+Times the font subset cache (cold, from the disk cache and from memory),
+then renders a Hindi circular inline - no renderer pool, no render cache -
+with and without the embedded fonts of ``generator.services.fonts`` and
+reports the median render time and PDF size of each:
+
+    python manage.py benchmark_fonts [--repeat 10]
+
+Every render uses a different circular number, so the PDFs differ while the
+glyph set stays the same, as for near-identical documents.
+"""
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from generator.services.config_registry import get_config
+from generator.services.document_model import build_model
+from generator.services.fonts import FontRegistry, model_text
+from generator.services.payloads import circular_payload
+from generator.services.render_cache import RenderCache
+from generator.services.rendering import PDF_OPTIONS, PDF_TEMPLATE
+
+SUBJECT = "कार्यालय भवन में अग्नि सुरक्षा अभ्यास"
+BODY = (
+    "सभी संबंधितों को सूचित किया जाता है कि परिपत्र संख्या {number} के अनुसार कार्यालय भवन में "
+    "अग्नि सुरक्षा अभ्यास आयोजित किया जाएगा। सभी प्रभागों से अनुरोध है कि उपरोक्त का संज्ञान लेकर "
+    "अनुपालन सुनिश्चित करें।\n\nअनुभाग प्रमुख इसे अपने अधीन कार्यरत कर्मचारियों के संज्ञान में लाएँ। "
+    "इस संबंध में किसी भी स्पष्टीकरण के लिए प्रशासन अनुभाग से संपर्क करें। यह सक्षम प्राधिकारी के "
+    "अनुमोदन से जारी किया जाता है।"
+)
+
+
+def _model(number):
+    people = [str(person["id"]) for person in get_config("circular").people[:5]]
+    payload = circular_payload(
+        "hi", "2026-02-16", SUBJECT, BODY.format(number=number), "Director General", people
+    )
+    return build_model("circular", payload)
+
+
+def _ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare Hindi PDF render time and size with system fonts and embedded font subsets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10, help="Renders per mode (median reported).")
+
+    def handle(self, *args, **options):
+        self._subsets()
+        try:
+            import weasyprint  # noqa: F401
+        except (ImportError, OSError) as exc:
+            self.stdout.write(self.style.WARNING(f"\nWeasyPrint is not available ({exc}); renders skipped."))
+            return
+        self._renders(max(1, options["repeat"]))
+
+    def _subsets(self):
+        text = model_text(_model(1))
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = RenderCache(tmp, 64 * 1024 * 1024)
+            registry = FontRegistry(disk_cache=disk)
+            registry.preload()
+
+            started = time.perf_counter()
+            registry.embed(text)
+            cold = _ms(started)
+            started = time.perf_counter()
+            FontRegistry(disk_cache=disk).embed(text)
+            from_disk = _ms(started)
+            started = time.perf_counter()
+            registry.embed(model_text(_model(2)))
+            from_memory = _ms(started)
+
+            full_bytes = sum(len(font.data) for font in registry.fonts().values())
+            subset_bytes = disk.size()
+
+        self.stdout.write("Font subsets for one Hindi circular:")
+        self.stdout.write(f"  {'cold (fontTools)':<24} {cold:10.2f} ms")
+        self.stdout.write(f"  {'disk cache':<24} {from_disk:10.2f} ms")
+        self.stdout.write(f"  {'memory cache':<24} {from_memory:10.2f} ms")
+        self.stdout.write(f"  {'full fonts':<24} {full_bytes / 1024:10.1f} KB")
+        self.stdout.write(f"  {'subsets':<24} {subset_bytes / 1024:10.1f} KB")
+
+    def _renders(self, repeat):
+        from generator.services.pdf_renderer import render_pdf
+
+        results = {}
+        with override_settings(PDF_RENDER_WORKERS=0):
+            for label, embed in (("system fonts", False), ("embedded subsets", True)):
+                timings, sizes = [], []
+                for number in range(repeat + 1):
+                    model = _model(1000 + number)
+                    started = time.perf_counter()
+                    pdf = render_pdf(
+                        PDF_TEMPLATE, {"doc": model}, stylesheets=model["stylesheets"],
+                        fonts_text=model_text(model) if embed else None, **PDF_OPTIONS,
+                    )
+                    timings.append(_ms(started))
+                    sizes.append(len(pdf))
+                # The first render pays one-off costs (worker start-up, cold subsets).
+                results[label] = (timings[0], statistics.median(timings[1:]), statistics.mean(sizes[1:]))
+
+        self.stdout.write(f"\nHindi circular, {repeat} renders per mode:")
+        self.stdout.write(f"  {'mode':<24}{'first ms':>12}{'median ms':>12}{'PDF KB':>12}")
+        for label, (first, median, size) in results.items():
+            self.stdout.write(f"  {label:<24}{first:12.1f}{median:12.1f}{size / 1024:12.1f}")
@@ -0,0 +1,141 @@
+"""
+Benchmark the DocumentLog listing and search queries as the table grows.
+
+Builds a throwaway SQLite database, fills it with synthetic log rows in
+steps and times the listing API's and full-text search's queries at each
+size:
+
+    python manage.py benchmark_logs --sizes 10000,100000,1000000 [--explain]
+
+With the indexes in place the timings should stay flat across sizes.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from generator.models import DocumentLog
+from generator.services.log_query import encode_cursor, page_logs, page_queryset
+from generator.services.search import search
+
+ALIAS = "log_benchmark"
+TYPES = ("Office Order", "Circular", "Policy")
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+WORDS = (
+    "office order circular policy leave travel allowance fire safety drill training meeting "
+    "holiday attendance staff division section approval authority compliance notice "
+    "कार्यालय आदेश परिपत्र नीति अवकाश यात्रा भत्ता अग्नि सुरक्षा अभ्यास प्रशिक्षण बैठक "
+    "अवकाश उपस्थिति कर्मचारी प्रभाग अनुभाग अनुमोदन प्राधिकारी अनुपालन सूचना"
+).split()
+TOPICS = 50000
+
+
+class Command(BaseCommand):
+    help = "Time DocumentLog list/search queries on a synthetic table of growing size."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated row counts.")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median reported).")
+        parser.add_argument("--explain", action="store_true", help="Print query plans at the largest size.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options["sizes"].split(",")})
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+
+        tmp = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+        tmp.close()
+        connections.settings[ALIAS] = connections.configure_settings({
+            "default": {},
+            ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": tmp.name},
+        })[ALIAS]
+        try:
+            call_command("migrate", "generator", database=ALIAS, verbosity=0)
+            self._run(sizes, options)
+        finally:
+            connections[ALIAS].close()
+            del connections.settings[ALIAS]
+            os.remove(tmp.name)
+
+    def _fill(self, start, stop, rng):
+        rows = DocumentLog.objects.using(ALIAS)
+        with transaction.atomic(using=ALIAS):
+            for offset in range(start, stop, 10000):
+                rows.bulk_create(
+                    [
+                        DocumentLog(
+                            document_type=rng.choice(TYPES),
+                            language=rng.choice(("en", "hi")),
+                            reference_id=f"BISAG-N/Office Order/2026/{i}",
+                            content=" ".join(rng.choices(WORDS, k=24)) + f" topic{rng.randrange(TOPICS)}",
+                            created_at=EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS)),
+                        )
+                        for i in range(offset, min(offset + 10000, stop))
+                    ],
+                    batch_size=10000,
+                )
+
+    def _queries(self, size):
+        middle = (
+            DocumentLog.objects.using(ALIAS)
+            .order_by("-created_at", "-id")
+            .values("created_at", "id")[size // 2]
+        )
+        return {
+            "latest page": {},
+            "hi circulars in March": {
+                "type": "circular", "language": "hi", "since": "2025-03-01", "until": "2025-04-01",
+            },
+            "reference lookup": {"reference": f"BISAG-N/Office Order/2026/{size // 3}"},
+            "deep page (cursor)": {"cursor": encode_cursor(middle["created_at"], middle["id"])},
+        }
+
+    def _searches(self):
+        return {
+            "search rare term": {"q": f"topic{TOPICS // 2}"},
+            "search Hindi phrase": {"q": "प्रशिक्षण अनुपालन", "type": "circular", "language": "hi"},
+        }
+
+    def _run(self, sizes, options):
+        rng = random.Random(options["seed"])
+        queryset = DocumentLog.objects.using(ALIAS)
+        results = {}
+        filled = 0
+        for size in sizes:
+            started = time.perf_counter()
+            self._fill(filled, size, rng)
+            filled = size
+            connections[ALIAS].cursor().execute("ANALYZE")
+            self.stdout.write(f"{size:>10,} rows (filled in {time.perf_counter() - started:.1f}s)")
+
+            queries = self._queries(size)
+            runs = [(name, page_logs, params, queryset) for name, params in queries.items()]
+            runs += [(name, search, params, ALIAS) for name, params in self._searches().items()]
+            for name, query, *args in runs:
+                timings = []
+                for _ in range(options["repeat"]):
+                    t0 = time.perf_counter()
+                    query(*args)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                results.setdefault(name, []).append(statistics.median(timings))
+                self.stdout.write(f"    {name:<24} {results[name][-1]:8.2f} ms")
+
+        self.stdout.write("\nMedian ms per page by table size:")
+        self.stdout.write(f"  {'query':<24}" + "".join(f"{size:>12,}" for size in sizes))
+        for name, timings in results.items():
+            self.stdout.write(f"  {name:<24}" + "".join(f"{t:12.2f}" for t in timings))
+
+        if options["explain"]:
+            self.stdout.write("\nQuery plans:")
+            for name, params in queries.items():
+                page, limit = page_queryset(params, queryset)
+                self.stdout.write(f"  {name}:\n    " + page[:limit].explain().replace("\n", "\n    "))
@@ -0,0 +1,35 @@
+"""
+Inspect or prune the deduplicated document body store.
+
+    python manage.py document_bodies            # logs, distinct bodies and bytes saved
+    python manage.py document_bodies --prune    # delete bodies no log points to
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+
+from generator.models import DocumentBody, DocumentLog
+
+
+class Command(BaseCommand):
+    help = "Show document body storage statistics, or prune unreferenced bodies."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prune", action="store_true", help="Delete bodies no log refers to.")
+
+    def handle(self, *args, **options):
+        if options["prune"]:
+            self.stdout.write(f"pruned={DocumentBody.objects.prune()}")
+
+        logs = DocumentLog.objects.count()
+        bodies = DocumentBody.objects.aggregate(
+            count=Count("id"), text=Sum("size"), stored=Sum(Length("data"))
+        )
+        logged = DocumentLog.objects.aggregate(text=Sum("body__size"))["text"] or 0
+        stored = bodies["stored"] or 0
+        ratio = stored / logged if logged else 0.0
+        self.stdout.write(f"logs={logs} bodies={bodies['count']}")
+        self.stdout.write(
+            f"logged_bytes={logged} distinct_bytes={bodies['text'] or 0} stored_bytes={stored} "
+            f"stored_ratio={ratio:.1%}"
+        )
@@ -0,0 +1,149 @@
+"""
+Load-test the generate → preview → download flow of a running server.
+
+Each virtual user opens a session, asks for an AI body, posts the preview
+form and downloads the document.  Run the server with
+``AI_BACKEND=local`` to benchmark offline without spending Gemini quota:
+
+    AI_BACKEND=local uvicorn ai_formal_generator.asgi:application --workers 2
+    python manage.py loadtest --url http://127.0.0.1:8000 --requests 200 --concurrency 50
+"""
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+# (generate view, stream view, preview view, {format: download view}, preview fields)
+FLOWS = {
+    "office_order": (
+        "generate_body", "generate_body_stream", "result",
+        {"pdf": "download_pdf", "docx": "download_docx"},
+        {"reference": "BISAG-N/Office Order/2026/", "from_position": "Director General",
+         "to_recipients[]": "Senior Manager"},
+    ),
+    "circular": (
+        "generate_circular_body", "generate_circular_body_stream", "result_circular",
+        {"pdf": "download_circular_pdf", "docx": "download_circular_docx"},
+        {"subject": "Load test", "from_position": "Director General", "to[]": "1"},
+    ),
+    "policy": (
+        "generate_policy_body", "generate_policy_body_stream", "result_policy",
+        {"pdf": "download_policy_pdf", "docx": "download_policy_docx"},
+        {"subject": "Load test", "from_position": "Director General",
+         "to_recipients[]": "Senior Manager"},
+    ),
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Drive generate → preview → download against a running server and report latencies."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the server.")
+        parser.add_argument("--requests", type=int, default=100, help="Number of flows to run.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Flows running at once.")
+        parser.add_argument("--doc-type", choices=sorted(FLOWS), default="circular")
+        parser.add_argument("--language", choices=["en", "hi"], default="en")
+        parser.add_argument("--format", choices=["pdf", "docx"], default="docx")
+        parser.add_argument("--stream", action="store_true", help="Use the SSE generation endpoint.")
+        parser.add_argument(
+            "--repeat-topics", type=int, default=0,
+            help="Draw topics from this many distinct ones (0 = unique topic per flow).",
+        )
+
+    def handle(self, *args, **options):
+        base = options["url"].rstrip("/")
+        generate, stream, preview, downloads, fields = FLOWS[options["doc_type"]]
+        paths = {
+            "generate": reverse(stream if options["stream"] else generate),
+            "preview": reverse(preview),
+            "download": reverse(downloads[options["format"]]),
+        }
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def fail(label):
+            with lock:
+                errors[label] += 1
+
+        def flow(index):
+            jar = CookieJar()
+            opener = build_opener(HTTPCookieProcessor(jar))
+            distinct = options["repeat_topics"]
+            topic = f"load test topic {index % distinct if distinct else uuid.uuid4().hex[:8]}"
+            try:
+                opener.open(base + "/", timeout=60).read()
+                token = next(c.value for c in jar if c.name == "csrftoken")
+            except Exception as exc:
+                fail(f"session: {type(exc).__name__}")
+                return
+
+            def post(path, data):
+                request = Request(
+                    base + path,
+                    data=urlencode(data).encode("utf-8"),
+                    headers={"X-CSRFToken": token, "Referer": base + "/"},
+                )
+                return opener.open(request, timeout=120).read()
+
+            steps = (
+                ("generate", lambda: post(paths["generate"], {"body_prompt": topic, "language": options["language"]})),
+                ("preview", lambda: post(paths["preview"], dict(
+                    fields, language=options["language"], date="2026-01-01", body=topic,
+                ))),
+                ("download", lambda: opener.open(base + paths["download"], timeout=120).read()),
+            )
+            started = time.perf_counter()
+            for name, step in steps:
+                t0 = time.perf_counter()
+                try:
+                    step()
+                except HTTPError as exc:
+                    fail(f"{name}: HTTP {exc.code}")
+                    return
+                except Exception as exc:
+                    fail(f"{name}: {type(exc).__name__}")
+                    return
+                with lock:
+                    timings[name].append(time.perf_counter() - t0)
+            with lock:
+                timings["flow"].append(time.perf_counter() - started)
+
+        wall = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(flow, range(options["requests"])))
+        wall = time.perf_counter() - wall
+
+        completed = len(timings["flow"])
+        self.stdout.write(
+            f"{completed}/{options['requests']} flows in {wall:.1f}s "
+            f"({completed / wall:.1f} flows/s, concurrency {options['concurrency']})"
+        )
+        for name in ("generate", "preview", "download", "flow"):
+            values = timings[name]
+            if not values:
+                continue
+            self.stdout.write(
+                f"  {name:<9} mean={statistics.mean(values) * 1000:7.0f}ms "
+                f"p50={_percentile(values, 50) * 1000:7.0f}ms "
+                f"p95={_percentile(values, 95) * 1000:7.0f}ms "
+                f"p99={_percentile(values, 99) * 1000:7.0f}ms"
+            )
+        for error, count in sorted(errors.items()):
+            self.stdout.write(self.style.WARNING(f"  {count} x {error}"))
@@ -0,0 +1,17 @@
+"""
+Delete previewed document drafts older than DOCUMENT_DRAFT_TTL_HOURS.
+
+Run periodically (cron / scheduled task):
+    python manage.py purge_drafts
+"""
+from django.core.management.base import BaseCommand
+
+from generator.services.drafts import purge
+
+
+class Command(BaseCommand):
+    help = "Delete expired document drafts."
+
+    def handle(self, *args, **options):
+        removed = purge()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired draft(s)."))
@@ -0,0 +1,26 @@
+"""
+Delete uploaded policy attachments older than POLICY_UPLOAD_TTL_HOURS.
+
+Run periodically (cron / scheduled task):
+    python manage.py purge_policy_uploads [--hours 24]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from generator.services.attachments import purge_attachments
+
+
+class Command(BaseCommand):
+    help = "Delete uploaded policy attachments older than the configured TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=getattr(settings, "POLICY_UPLOAD_TTL_HOURS", 24),
+            help="Maximum attachment age in hours (default: POLICY_UPLOAD_TTL_HOURS).",
+        )
+
+    def handle(self, *args, **options):
+        removed = purge_attachments(options["hours"] * 3600)
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} policy attachment(s)."))
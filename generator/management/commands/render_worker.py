@@ -0,0 +1,86 @@
+"""
+Run render workers for queued downloads.
+
+    python manage.py render_worker [--workers 2] [--once]
+
+Each worker thread claims jobs from the RenderJob table and renders them
+through the usual engine (PDFs still go through the WeasyPrint pool).
+Start as many of these processes, on as many hosts, as the load needs.
+"""
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from generator.services import render_jobs
+
+
+class Command(BaseCommand):
+    help = "Render queued PDF/DOCX jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=getattr(settings, "RENDER_JOB_WORKERS", 2),
+            help="Worker threads in this process (default: RENDER_JOB_WORKERS).",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=getattr(settings, "RENDER_JOB_POLL_INTERVAL", 1.0),
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        stats = {"done": 0, "failed": 0, "retried": 0}
+        lock = threading.Lock()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_args: stop.set())
+
+        def work(index):
+            owner = f"{prefix}:{index}"
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    job = render_jobs.claim(owner)
+                    if job is None:
+                        if options["once"]:
+                            return
+                        stop.wait(options["poll"])
+                        continue
+                    status = render_jobs.run(job, owner)
+                    with lock:
+                        key = {"done": "done", "failed": "failed", "queued": "retried"}.get(status)
+                        if key:
+                            stats[key] += 1
+            finally:
+                close_old_connections()
+
+        ttl = float(getattr(settings, "RENDER_JOB_TTL_HOURS", 24)) * 3600
+
+        def purge():
+            removed = render_jobs.purge(ttl)
+            close_old_connections()
+            if removed:
+                self.stdout.write(f"Purged {removed} old render job(s).")
+            return time.monotonic()
+
+        purged_at = purge()
+        self.stdout.write(f"Starting {options['workers']} render worker(s) as {prefix}")
+        threads = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(options["workers"])]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.2)
+            if time.monotonic() - purged_at > 3600:
+                purged_at = purge()
+        self.stdout.write(self.style.SUCCESS(
+            f"Render workers stopped: {stats['done']} done, {stats['failed']} failed, {stats['retried']} retried."
+        ))
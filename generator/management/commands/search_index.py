@@ -0,0 +1,36 @@
+"""
+Maintain the full-text index over document bodies (SQLite FTS5).
+
+    python manage.py search_index             # index bodies missing from the index
+    python manage.py search_index --rebuild   # drop the index, reindex everything
+    python manage.py search_index --optimize  # merge index segments
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from generator.services import search
+
+
+class Command(BaseCommand):
+    help = "Incrementally update, rebuild or optimize the document full-text index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Reindex every document.")
+        parser.add_argument("--optimize", action="store_true", help="Merge index segments afterwards.")
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError("Full-text indexing needs the SQLite database backend.")
+
+        started = time.perf_counter()
+        if options["rebuild"]:
+            indexed = search.rebuild()
+            self.stdout.write(f"Rebuilt the full-text index ({indexed} document(s)).")
+        else:
+            added = search.catch_up()
+            self.stdout.write(f"Indexed {added} new document(s).")
+        if options["optimize"]:
+            search.optimize()
+            self.stdout.write("Optimized the full-text index.")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0003_renderjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0004_documentlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['document_type', 'created_at'], name='doclog_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['language', 'created_at'], name='doclog_lang_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['reference_id'], name='doclog_reference_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['created_at'], name='doclog_created_idx'),
+        ),
+    ]
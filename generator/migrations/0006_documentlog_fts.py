@@ -0,0 +1,61 @@
+"""
+FTS5 index over DocumentLog bodies (SQLite only), kept in step by triggers.
+"""
+from django.db import migrations
+
+FTS_TABLE = "generator_documentlog_fts"
+LOG_TABLE = "generator_documentlog"
+
+# unicode61 with the Devanagari combining marks declared as token characters.
+DEVANAGARI_MARKS = "".join(
+    chr(code)
+    for start, end in ((0x0900, 0x0903), (0x093A, 0x094F), (0x0951, 0x0957), (0x0962, 0x0963))
+    for code in range(start, end + 1)
+)
+TOKENIZE = f"unicode61 remove_diacritics 2 tokenchars '{DEVANAGARI_MARKS}'"
+
+FORWARD = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        reference_id, content, content='{LOG_TABLE}', content_rowid='id', tokenize="{TOKENIZE}"
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {LOG_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, reference_id, content) VALUES (new.id, new.reference_id, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {LOG_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, reference_id, content)
+        VALUES ('delete', old.id, old.reference_id, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF reference_id, content ON {LOG_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, reference_id, content)
+        VALUES ('delete', old.id, old.reference_id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, reference_id, content) VALUES (new.id, new.reference_id, new.content);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0005_documentlog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD), _run(BACKWARD)),
+    ]
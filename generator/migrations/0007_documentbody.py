@@ -0,0 +1,119 @@
+"""
+Move DocumentLog bodies into DocumentBody: one zlib-compressed row per
+distinct text, keyed by its SHA-256.  Existing logs are deduplicated and the
+SQLite full-text index moves from the log table to the body table.
+"""
+import hashlib
+import importlib
+import zlib
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+fts_0006 = importlib.import_module("generator.migrations.0006_documentlog_fts")
+
+FTS_TABLE = "generator_documentbody_fts"
+BATCH = 1000
+
+
+def _sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def dedup_bodies(apps, schema_editor):
+    DocumentLog = apps.get_model("generator", "DocumentLog")
+    DocumentBody = apps.get_model("generator", "DocumentBody")
+    db = schema_editor.connection.alias
+    logs = DocumentLog.objects.using(db).order_by("pk")
+    last = 0
+    while rows := list(logs.filter(pk__gt=last).values_list("pk", "content")[:BATCH]):
+        last = rows[-1][0]
+        by_digest = {}
+        for pk, content in rows:
+            raw = (content or "").encode("utf-8")
+            by_digest.setdefault(hashlib.sha256(raw).hexdigest(), (raw, []))[1].append(pk)
+        known = dict(DocumentBody.objects.using(db).filter(digest__in=by_digest).values_list("digest", "id"))
+        DocumentBody.objects.using(db).bulk_create([
+            DocumentBody(digest=digest, data=zlib.compress(raw), size=len(raw))
+            for digest, (raw, _) in by_digest.items() if digest not in known
+        ])
+        known = dict(DocumentBody.objects.using(db).filter(digest__in=by_digest).values_list("digest", "id"))
+        for digest, (_, pks) in by_digest.items():
+            DocumentLog.objects.using(db).filter(pk__in=pks).update(body_id=known[digest])
+
+
+def restore_content(apps, schema_editor):
+    DocumentLog = apps.get_model("generator", "DocumentLog")
+    DocumentBody = apps.get_model("generator", "DocumentBody")
+    db = schema_editor.connection.alias
+    for body in DocumentBody.objects.using(db).iterator():
+        text = zlib.decompress(body.data).decode("utf-8")
+        DocumentLog.objects.using(db).filter(body_id=body.pk).update(content=text)
+
+
+def index_bodies(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    DocumentBody = apps.get_model("generator", "DocumentBody")
+    schema_editor.execute(
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            content, content='', tokenize="{fts_0006.TOKENIZE}"
+        )"""
+    )
+    db = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        for body in DocumentBody.objects.using(db).iterator(chunk_size=BATCH):
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (%s, %s)",
+                [body.pk, zlib.decompress(body.data).decode("utf-8")],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0006_documentlog_fts'),
+    ]
+
+    operations = [
+        # The old index and its triggers read DocumentLog.content, which goes away.
+        migrations.RunPython(_sqlite(fts_0006.BACKWARD), _sqlite(fts_0006.FORWARD)),
+        migrations.CreateModel(
+            name='DocumentBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='documentlog',
+            name='body',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='generator.documentbody'),
+        ),
+        migrations.RunPython(dedup_bodies, restore_content),
+        # Lets a rollback re-add the column before restore_content fills it.
+        migrations.AlterField(
+            model_name='documentlog',
+            name='content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='documentlog',
+            name='content',
+        ),
+        migrations.AlterField(
+            model_name='documentlog',
+            name='body',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='generator.documentbody'),
+        ),
+        migrations.RunPython(index_bodies, _sqlite([f"DROP TABLE IF EXISTS {FTS_TABLE}"])),
+    ]
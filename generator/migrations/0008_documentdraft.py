@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0007_documentbody'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentDraft',
+            fields=[
+                ('id', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('doc_type', models.CharField(max_length=20)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
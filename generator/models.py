@@ -1,4 +1,107 @@
-from django.db import models
+import hashlib
+import uuid
+import zlib
+from functools import cached_property
+
+from django.db import models, router, transaction
+from django.utils import timezone
+
+
+class DocumentBodyManager(models.Manager):
+    # Digests per query, well under every backend's parameter limit.
+    CHUNK = 500
+
+    def intern(self, texts):
+        """
+        Store each distinct text once and return ``{text: body id}``.
+
+        Texts already stored are looked up by digest; new ones are inserted
+        compressed and added to the full-text index.
+        """
+        from .services.search import index_bodies
+
+        by_digest = {DocumentBody.digest_of(text): text for text in texts}
+        digests = list(by_digest)
+        ids = {}
+        for start in range(0, len(digests), self.CHUNK):
+            chunk = digests[start:start + self.CHUNK]
+            known = dict(self.filter(digest__in=chunk).values_list("digest", "id"))
+            missing = [digest for digest in chunk if digest not in known]
+            if missing:
+                self.bulk_create(
+                    [DocumentBody.from_text(by_digest[digest]) for digest in missing],
+                    ignore_conflicts=True,
+                )
+                created = dict(self.filter(digest__in=missing).values_list("digest", "id"))
+                index_bodies([(pk, by_digest[digest]) for digest, pk in created.items()], using=self.db)
+                known.update(created)
+            ids.update(known)
+        return {text: ids[digest] for digest, text in by_digest.items()}
+
+    def prune(self):
+        """Delete bodies no log points to any more; returns the count."""
+        from .services.search import unindex_bodies
+
+        deleted = 0
+        orphans = self.filter(logs__isnull=True).values_list("id", flat=True)
+        while True:
+            with transaction.atomic(using=self.db):
+                batch = list(self.filter(pk__in=list(orphans[:self.CHUNK])))
+                if not batch:
+                    return deleted
+                unindex_bodies([(body.pk, body.text) for body in batch], using=self.db)
+                deleted += self.filter(pk__in=[body.pk for body in batch], logs__isnull=True).delete()[0]
+
+
+class DocumentBody(models.Model):
+    """A document body stored once, zlib-compressed, keyed by its SHA-256."""
+
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    # Length of the UTF-8 text before compression.
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = DocumentBodyManager()
+
+    @staticmethod
+    def digest_of(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_text(cls, text):
+        raw = text.encode("utf-8")
+        return cls(digest=hashlib.sha256(raw).hexdigest(), data=zlib.compress(raw), size=len(raw))
+
+    @cached_property
+    def text(self):
+        return zlib.decompress(self.data).decode("utf-8")
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes)"
+
+
+class DocumentLogQuerySet(models.QuerySet):
+    """Accepts ``content`` in ``bulk_create`` and ``update`` like a real column."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self._for_write = True
+        pending = [obj for obj in objs if obj._content is not None]
+        with transaction.atomic(using=self.db):
+            if pending:
+                ids = DocumentBody.objects.db_manager(self.db).intern(obj._content for obj in pending)
+                for obj in pending:
+                    obj.body_id, obj._content = ids[obj._content], None
+            return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if "content" in kwargs:
+            self._for_write = True
+            text = kwargs.pop("content") or ""
+            kwargs["body_id"] = DocumentBody.objects.db_manager(self.db).intern([text])[text]
+        return super().update(**kwargs)
+
 
 class DocumentLog(models.Model):
     DOCUMENT_TYPES = [
@@ -12,8 +115,94 @@ class DocumentLog(models.Model):
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPES)
     language = models.CharField(max_length=20)
     reference_id = models.CharField(max_length=100)
-    content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Identical bodies (re-previews of the same text) share one row.
+    body = models.ForeignKey(DocumentBody, on_delete=models.PROTECT, related_name="logs")
+    # Set when the document is generated, not when the buffered row is written.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Listing is newest first; each filter has an index ending in created_at
+        # so a page is a short range scan whatever the table size.
+        indexes = [
+            models.Index(fields=["document_type", "created_at"], name="doclog_type_created_idx"),
+            models.Index(fields=["language", "created_at"], name="doclog_lang_created_idx"),
+            models.Index(fields=["reference_id"], name="doclog_reference_idx"),
+            models.Index(fields=["created_at"], name="doclog_created_idx"),
+        ]
+
+    objects = DocumentLogQuerySet.as_manager()
+
+    # Text assigned through ``content`` and not yet stored as a DocumentBody.
+    _content = None
+
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        return self.body.text
+
+    @content.setter
+    def content(self, value):
+        self._content = value or ""
+
+    def save(self, *args, **kwargs):
+        if self._content is not None:
+            using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+            self.body_id = DocumentBody.objects.db_manager(using).intern([self._content])[self._content]
+            self._content = None
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.document_type} | {self.reference_id}"
+
+
+class DocumentDraft(models.Model):
+    """A previewed document payload; the session keeps only its id."""
+
+    id = models.CharField(primary_key=True, max_length=32, editable=False)
+    doc_type = models.CharField(max_length=20)
+    # zlib-compressed compact JSON.
+    data = models.BinaryField()
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.doc_type} | {self.pk}"
+
+
+class RenderJob(models.Model):
+    """A PDF/DOCX render queued for the ``render_worker`` command."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    doc_type = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    result_path = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="renderjob_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type}.{self.format} | {self.status}"
@@ -0,0 +1,216 @@
+"""
+AI backends behind :mod:`generator.services.ai_service`.
+
+A backend turns a full prompt into body text:
+
+* ``await backend.generate(prompt)`` returns the whole text;
+* ``await backend.stream(prompt)`` opens a stream and returns an async
+  iterator of text fragments.
+
+Errors that carry an HTTP-like ``code``/``status`` of 429 or 5xx are
+retried by the scheduler.  ``AI_BACKEND`` selects the backend: ``"gemini"``
+(default), ``"local"`` or a dotted path to an :class:`AIBackend` subclass.
+
+``LocalBackend`` is a deterministic, offline stand-in for load tests and
+CI.  Its text depends only on the prompt (bilingual prompts get the JSON
+object they ask for); latency, error rate and stream
+chunk timing come from ``AI_LOCAL_BACKEND``.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+import google.generativeai as genai
+
+logger = logging.getLogger('generator')
+
+
+class BackendError(Exception):
+    """Backend failure with an HTTP-like status (429/5xx are retryable)."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class AIBackend:
+    """Interface implemented by every AI backend."""
+
+    name = ""
+
+    async def generate(self, prompt):
+        raise NotImplementedError
+
+    async def stream(self, prompt):
+        raise NotImplementedError
+
+
+# ------------------------------------------------------------------
+# Gemini
+# ------------------------------------------------------------------
+_gemini_model = None
+
+
+def get_gemini_model():
+    """Return (and lazily initialize) the Gemini generative model."""
+    global _gemini_model
+    if _gemini_model is None:
+        api_key = getattr(settings, 'GEMINI_API_KEY', '')
+        if not api_key:
+            logger.warning("GEMINI_API_KEY is not set – AI generation will fail.")
+        genai.configure(api_key=api_key)
+        _gemini_model = genai.GenerativeModel(getattr(settings, "AI_GEMINI_MODEL", "gemini-2.5-flash-lite"))
+        logger.info("Gemini model initialised.")
+    return _gemini_model
+
+
+class GeminiBackend(AIBackend):
+    name = "gemini"
+
+    async def generate(self, prompt):
+        res = await get_gemini_model().generate_content_async(prompt)
+        return res.text
+
+    async def stream(self, prompt):
+        response = await get_gemini_model().generate_content_async(prompt, stream=True)
+
+        async def fragments():
+            async for chunk in response:
+                yield chunk.text
+
+        return fragments()
+
+
+# ------------------------------------------------------------------
+# Local deterministic stand-in
+# ------------------------------------------------------------------
+_DEVANAGARI_RE = re.compile(r"[ऀ-ॿ]")
+# The JSON answer format requested by bilingual prompts.
+_BILINGUAL_RE = re.compile(r'\{"en": ".*", "hi": ".*"\}')
+
+_SENTENCES = {
+    "en": (
+        "This is to inform all concerned that {topic}.",
+        "All divisions are requested to take note of the above and ensure compliance.",
+        "Heads of sections shall bring this to the notice of the staff working under them.",
+        "This issues with the approval of the competent authority.",
+        "Any clarification in this regard may be sought from the administration section.",
+        "The arrangement will remain in force until further orders.",
+    ),
+    "hi": (
+        "सभी संबंधितों को सूचित किया जाता है कि {topic}।",
+        "सभी प्रभागों से अनुरोध है कि उपरोक्त का संज्ञान लेकर अनुपालन सुनिश्चित करें।",
+        "अनुभाग प्रमुख इसे अपने अधीन कार्यरत कर्मचारियों के संज्ञान में लाएँ।",
+        "यह सक्षम प्राधिकारी के अनुमोदन से जारी किया जाता है।",
+        "इस संबंध में किसी भी स्पष्टीकरण के लिए प्रशासन अनुभाग से संपर्क करें।",
+        "यह व्यवस्था अगले आदेश तक लागू रहेगी।",
+    ),
+}
+
+
+def _local_options():
+    options = {
+        "latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.4},
+        "error_rate": 0.0,
+        "error_statuses": [429, 503],
+        "chunk_words": 4,
+        "chunk_delay": 0.05,
+        "seed": None,
+    }
+    options.update(getattr(settings, "AI_LOCAL_BACKEND", {}) or {})
+    return options
+
+
+class LocalBackend(AIBackend):
+    """
+    Offline backend returning deterministic bilingual text.
+
+    ``latency`` is ``{"distribution": "fixed"|"uniform"|"lognormal", ...}``
+    with ``seconds``, ``low``/``high`` or ``median``/``sigma`` respectively.
+    A share ``error_rate`` of calls fails with one of ``error_statuses``.
+    Streams yield ``chunk_words`` words every ``chunk_delay`` seconds.
+    """
+
+    name = "local"
+
+    def __init__(self, options=None):
+        self.options = options or _local_options()
+        self.random = random.Random(self.options.get("seed"))
+
+    def _latency(self):
+        spec = self.options["latency"]
+        kind = spec.get("distribution", "fixed")
+        if kind == "uniform":
+            return self.random.uniform(spec.get("low", 0.0), spec.get("high", 1.0))
+        if kind == "lognormal":
+            return self.random.lognormvariate(math.log(spec.get("median", 0.8)), spec.get("sigma", 0.4))
+        return float(spec.get("seconds", 0.0))
+
+    def _maybe_fail(self):
+        if self.random.random() < float(self.options["error_rate"]):
+            status = self.random.choice(self.options["error_statuses"])
+            raise BackendError(f"simulated backend error {status}", status=status)
+
+    @staticmethod
+    def text_for(prompt):
+        """The body the local backend answers ``prompt`` with."""
+        system = prompt.split("Topic:")[0]
+        topic = prompt.rsplit("Topic:", 1)[-1].strip().rstrip(".।") or "the matter under reference"
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+
+        def body(lang):
+            first, *rest = _SENTENCES[lang]
+            return " ".join([first.format(topic=topic)] + random.Random(seed).sample(rest, 3))
+
+        if _BILINGUAL_RE.search(system):
+            return json.dumps({"en": body("en"), "hi": body("hi")}, ensure_ascii=False)
+        return body("hi" if _DEVANAGARI_RE.search(system) else "en")
+
+    async def generate(self, prompt):
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self.text_for(prompt)
+
+    async def stream(self, prompt):
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        words = self.text_for(prompt).split(" ")
+        size = max(1, int(self.options["chunk_words"]))
+        delay = float(self.options["chunk_delay"])
+
+        async def fragments():
+            for start in range(0, len(words), size):
+                if start:
+                    await asyncio.sleep(delay)
+                yield " ".join(words[start:start + size]) + " "
+
+        return fragments()
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "local": LocalBackend,
+}
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_backend = None
+
+
+def get_ai_backend():
+    """Return (and lazily create) the backend selected by ``AI_BACKEND``."""
+    global _backend
+    if _backend is None:
+        name = getattr(settings, "AI_BACKEND", "gemini")
+        backend_class = BACKENDS.get(name) or import_string(name)
+        _backend = backend_class()
+        logger.info("AI backend: %s", backend_class.__name__)
+    return _backend
@@ -0,0 +1,282 @@
+"""
+Persistent cache of AI-generated document bodies.
+
+Bodies are stored in a small SQLite file (``AI_CACHE_PATH``) so every worker
+process on the host shares them.  Entries expire after ``AI_CACHE_TTL``
+seconds and the least recently used ones are dropped once the file holds
+about a tenth more than ``AI_CACHE_MAX_ENTRIES``, rather than on every write.
+Hit and miss counters live in the same file.
+
+Reads stay read-only: counters and access times are buffered in memory and
+written in one transaction at most every ``AI_CACHE_FLUSH_INTERVAL``
+seconds (and before eviction, :meth:`AICache.stats` and at exit).
+
+The cache is blocking SQLite; async callers go through :meth:`AICache.run`,
+which hands each call to a small pool of I/O threads so the event loop
+never waits on the file.
+
+The same file also holds short-lived leases used to coalesce identical
+Gemini calls across worker processes: the worker holding the lease for a
+key makes the upstream call, the others wait for its result to land in
+the cache.
+"""
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger('generator')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_bodies (
+    key TEXT PRIMARY KEY,
+    doc_type TEXT NOT NULL,
+    language TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ai_bodies_accessed ON ai_bodies (accessed_at);
+CREATE TABLE IF NOT EXISTS ai_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ai_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+COUNTERS = ("hits", "misses", "upstream_calls", "coalesced_local", "coalesced_remote", "retries", "busy")
+
+# Threads running cache calls for async callers (shared by all caches).
+IO_THREADS = 4
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_topic(topic):
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    topic = _WHITESPACE_RE.sub(" ", (topic or "").casefold()).strip()
+    return topic.rstrip(" .!?।")
+
+
+def make_key(doc_type, lang, prompt_version, topic):
+    blob = json.dumps([doc_type, lang, prompt_version, normalize_topic(topic)], ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="ai-cache")
+        return _executor
+
+
+class AICache:
+    """SQLite-backed body cache with TTL, LRU eviction and hit/miss counters."""
+
+    def __init__(self, path, ttl, max_entries, flush_interval=5.0):
+        self.path = str(path)
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.flush_interval = float(flush_interval)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            self._rows = conn.execute("SELECT COUNT(*) FROM ai_bodies").fetchone()[0]
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    async def run(self, method, *args):
+        """Await ``method(*args)`` (a blocking cache call) on the I/O threads."""
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), method, *args)
+
+    # -- buffered counters and access times -----------------------------
+    def count(self, name):
+        """Add one to counter ``name``; in memory only, safe on the event loop."""
+        with self._lock:
+            self._counts[name] += 1
+
+    def flush(self):
+        """Write the buffered counters and access times in one transaction."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        if not counts and not touched:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO ai_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                counts.items(),
+            )
+            conn.executemany(
+                "UPDATE ai_bodies SET accessed_at = max(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    # -- bodies ---------------------------------------------------------
+    def get(self, key):
+        """Return the cached body for ``key`` or ``None`` (counted as a miss)."""
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT body FROM ai_bodies WHERE key = ? AND created_at > ?",
+            (key, now - self.ttl),
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self._counts["misses"] += 1
+            else:
+                self._counts["hits"] += 1
+                self._touched[key] = now
+        self._maybe_flush()
+        return row[0] if row else None
+
+    def peek(self, key, since):
+        """Body for ``key`` written at or after ``since``, without touching counters."""
+        row = self._connect().execute(
+            "SELECT body FROM ai_bodies WHERE key = ? AND created_at >= ?", (key, since)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, doc_type, lang, body):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_bodies (key, doc_type, language, body, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, doc_type, lang, body, now, now),
+        )
+        with self._lock:
+            self._rows += 1
+            due = self._rows > self.max_entries + self.max_entries // 10
+        if due:
+            self.evict(now)
+        else:
+            self._maybe_flush()
+
+    def evict(self, now=None):
+        """Drop expired entries, then the least recently used beyond the limit."""
+        now = now or time.time()
+        self.flush()
+        conn = self._connect()
+        conn.execute("DELETE FROM ai_bodies WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM ai_bodies WHERE key IN ("
+            "SELECT key FROM ai_bodies ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        rows = conn.execute("SELECT COUNT(*) FROM ai_bodies").fetchone()[0]
+        with self._lock:
+            self._rows = rows
+
+    # -- cross-process leases --------------------------------------------
+    def acquire_lease(self, key, owner, ttl):
+        """Take the lease on ``key`` unless another owner holds a live one."""
+        now = time.time()
+        cur = self._connect().execute(
+            "INSERT INTO ai_leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE ai_leases.expires_at < ?",
+            (key, owner, now + ttl, now),
+        )
+        return cur.rowcount == 1
+
+    def renew_lease(self, key, owner, ttl):
+        """Push back the expiry of ``owner``'s lease; false if it was lost."""
+        cur = self._connect().execute(
+            "UPDATE ai_leases SET expires_at = ? WHERE key = ? AND owner = ?",
+            (time.time() + ttl, key, owner),
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, key, owner):
+        self._connect().execute("DELETE FROM ai_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def lease_held(self, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM ai_leases WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def stats(self):
+        """Counters, entry count and the share of generations served by coalescing."""
+        self.flush()
+        conn = self._connect()
+        stored = dict(conn.execute("SELECT name, value FROM ai_stats").fetchall())
+        stats = {name: stored.get(name, 0) for name in COUNTERS}
+        stats["entries"] = conn.execute("SELECT COUNT(*) FROM ai_bodies").fetchone()[0]
+        coalesced = stats["coalesced_local"] + stats["coalesced_remote"]
+        total = coalesced + stats["upstream_calls"]
+        stats["coalescing_ratio"] = coalesced / total if total else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._touched.clear()
+            self._rows = 0
+        conn = self._connect()
+        conn.execute("DELETE FROM ai_bodies")
+        conn.execute("DELETE FROM ai_stats")
+        conn.execute("DELETE FROM ai_leases")
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_ai_cache = None
+
+
+def get_ai_cache():
+    """Return (and lazily initialize) the shared AI body cache."""
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = AICache(
+            getattr(settings, "AI_CACHE_PATH", settings.BASE_DIR / "cache" / "ai_bodies.sqlite3"),
+            getattr(settings, "AI_CACHE_TTL", 7 * 24 * 3600),
+            getattr(settings, "AI_CACHE_MAX_ENTRIES", 10000),
+            getattr(settings, "AI_CACHE_FLUSH_INTERVAL", 5.0),
+        )
+        atexit.register(_ai_cache.flush)
+    return _ai_cache
@@ -0,0 +1,142 @@
+"""
+Quota-aware pacing of AI backend calls.
+
+``QuotaScheduler`` admits calls through two token buckets sized to the
+requests-per-minute and tokens-per-minute quota (``AI_REQUESTS_PER_MINUTE``,
+``AI_TOKENS_PER_MINUTE``, per worker process).  Waiting calls are served in
+priority order, interactive before batch, and give up with
+:class:`AIBusyError` once ``AI_QUEUE_DEADLINE`` seconds have passed.
+
+``retry_delay()`` gives the jittered exponential backoff used when the
+backend answers 429 or 5xx; the scheduler is paused for that long so every
+queued call backs off together instead of stampeding.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import time
+
+from django.conf import settings
+from google.api_core.exceptions import GoogleAPICallError
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+class AIBusyError(Exception):
+    """Raised when a call cannot be admitted before its queue deadline."""
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def is_retryable(exc):
+    """True for rate-limit (429) and server-side (5xx) backend errors."""
+    status = exc.code if isinstance(exc, GoogleAPICallError) else getattr(exc, "status", None)
+    return status in RETRYABLE_STATUS
+
+
+def retry_delay(attempt):
+    """Full-jitter exponential backoff for the 1-based ``attempt``."""
+    base = float(getattr(settings, "AI_BACKOFF_BASE", 0.5))
+    cap = float(getattr(settings, "AI_BACKOFF_MAX", 8))
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def estimate_tokens(prompt):
+    """Rough prompt-plus-answer token count used for the TPM bucket."""
+    return len(prompt) // 3 + int(getattr(settings, "AI_OUTPUT_TOKENS_ESTIMATE", 400))
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding at most one minute of quota."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` (capped at capacity) is available."""
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            return 0.0
+        return (need - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class QuotaScheduler:
+    """Priority queue of calls admitted through request and token buckets."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._timer = None
+
+    def _wait_time(self, tokens, now):
+        return max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            _priority, _seq, tokens, future = self._queue[0]
+            if future.done():  # gave up waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(tokens, now)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            future.set_result(None)
+
+    async def acquire(self, tokens, priority=PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Wait for quota for one call of about ``tokens`` tokens.
+
+        Raises :class:`AIBusyError` if not admitted within ``deadline``
+        seconds (default ``AI_QUEUE_DEADLINE``).
+        """
+        if deadline is None:
+            deadline = float(getattr(settings, "AI_QUEUE_DEADLINE", 10))
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            retry_after = self._wait_time(tokens, time.monotonic())
+            raise AIBusyError("AI service is busy", retry_after=retry_after) from None
+
+    def pause(self, seconds):
+        """Hold back every queued call for ``seconds`` (after a 429/5xx)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    @property
+    def queued(self):
+        return sum(1 for *_rest, future in self._queue if not future.done())
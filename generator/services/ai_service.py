@@ -1,27 +1,525 @@
 """
-AI Generation Service using Google Gemini.
+AI Generation Service.
+
+Prompts are sent to the backend selected by ``AI_BACKEND`` (Google Gemini
+by default, see :mod:`generator.services.ai_backends`).
+
+Body generation is asynchronous: ``generate_body_async()`` awaits the
+backend's non-blocking call so the async views never hold a worker thread
+while a request is in flight.  A process-wide
+limit (``AI_MAX_CONCURRENCY``) caps concurrent backend calls and each call is
+bounded by ``AI_TIMEOUT`` seconds.
+
+Every upstream call is paced by a per-process :class:`QuotaScheduler`
+(token buckets for the RPM/TPM quota, interactive calls ahead of batch
+ones) and retried with jittered backoff on 429/5xx.  A call that cannot be
+admitted before ``AI_QUEUE_DEADLINE`` raises :class:`AIBusyError`.
+
+Identical requests in flight at the same time are coalesced onto one
+upstream call: within a process through a shared task per cache key, and
+across workers through a lease in the AI cache file.  The lease is short
+(``AI_LEASE_TTL``) and renewed by its holder while the call runs, so a
+crashed worker's lease lapses quickly; workers waiting on it give up with
+:class:`AIGenerationTimeout` after ``AI_LEASE_WAIT`` seconds.
+
+``stream_body_async()`` is the streaming variant used by the Server-Sent
+Events endpoints: it yields text fragments as the backend produces them.
+
+Generated bodies are cached per (document type, language, prompt version,
+normalized topic) in :mod:`generator.services.ai_cache`; ``regenerate=True``
+skips the lookup and replaces the cached body.  The office order prompt
+carries today's date, so its cache entries are keyed by the date as well.
+
+``generate_bilingual_async()`` asks for the English and Hindi bodies in one
+call (language ``"both"``): the backend answers with a JSON object holding
+both, which is cached as a whole and under each language's own key.
 """
+import asyncio
+import json
 import logging
+import re
+import os
+import time
+import uuid
+import weakref
+from datetime import date
+
 from django.conf import settings
-import google.generativeai as genai
+
+from .ai_backends import get_ai_backend, get_gemini_model  # noqa: F401
+from .ai_cache import get_ai_cache, make_key
+from .ai_scheduler import (
+    PRIORITY_INTERACTIVE,
+    AIBusyError,
+    QuotaScheduler,
+    estimate_tokens,
+    is_retryable,
+    retry_delay,
+)
 
 logger = logging.getLogger('generator')
 
+
+class AIGenerationTimeout(Exception):
+    """Raised when a backend call does not finish within ``AI_TIMEOUT``."""
+
+
+class BilingualFormatError(ValueError):
+    """Raised when a bilingual answer is not a JSON object with both bodies."""
+
+
+# ------------------------------------------------------------------
+# Prompts
+# ------------------------------------------------------------------
+# Bump whenever a system prompt changes so cached bodies are not reused.
+PROMPT_VERSION = "1"
+
+# Document types whose prompt carries today's date.
+DATED_PROMPTS = frozenset({"office_order"})
+
+
+def prompt_version(doc_type):
+    """Cache key version of ``doc_type``'s prompt; dated prompts change daily."""
+    if doc_type in DATED_PROMPTS:
+        return f"{PROMPT_VERSION}:{date.today().isoformat()}"
+    return PROMPT_VERSION
+
+
+def _office_order_prompt(lang):
+    today = date.today().strftime("%d-%m-%Y")
+    if lang == "hi":
+        return f"""
+आप BISAG-N के लिए एक आधिकारिक कार्यालय आदेश की मुख्य सामग्री लिख रहे हैं।
+
+नियम:
+- कम से कम 2–3 वाक्यों का एक औपचारिक अनुच्छेद लिखें।
+- सरकारी भाषा का प्रयोग करें।
+- कोई शीर्षक, संदर्भ, दिनांक, प्रेषक या प्राप्तकर्ता न लिखें।
+- बुलेट या क्रमांक का प्रयोग न करें।
+- केवल सादा पाठ में उत्तर दें।
+
+Today's Date: {today}
+"""
+    return f"""
+You are drafting the BODY of an official government Office Order for BISAG-N.
+
+Rules:
+- Write one formal paragraph (minimum 2–3 sentences).
+- Use official government tone.
+- Do not include title, reference, date, From or To.
+- No bullet points or numbering.
+- Plain text only.
+
+Today's Date: {today}
+"""
+
+
+def _body_only_prompt(kind_en, kind_hi, noun_en, noun_hi):
+    def prompt(lang):
+        if lang == "hi":
+            return f"""
+आप BISAG-N के लिए एक सरकारी {kind_hi} का केवल मुख्य भाग (BODY) लिख रहे हैं।
+
+महत्वपूर्ण नियम:
+- केवल {noun_hi} का मुख्य विषय-वस्तु लिखें।
+- कोई विषय (Subject) न लिखें।
+- कोई शीर्षक न लिखें।
+- कोई संदर्भ संख्या न लिखें।
+- कोई हस्ताक्षर न लिखें।
+- कोई दिनांक न लिखें।
+- कोई "प्रेषक" या "प्राप्तकर्ता" न लिखें।
+- 1–2 औपचारिक अनुच्छेद लिखें।
+- सरकारी भाषा का प्रयोग करें।
+- केवल सादा पाठ में उत्तर दें।
+"""
+        return f"""
+You are drafting ONLY the BODY content of an official Government {kind_en} for BISAG-N.
+
+IMPORTANT Rules:
+- Write ONLY the main body content of the {noun_en}.
+- Do NOT include any subject line.
+- Do NOT include any title or heading.
+- Do NOT include reference number.
+- Do NOT include signature.
+- Do NOT include date.
+- Do NOT include From or To sections.
+- Write 1–2 formal paragraphs only.
+- Official government tone.
+- Plain text only.
+"""
+    return prompt
+
+
+SYSTEM_PROMPTS = {
+    "office_order": _office_order_prompt,
+    "circular": _body_only_prompt("Circular", "परिपत्र (Circular)", "circular", "परिपत्र"),
+    "policy": _body_only_prompt("Policy", "नीति (Policy)", "policy", "नीति"),
+}
+
+
+BILINGUAL = "both"
+LANGUAGES = ("en", "hi")
+
+BILINGUAL_FORMAT = """
+The same body is needed in English and in Hindi. Follow the English rules
+above for the English body and the Hindi rules for the Hindi body; the two
+must say the same thing.
+
+Output format:
+- Reply with one JSON object and nothing else: {"en": "<English body>", "hi": "<Hindi body>"}
+- Each value is plain text; separate paragraphs with \\n.
+"""
+
+
+def build_prompt(doc_type, lang, topic):
+    """Full Gemini prompt for the body of ``doc_type`` in ``lang`` about ``topic``."""
+    if lang == BILINGUAL:
+        system = SYSTEM_PROMPTS[doc_type]("en") + SYSTEM_PROMPTS[doc_type]("hi") + BILINGUAL_FORMAT
+    else:
+        system = SYSTEM_PROMPTS[doc_type](lang)
+    return system + "\n\nTopic:\n" + topic
+
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_bilingual(text):
+    """
+    ``{"en": body, "hi": body}`` from a bilingual answer.
+
+    Tolerates a Markdown code fence around the JSON; raises
+    :class:`BilingualFormatError` if either body is missing or empty.
+    """
+    text = _FENCE_RE.sub("", (text or "").strip())
+    try:
+        data = json.loads(text[text.find("{"):text.rfind("}") + 1])
+    except ValueError:
+        raise BilingualFormatError("Bilingual answer is not a JSON object") from None
+    if not isinstance(data, dict):
+        raise BilingualFormatError("Bilingual answer is not a JSON object")
+    bodies = {}
+    for lang in LANGUAGES:
+        body = data.get(lang)
+        if not isinstance(body, str) or not body.strip():
+            raise BilingualFormatError(f"Bilingual answer has no {lang!r} body")
+        bodies[lang] = body.strip()
+    return bodies
+
+
 # ------------------------------------------------------------------
-# Lazy-loaded Gemini model
+# Async generation
 # ------------------------------------------------------------------
-_gemini_model = None
+# Seconds between checks while another worker holds the lease for a key.
+LEASE_POLL_INTERVAL = 0.1
+
+# asyncio primitives belong to one event loop; keep one limiter, scheduler
+# and in-flight table per loop.
+_semaphores = weakref.WeakKeyDictionary()
+_schedulers = weakref.WeakKeyDictionary()
+_inflight = weakref.WeakKeyDictionary()
+
+
+class _StreamAbandoned(Exception):
+    """A streaming leader was cancelled before finishing; followers retry."""
+
+
+def _limiter():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(int(getattr(settings, "AI_MAX_CONCURRENCY", 200)))
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+def _scheduler():
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = QuotaScheduler(
+            int(getattr(settings, "AI_REQUESTS_PER_MINUTE", 60)),
+            int(getattr(settings, "AI_TOKENS_PER_MINUTE", 250000)),
+        )
+        _schedulers[loop] = scheduler
+    return scheduler
+
+
+def _inflight_calls():
+    """``{cache key: awaitable}`` of upstream calls running on this loop."""
+    loop = asyncio.get_running_loop()
+    calls = _inflight.get(loop)
+    if calls is None:
+        calls = _inflight[loop] = {}
+    return calls
+
+
+def _timeout():
+    return float(getattr(settings, "AI_TIMEOUT", 30))
+
+
+def _max_retries():
+    return int(getattr(settings, "AI_MAX_RETRIES", 3))
+
+
+def _lease_ttl():
+    return float(getattr(settings, "AI_LEASE_TTL", 10))
+
+
+def _lease_wait():
+    return float(getattr(settings, "AI_LEASE_WAIT", _timeout()))
+
+
+async def _call_backend(prompt, priority, stream=False):
+    """
+    One scheduled backend call, retried on 429/5xx with jittered backoff.
+
+    Returns the body text, or with ``stream`` an async iterator of fragments.
+
+    Each attempt waits for quota first.  Retries exhausted raise
+    :class:`AIBusyError`; a call exceeding ``AI_TIMEOUT`` raises
+    :class:`AIGenerationTimeout`.
+    """
+    scheduler = _scheduler()
+    tokens = estimate_tokens(prompt)
+    timeout = _timeout()
+    attempt = 0
+    while True:
+        try:
+            await scheduler.acquire(tokens, priority)
+        except AIBusyError:
+            get_ai_cache().count("busy")
+            raise
+        try:
+            backend = get_ai_backend()
+            call = backend.stream(prompt) if stream else backend.generate(prompt)
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError as exc:
+            raise AIGenerationTimeout(f"AI backend call exceeded {timeout:g}s") from exc
+        except Exception as exc:
+            if not is_retryable(exc):
+                raise
+            attempt += 1
+            delay = retry_delay(attempt)
+            if attempt > _max_retries():
+                raise AIBusyError("AI backend is rate limiting or unavailable", retry_after=delay) from exc
+            logger.warning("AI backend call failed (%s), retry %d in %.2fs", exc, attempt, delay)
+            scheduler.pause(delay)
+            get_ai_cache().count("retries")
+
+
+async def _renew(cache, key, owner):
+    """Extend the lease on ``key`` every third of its TTL while it is held."""
+    ttl = _lease_ttl()
+    while True:
+        await asyncio.sleep(ttl / 3)
+        if not await cache.run(cache.renew_lease, key, owner, ttl):
+            logger.warning("Lost the AI lease on %s; another worker may call the backend too.", key[:12])
+            return
+
+
+def _keep_lease(cache, key, owner):
+    return asyncio.ensure_future(_renew(cache, key, owner))
+
+
+async def _release(cache, key, owner, renewer):
+    renewer.cancel()
+    # Shielded: a cancelled request must still give up its lease.
+    await asyncio.shield(cache.run(cache.release_lease, key, owner))
+
+
+async def _wait_for_remote(cache, key, since, deadline):
+    """
+    Wait while another worker holds the lease on ``key``.
+
+    Returns its body once cached, or ``None`` if the lease went away
+    without a result (that worker failed) so the caller can take over.
+    Raises :class:`AIGenerationTimeout` if still waiting at ``deadline``
+    (a ``time.monotonic()`` value).
+    """
+    while await cache.run(cache.lease_held, key):
+        body = await cache.run(cache.peek, key, since)
+        if body is not None:
+            return body
+        if time.monotonic() >= deadline:
+            raise AIGenerationTimeout(
+                f"another worker is still generating this body after {_lease_wait():g}s"
+            )
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+    return await cache.run(cache.peek, key, since)
+
+
+async def _single_flight(cache, key, doc_type, lang, topic, priority):
+    """
+    Produce the body for ``key`` once across workers.
+
+    The worker that wins the lease calls the backend and caches the result;
+    any other worker waits for that result instead of calling again.
+    """
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    started = time.time()
+    deadline = time.monotonic() + _lease_wait()
+    while True:
+        if await cache.run(cache.acquire_lease, key, owner, _lease_ttl()):
+            renewer = _keep_lease(cache, key, owner)
+            try:
+                async with _limiter():
+                    cache.count("upstream_calls")
+                    body = await _call_backend(build_prompt(doc_type, lang, topic), priority)
+                body = body.strip()
+                if lang == BILINGUAL:
+                    # Store a validated, canonical answer; a malformed one raises here.
+                    bodies = parse_bilingual(body)
+                    body = json.dumps(bodies, ensure_ascii=False)
+                    for single, text in bodies.items():
+                        single_key = make_key(doc_type, single, prompt_version(doc_type), topic)
+                        await cache.run(cache.set, single_key, doc_type, single, text)
+                if body:
+                    await cache.run(cache.set, key, doc_type, lang, body)
+                return body
+            finally:
+                await _release(cache, key, owner, renewer)
+
+        body = await _wait_for_remote(cache, key, started, deadline)
+        if body is not None:
+            cache.count("coalesced_remote")
+            return body
+
+
+async def _join(key, calls, cache):
+    """Await an identical call already running on this loop."""
+    cache.count("coalesced_local")
+    return await asyncio.shield(calls[key])
+
+
+async def generate_body_async(doc_type, lang, topic, regenerate=False, priority=PRIORITY_INTERACTIVE):
+    """
+    Generate the body text for ``doc_type`` without blocking the event loop.
+
+    Cached bodies are returned straight away unless ``regenerate`` is set.
+    Identical requests in flight at the same time share one backend call,
+    within this process and across workers.  Raises :class:`AIBusyError`
+    when quota is not available in time and :class:`AIGenerationTimeout`
+    if the backend takes longer than ``AI_TIMEOUT`` seconds.
+    """
+    cache = get_ai_cache()
+    key = make_key(doc_type, lang, prompt_version(doc_type), topic)
+    if not regenerate:
+        body = await cache.run(cache.get, key)
+        if body is not None:
+            return body
+
+    calls = _inflight_calls()
+    while key in calls:
+        try:
+            return await _join(key, calls, cache)
+        except _StreamAbandoned:
+            continue
+
+    # The upstream call runs as its own task so a requester going away
+    # does not cancel it for the others waiting on the same key.
+    task = asyncio.ensure_future(_single_flight(cache, key, doc_type, lang, topic, priority))
+    calls[key] = task
+
+    def finished(task):
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+    task.add_done_callback(finished)
+    return await asyncio.shield(task)
+
+
+async def generate_bilingual_async(doc_type, topic, regenerate=False, priority=PRIORITY_INTERACTIVE):
+    """
+    ``{"en": body, "hi": body}`` for ``doc_type`` from a single backend call.
+
+    Shares caching and coalescing with :func:`generate_body_async`; a fresh
+    answer also fills the English and Hindi cache entries, so later
+    single-language requests for the same topic are hits.  Raises
+    :class:`BilingualFormatError` when the backend's answer is malformed.
+    """
+    return parse_bilingual(await generate_body_async(doc_type, BILINGUAL, topic, regenerate, priority))
+
+
+async def stream_body_async(doc_type, lang, topic, regenerate=False, priority=PRIORITY_INTERACTIVE):
+    """
+    Async generator of body text fragments for ``doc_type``.
+
+    A cached body, or the result of an identical request already in
+    flight, is yielded in one piece.  Otherwise the backend's streamed
+    generation is relayed chunk by chunk under the same concurrency limit
+    and scheduler (retries only happen before the first chunk);
+    ``AI_TIMEOUT`` bounds the wait for each chunk.  The full text is cached
+    only when the stream completes; if the consumer goes away the stream is
+    cancelled and nothing is stored.
+    """
+    if lang == BILINGUAL:
+        raise ValueError("Bilingual bodies are not streamed; use generate_bilingual_async()")
+    cache = get_ai_cache()
+    key = make_key(doc_type, lang, prompt_version(doc_type), topic)
+    if not regenerate:
+        body = await cache.run(cache.get, key)
+        if body is not None:
+            yield body
+            return
+
+    calls = _inflight_calls()
+    timeout = _timeout()
+    while key in calls:
+        try:
+            yield await _join(key, calls, cache)
+            return
+        except _StreamAbandoned:
+            continue
 
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not await cache.run(cache.acquire_lease, key, owner, _lease_ttl()):
+        body = await _wait_for_remote(cache, key, time.time(), time.monotonic() + _lease_wait())
+        if body is not None:
+            cache.count("coalesced_remote")
+            yield body
+            return
+        if not await cache.run(cache.acquire_lease, key, owner, _lease_ttl()):
+            raise AIGenerationTimeout("another worker is still generating this body")
 
-def get_gemini_model():
-    """Return (and lazily initialize) the Gemini generative model."""
-    global _gemini_model
-    if _gemini_model is None:
-        api_key = getattr(settings, 'GEMINI_API_KEY', '')
-        if not api_key:
-            logger.warning("GEMINI_API_KEY is not set – AI generation will fail.")
-        genai.configure(api_key=api_key)
-        _gemini_model = genai.GenerativeModel("gemini-2.5-flash-lite")
-        logger.info("Gemini model initialised.")
-    return _gemini_model
+    renewer = _keep_lease(cache, key, owner)
+    result = asyncio.get_running_loop().create_future()
+    calls[key] = result
+    parts = []
+    try:
+        async with _limiter():
+            cache.count("upstream_calls")
+            fragments = await _call_backend(build_prompt(doc_type, lang, topic), priority, stream=True)
+            chunks = fragments.__aiter__()
+            while True:
+                try:
+                    text = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                if not parts:
+                    text = text.lstrip()
+                if text:
+                    parts.append(text)
+                    yield text
 
+        body = "".join(parts).strip()
+        if body:
+            await cache.run(cache.set, key, doc_type, lang, body)
+        result.set_result(body)
+    except asyncio.TimeoutError as exc:
+        error = AIGenerationTimeout(f"AI stream stalled for more than {timeout:g}s")
+        result.set_exception(error)
+        raise error from exc
+    except BaseException as exc:
+        # Errors reach the followers as is; a cancelled or closed stream
+        # tells them to retry on their own.
+        result.set_exception(exc if isinstance(exc, Exception) else _StreamAbandoned())
+        raise
+    finally:
+        if calls.get(key) is result:
+            del calls[key]
+        await _release(cache, key, owner, renewer)
+        # Mark the exception retrieved when nobody joined this call.
+        if result.done() and not result.cancelled():
+            result.exception()
@@ -0,0 +1,174 @@
+"""
+Letterhead asset and stylesheet registry shared by all renderers.
+
+The registry reads the BISAG logo and the PDF stylesheets once, keeps a
+copy of the logo pre-scaled to its printed size, and hands out:
+
+* pre-encoded PNG bytes for python-docx (``logo_stream()``),
+* an in-memory ``url_fetcher`` answer for the logo URL used by WeasyPrint,
+* stylesheet sources and, inside renderer workers, parsed WeasyPrint
+  ``CSS`` objects.
+
+Files are re-checked by mtime at most every ``ASSET_CHECK_INTERVAL``
+seconds; when anything changed the whole registry is reloaded and its
+``version`` changes, which also invalidates cached renders.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.template.loader import get_template
+
+logger = logging.getLogger('generator')
+
+# Printed height of the letterhead logo and the resolution it is stored at.
+LOGO_PRINT_HEIGHT_IN = 0.9
+LOGO_DPI = 300
+
+# Stylesheets under static/generator/pdf/, by name.
+STYLESHEETS = ("document", "office_order")
+
+PDF_TEMPLATES = ("generator/pdf_document.html",)
+
+
+def _static_path(*parts):
+    return os.path.join(settings.BASE_DIR, "static", "generator", *parts)
+
+
+def _file_url(path):
+    return f"file:///{str(path).replace(chr(92), '/')}"
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (str(path), None, None)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _scale_logo(raw):
+    """Downscale the logo to LOGO_PRINT_HEIGHT_IN at LOGO_DPI and re-encode as PNG."""
+    from PIL import Image
+
+    with Image.open(BytesIO(raw)) as image:
+        target_h = int(round(LOGO_PRINT_HEIGHT_IN * LOGO_DPI))
+        if image.height > target_h:
+            target_w = max(1, int(round(image.width * target_h / image.height)))
+            image = image.resize((target_w, target_h), Image.LANCZOS)
+        out = BytesIO()
+        image.save(out, "PNG", optimize=True, dpi=(LOGO_DPI, LOGO_DPI))
+    return out.getvalue()
+
+
+class AssetRegistry:
+    """In-memory letterhead assets and stylesheets, invalidated by mtime."""
+
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self.version = ""
+        self.logo_png = None
+        self.logo_path = _static_path("bisag_logo.png")
+        self.logo_url = _file_url(self.logo_path)
+        self._stylesheet_sources = {}
+        self._parsed = {}
+
+    # -- loading --------------------------------------------------------
+    def _paths(self):
+        paths = [self.logo_path]
+        paths.extend(_static_path("pdf", f"{name}.css") for name in STYLESHEETS)
+        for name in PDF_TEMPLATES:
+            try:
+                paths.append(get_template(name).origin.name)
+            except Exception:
+                logger.warning("PDF template %s not found", name)
+        return paths
+
+    def _load(self, signature):
+        logo_png = None
+        try:
+            with open(self.logo_path, "rb") as f:
+                logo_png = _scale_logo(f.read())
+        except OSError as exc:
+            logger.warning("Logo not found at %s: %s", self.logo_path, exc)
+
+        sources = {}
+        for name in STYLESHEETS:
+            path = _static_path("pdf", f"{name}.css")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    sources[name] = f.read()
+            except OSError as exc:
+                logger.error("Stylesheet %s not found at %s: %s", name, path, exc)
+                sources[name] = ""
+
+        # Swap everything in at once so readers never see a mixed state.
+        self.logo_png = logo_png
+        self._stylesheet_sources = sources
+        self._parsed = {}
+        self._signature = signature
+        self.version = hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()[:16]
+        logger.info("Asset registry loaded (version %s).", self.version)
+
+    def refresh(self, force=False):
+        """Reload if any tracked file changed since the last check."""
+        now = time.monotonic()
+        if not force and self._signature is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            signature = tuple(_stat(p) for p in self._paths())
+            if force or signature != self._signature:
+                self._load(signature)
+
+    # -- accessors ------------------------------------------------------
+    def logo_stream(self):
+        """Pre-scaled logo as a fresh stream for ``run.add_picture``."""
+        self.refresh()
+        return BytesIO(self.logo_png) if self.logo_png else None
+
+    def fetch(self, url):
+        """Answer a WeasyPrint URL fetch from memory, or ``None`` if unknown."""
+        self.refresh()
+        if url == self.logo_url and self.logo_png:
+            return {"string": self.logo_png, "mime_type": "image/png", "redirected_url": url}
+        return None
+
+    def stylesheet_source(self, name):
+        self.refresh()
+        return self._stylesheet_sources.get(name, "")
+
+    def stylesheet(self, name, font_config=None):
+        """Parsed WeasyPrint stylesheet, parsed once per registry version."""
+        from weasyprint import CSS
+
+        self.refresh()
+        key = (name, self.version)
+        sheet = self._parsed.get(key)
+        if sheet is None:
+            sheet = CSS(string=self._stylesheet_sources.get(name, ""), font_config=font_config)
+            self._parsed[key] = sheet
+        return sheet
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_registry = None
+
+
+def get_asset_registry():
+    """Return (and lazily load) the process-wide asset registry."""
+    global _registry
+    if _registry is None:
+        registry = AssetRegistry(float(getattr(settings, "ASSET_CHECK_INTERVAL", 2.0)))
+        registry.refresh(force=True)
+        _registry = registry
+    return _registry
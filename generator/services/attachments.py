@@ -0,0 +1,61 @@
+"""
+Storage for uploaded policy attachments.
+
+Uploads are written once to ``MEDIA_ROOT/policy_uploads`` under an opaque,
+random attachment ID.  Pages and downloads refer to the attachment by that
+ID; the file itself is only ever read by streaming views and renderers.
+"""
+import logging
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger('generator')
+
+ATTACHMENT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def upload_dir():
+    return os.path.join(settings.MEDIA_ROOT, "policy_uploads")
+
+
+def attachment_path(attachment_id):
+    """Filesystem path for ``attachment_id``, or ``None`` if the ID is malformed."""
+    if not attachment_id or not ATTACHMENT_ID_RE.match(attachment_id):
+        return None
+    return os.path.join(upload_dir(), f"policy_{attachment_id}.pdf")
+
+
+def save_policy_upload(uploaded_file):
+    """Write an uploaded file to disk and return ``(attachment_id, path)``."""
+    directory = upload_dir()
+    os.makedirs(directory, exist_ok=True)
+    attachment_id = uuid.uuid4().hex
+    path = attachment_path(attachment_id)
+    with open(path, "wb+") as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return attachment_id, path
+
+
+def purge_attachments(max_age_seconds):
+    """Delete uploads older than ``max_age_seconds``; return how many were removed."""
+    directory = upload_dir()
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.startswith("policy_"):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as exc:
+                logger.warning("Could not remove attachment %s: %s", entry.path, exc)
+    return removed
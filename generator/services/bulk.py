@@ -0,0 +1,236 @@
+"""
+Bulk document generation.
+
+A bulk run takes a list of document specs (from JSON or CSV), fills in the
+body with the AI service where only a prompt is given, and renders every
+document on a bounded pool.  ``run_bulk()`` yields results as each entry
+finishes so the caller can stream them out without waiting for the whole
+batch.
+
+Spec fields: ``type`` (office_order, circular or policy), ``language``,
+``date`` (YYYY-MM-DD), ``reference`` (office orders), ``subject``, ``body``
+or ``prompt``, ``from`` (designation key), ``to`` (designation keys, or
+people ids for circulars) and an optional ``filename``.  In CSV, ``to`` is
+separated by semicolons.  Policy attachments are not supported in bulk.
+
+With ``language`` ``"both"`` the document is issued in English and Hindi:
+the two bodies come from one AI call (or from ``body_en`` and ``body_hi``)
+and both versions are rendered together.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .ai_scheduler import PRIORITY_BATCH
+from .ai_service import BILINGUAL, AIBusyError, generate_bilingual_async, generate_body_async
+from .payloads import circular_payload, office_order_payload, policy_payload
+from .pdf_renderer import RendererBusy
+from .rendering import CONTENT_TYPES, render, render_bilingual
+
+logger = logging.getLogger('generator')
+
+DOC_TYPES = ("office_order", "circular", "policy")
+LANGUAGES = ("en", "hi", BILINGUAL)
+DEFAULT_FILENAMES = {
+    "office_order": "Office_Order",
+    "circular": "Circular",
+    "policy": "Policy",
+}
+
+
+class BulkSpecError(ValueError):
+    """Raised for a malformed bulk request or document spec."""
+
+
+def _max_documents():
+    return int(getattr(settings, "BULK_MAX_DOCUMENTS", 1000))
+
+
+def _concurrency():
+    default = max(1, int(getattr(settings, "PDF_RENDER_WORKERS", 1)))
+    return max(1, int(getattr(settings, "BULK_CONCURRENCY", default)))
+
+
+# ------------------------------------------------------------------
+# Parsing
+# ------------------------------------------------------------------
+def _split_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    return [str(part) for part in value]
+
+
+def parse_formats(value):
+    formats = tuple(dict.fromkeys(_split_list(value) or ["pdf"]))
+    unknown = [fmt for fmt in formats if fmt not in CONTENT_TYPES]
+    if unknown:
+        raise BulkSpecError(f"Unknown format(s): {', '.join(unknown)}")
+    return formats
+
+
+def parse_specs(raw, content_type):
+    """
+    Parse a bulk request body into ``(specs, formats)``.
+
+    JSON is either a list of specs or ``{"documents": [...], "formats":
+    [...]}``; CSV has one spec per row with a header line.
+    """
+    if isinstance(raw, bytes):
+        try:
+            raw = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise BulkSpecError("Request body is not UTF-8") from None
+
+    formats = None
+    if "csv" in content_type:
+        specs = [
+            {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(raw))
+        ]
+    else:
+        try:
+            data = json.loads(raw)
+        except ValueError as exc:
+            raise BulkSpecError(f"Invalid JSON: {exc}") from None
+        if isinstance(data, dict):
+            formats = data.get("formats")
+            data = data.get("documents")
+        if not isinstance(data, list) or not all(isinstance(spec, dict) for spec in data):
+            raise BulkSpecError("Expected a list of document specs")
+        specs = data
+
+    if not specs:
+        raise BulkSpecError("No documents given")
+    if len(specs) > _max_documents():
+        raise BulkSpecError(f"At most {_max_documents()} documents per request")
+    return specs, parse_formats(formats)
+
+
+def build_payload(spec, body, lang=None):
+    """Session-style payload for ``spec`` in ``lang`` (default: its language) with ``body``."""
+    doc_type = spec["type"]
+    lang = lang or spec["language"]
+    to = _split_list(spec.get("to"))
+    if doc_type == "office_order":
+        return office_order_payload(
+            lang, spec.get("date"), (spec.get("reference") or "").strip(), body, spec.get("from"), to
+        )
+    if doc_type == "circular":
+        return circular_payload(lang, spec.get("date"), spec.get("subject"), body, spec.get("from"), to)
+    return policy_payload(lang, spec.get("date"), spec.get("subject"), body, spec.get("from"), to)
+
+
+def validate_spec(spec):
+    """Normalize ``type``/``language`` in place; raise :class:`BulkSpecError` if unusable."""
+    spec["type"] = (spec.get("type") or "").strip()
+    spec["language"] = (spec.get("language") or "en").strip() or "en"
+    if spec["type"] not in DOC_TYPES:
+        raise BulkSpecError(f"Unknown document type {spec['type']!r}")
+    if spec["language"] not in LANGUAGES:
+        raise BulkSpecError(f"Unknown language {spec['language']!r}")
+    if (spec.get("prompt") or "").strip():
+        return
+    if spec["language"] == BILINGUAL:
+        if not all((spec.get(f"body_{lang}") or "").strip() for lang in ("en", "hi")):
+            raise BulkSpecError("Either body_en and body_hi or prompt is required")
+    elif not (spec.get("body") or "").strip():
+        raise BulkSpecError("Either body or prompt is required")
+
+
+# ------------------------------------------------------------------
+# Generation
+# ------------------------------------------------------------------
+async def _bodies_for(spec):
+    """
+    ``{language: body}`` for the spec, generated at batch priority when only
+    a prompt is given (one call for both languages of a bilingual spec).
+    """
+    doc_type, lang = spec["type"], spec["language"]
+    if lang == BILINGUAL:
+        bodies = {single: (spec.get(f"body_{single}") or "").strip() for single in ("en", "hi")}
+        if all(bodies.values()):
+            return bodies
+    else:
+        body = (spec.get("body") or "").strip()
+        if body:
+            return {lang: body}
+    deadline = time.monotonic() + float(getattr(settings, "BULK_AI_WAIT", 600))
+    while True:
+        try:
+            topic = spec["prompt"].strip()
+            if lang == BILINGUAL:
+                return await generate_bilingual_async(doc_type, topic, priority=PRIORITY_BATCH)
+            return {lang: await generate_body_async(doc_type, lang, topic, priority=PRIORITY_BATCH)}
+        except AIBusyError as exc:
+            # Batch work yields to interactive users; wait for quota instead of failing.
+            if time.monotonic() + exc.retry_after > deadline:
+                raise
+            await asyncio.sleep(exc.retry_after)
+
+
+def _render_all(doc_type, payloads, formats):
+    if len(payloads) == 1:
+        (lang, payload), = payloads.items()
+        return {lang: render(doc_type, payload, formats)}
+    return render_bilingual(doc_type, payloads, formats)
+
+
+async def _render(doc_type, payloads, formats):
+    """
+    ``{language: {format: bytes}}``, rendered on a worker thread, backing
+    off while the PDF queue is full.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await sync_to_async(_render_all, thread_sensitive=False)(doc_type, payloads, formats)
+        except RendererBusy:
+            attempt += 1
+            if attempt > 10:
+                raise
+            await asyncio.sleep(min(5.0, 0.25 * 2 ** attempt))
+
+
+async def _generate(index, spec, formats, limit):
+    async with limit:
+        try:
+            validate_spec(spec)
+            payloads = {
+                lang: build_payload(spec, body, lang) for lang, body in (await _bodies_for(spec)).items()
+            }
+            files = await _render(spec["type"], payloads, formats)
+            return index, spec, {lang: (payloads[lang], files[lang]) for lang in payloads}, None
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if not isinstance(exc, BulkSpecError):
+                logger.exception("Bulk item %d failed: %s", index, exc)
+            return index, spec, None, exc
+
+
+async def run_bulk(specs, formats):
+    """
+    Generate every spec, yielding ``(index, spec, documents, error)`` in
+    completion order.  ``documents`` maps each language issued (two for a
+    bilingual spec) to ``(payload, {format: bytes})``; on failure it is
+    ``None`` and ``error`` holds the exception.
+
+    At most ``BULK_CONCURRENCY`` documents are in progress at a time.
+    Closing the iterator early cancels the outstanding work.
+    """
+    limit = asyncio.Semaphore(_concurrency())
+    tasks = [asyncio.ensure_future(_generate(i, spec, formats, limit)) for i, spec in enumerate(specs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
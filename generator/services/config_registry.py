@@ -0,0 +1,208 @@
+"""
+Registry of the ``config/*.json`` document configuration files.
+
+Each file is parsed once, checked against ``SCHEMAS`` and turned into a
+:class:`Config` holding the raw data plus the lookups request handlers need
+(header lines and titles per language, the circular roster by id), so
+views only do dictionary reads.
+
+Files are re-checked by inode, mtime and size at most every
+``CONFIG_CHECK_INTERVAL`` seconds.  A changed file is parsed and validated
+off to the side and swapped in whole, so readers see either the old or the
+new configuration, never a mix; an edit that does not parse or validate is
+logged and the previous configuration stays in use.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('generator')
+
+FILES = {
+    "office_order": "office_order.json",
+    "circular": "circular.json",
+    "policy": "policy.json",
+    "advertisement": "advertisement.json",
+    "purchase_order": "purschase_order.json",
+}
+
+# Files that may be missing or empty without an error.
+OPTIONAL = {"advertisement", "purchase_order"}
+
+LANGUAGES = ("en", "hi")
+
+# A schema is a type, ``[item schema]`` for a list, or ``{key: schema}`` for a
+# dict with those required keys (other keys are allowed).
+_LINES = [str]
+_HEADER_BLOCK = {"org_name": str, "ministry": str, "government": str}
+_PERSON = {"id": int, "name_en": str, "name_hi": str, "designation_en": str, "designation_hi": str}
+
+SCHEMAS = {
+    "office_order": {"title_en": str, "title_hi": str, "header": {"en": _LINES, "hi": _LINES}},
+    "circular": {"header": {"english": _HEADER_BLOCK, "hindi": _HEADER_BLOCK}, "people": [_PERSON]},
+    "policy": {"title_en": str, "title_hi": str, "header": {"en": _LINES, "hi": _LINES}},
+    "advertisement": dict,
+    "purchase_order": dict,
+}
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration file does not match its schema."""
+
+
+def _check(value, schema, path):
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            raise ConfigError(f"{path}: expected an object")
+        for key, item in schema.items():
+            if key not in value:
+                raise ConfigError(f"{path}.{key}: missing")
+            _check(value[key], item, f"{path}.{key}")
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            raise ConfigError(f"{path}: expected a list")
+        for index, item in enumerate(value):
+            _check(item, schema[0], f"{path}[{index}]")
+    elif not isinstance(value, schema) or (schema is int and isinstance(value, bool)):
+        raise ConfigError(f"{path}: expected {schema.__name__}")
+
+
+def validate(name, data):
+    """Check ``data`` against the schema of ``name``; raises :class:`ConfigError`."""
+    _check(data, SCHEMAS[name], name)
+    if name == "circular":
+        ids = [person["id"] for person in data["people"]]
+        if len(ids) != len(set(ids)):
+            raise ConfigError("circular.people: duplicate id")
+
+
+def _header_lines(name, data, lang):
+    header = data.get("header", {})
+    if name == "circular":
+        block = header.get("hindi" if lang == "hi" else "english", {})
+        return tuple(block.get(key, "") for key in _HEADER_BLOCK)
+    lines = tuple(header.get(lang, ()))
+    if name == "policy":
+        # Policy letterheads always have organisation, ministry and government lines.
+        return (lines + ("", "", ""))[:3]
+    return lines
+
+
+class Config:
+    """One validated configuration file and the lookups built from it (read-only)."""
+
+    def __init__(self, name, data, signature=None):
+        self.name = name
+        self.data = data
+        self.signature = signature
+        self.headers = {lang: _header_lines(name, data, lang) for lang in LANGUAGES}
+        self.titles = {lang: data.get(f"title_{lang}") for lang in LANGUAGES}
+        self.people = tuple(data.get("people", ()))
+        # Form posts carry ids as strings.
+        self.people_by_id = {str(person["id"]): person for person in self.people}
+
+    def header(self, lang):
+        return self.headers["hi" if lang == "hi" else "en"]
+
+    def title(self, lang):
+        return self.titles["hi" if lang == "hi" else "en"]
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class ConfigRegistry:
+    """Validated configuration files, reloaded when they change on disk."""
+
+    def __init__(self, config_dir, check_interval=2.0):
+        self.config_dir = str(config_dir)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._configs = {}
+        self._checked_at = None
+        self.version = ""
+
+    def _path(self, name):
+        return os.path.join(self.config_dir, FILES[name])
+
+    def _load(self, name, signature):
+        path = self._path(name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = f.read()
+            data = json.loads(raw) if raw.strip() or name not in OPTIONAL else {}
+            validate(name, data)
+        except FileNotFoundError:
+            if name not in OPTIONAL:
+                logger.error("%s not found at %s", FILES[name], path)
+            data = {}
+        except (OSError, ValueError) as exc:
+            previous = self._configs.get(name)
+            logger.error(
+                "Invalid %s (%s); %s", FILES[name], exc,
+                "keeping the previous version" if previous and previous.data else "using an empty configuration",
+            )
+            return Config(name, previous.data if previous else {}, signature)
+        return Config(name, data, signature)
+
+    def refresh(self, force=False):
+        """Reload the files whose inode, mtime or size changed since the last check."""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            configs = dict(self._configs)
+            changed = []
+            for name in FILES:
+                signature = _stat(self._path(name))
+                current = configs.get(name)
+                if force or current is None or current.signature != signature:
+                    configs[name] = self._load(name, signature)
+                    changed.append(name)
+            if changed:
+                # One assignment: readers see the old or the new set, never a mix.
+                self._configs = configs
+                self.version = hashlib.sha256(
+                    repr([configs[name].signature for name in FILES]).encode("utf-8")
+                ).hexdigest()[:16]
+                logger.info("Configuration loaded (%s; version %s).", ", ".join(changed), self.version)
+
+    def get(self, name):
+        """The current :class:`Config` for ``name``."""
+        self.refresh()
+        return self._configs[name]
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_registry = None
+
+
+def get_config_registry():
+    """Return (and lazily load) the process-wide configuration registry."""
+    global _registry
+    if _registry is None:
+        registry = ConfigRegistry(
+            os.path.join(settings.BASE_DIR, "config"),
+            float(getattr(settings, "CONFIG_CHECK_INTERVAL", 2.0)),
+        )
+        registry.refresh(force=True)
+        _registry = registry
+    return _registry
+
+
+def get_config(name):
+    """Shortcut for ``get_config_registry().get(name)``."""
+    return get_config_registry().get(name)
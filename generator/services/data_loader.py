@@ -1,74 +1,40 @@
 """
 Data Loader Service for JSON configuration files.
+
+Thin accessors over :mod:`.config_registry`, which validates the files and
+reloads them when they change; new code should use ``get_config(name)``
+and its precomputed lookups instead of walking these dicts.
 """
-import json
-import os
 import logging
-from functools import lru_cache
-from django.conf import settings
+
+from .config_registry import get_config
 
 logger = logging.getLogger('generator')
 
 
 # ------------------------------------------------------------------
-# Lazy-loaded JSON data
+# Raw configuration data (read-only)
 # ------------------------------------------------------------------
-@lru_cache(maxsize=1)
 def get_office_order_data():
     """Load office order configuration data."""
-    path = os.path.join(settings.BASE_DIR, "config", "office_order.json")
-    try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("office_order.json not found at %s", path)
-        return {}
+    return get_config("office_order").data
 
 
-@lru_cache(maxsize=1)
 def get_circular_data():
     """Load circular configuration data."""
-    path = os.path.join(settings.BASE_DIR, "config", "circular.json")
-    try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("circular.json not found at %s", path)
-        return {}
+    return get_config("circular").data
 
 
-@lru_cache(maxsize=1)
 def get_policy_data():
     """Load policy configuration data."""
-    path = os.path.join(settings.BASE_DIR, "config", "policy.json")
-    try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("policy.json not found at %s", path)
-        return {}
+    return get_config("policy").data
 
 
-@lru_cache(maxsize=1)
 def get_advertisement_data():
     """Load advertisement configuration data."""
-    path = os.path.join(settings.BASE_DIR, "config", "advertisement.json")
-    try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("advertisement.json not found at %s", path)
-        return {}
+    return get_config("advertisement").data
 
 
-@lru_cache(maxsize=1)
 def get_purchase_order_data():
     """Load purchase order configuration data."""
-    path = os.path.join(settings.BASE_DIR, "config", "purschase_order.json")
-    try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("purschase_order.json not found at %s", path)
-        return {}
-
+    return get_config("purchase_order").data
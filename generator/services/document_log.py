@@ -0,0 +1,191 @@
+"""
+Buffered writer for :class:`~generator.models.DocumentLog` records.
+
+Preview requests only append a record to an in-process buffer; a background
+thread writes the buffer with ``bulk_create`` once ``DOCUMENT_LOG_BATCH_SIZE``
+records are waiting or every ``DOCUMENT_LOG_FLUSH_INTERVAL`` seconds, so a
+busy or locked database never shows up in preview latency.
+
+The buffer holds at most ``DOCUMENT_LOG_MAX_BUFFER`` records.  Records that
+do not fit, or whose batch fails to write, are appended to a per-process
+JSON-lines spill file under ``DOCUMENT_LOG_SPILL_DIR``; spill files are
+replayed by the next successful flush of any process.  The buffer is
+flushed once more at interpreter exit.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import DocumentLog
+
+logger = logging.getLogger('generator')
+
+FIELDS = ("document_type", "language", "reference_id", "content")
+
+
+class DocumentLogWriter:
+    """Bounded in-memory queue of log records written in batches."""
+
+    def __init__(self, batch_size, flush_interval, max_buffer, spill_dir):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.batch_size, int(max_buffer))
+        self.spill_dir = str(spill_dir)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # -- producer side ----------------------------------------------------
+    def log(self, document_type, language, reference_id, content):
+        """Queue one record; never touches the database."""
+        record = {
+            "document_type": document_type,
+            "language": language,
+            "reference_id": reference_id,
+            "content": content or "",
+            "created_at": timezone.now().isoformat(),
+        }
+        with self._lock:
+            overflow = len(self._buffer) >= self.max_buffer
+            if not overflow:
+                self._buffer.append(record)
+                pending = len(self._buffer)
+        if overflow:
+            logger.warning("Document log buffer full; spilling record to disk")
+            self._spill([record])
+            return
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    # -- flushing ---------------------------------------------------------
+    def _ensure_thread(self):
+        if self.flush_interval is None or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="document-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write everything buffered (and any spilled records); returns the count written."""
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            written = 0
+            if records:
+                if not self._write(records):
+                    self._spill(records)
+                    return 0
+                written += len(records)
+            return written + self._replay_spills()
+
+    def _write(self, records):
+        try:
+            DocumentLog.objects.bulk_create(
+                [
+                    DocumentLog(
+                        created_at=parse_datetime(record["created_at"]),
+                        **{field: record[field] for field in FIELDS},
+                    )
+                    for record in records
+                ],
+                batch_size=500,
+            )
+        except Exception as exc:
+            logger.warning("Failed to write %d document log record(s): %s", len(records), exc)
+            return False
+        return True
+
+    # -- spill files ------------------------------------------------------
+    def _spill_path(self):
+        return os.path.join(self.spill_dir, f"documentlog-{os.getpid()}.jsonl")
+
+    def _spill(self, records):
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(), "a", encoding="utf-8") as fh:
+                for record in records:
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as exc:
+            logger.error("Lost %d document log record(s), spill failed: %s", len(records), exc)
+
+    def _replay_spills(self):
+        written = 0
+        for path in glob.glob(os.path.join(self.spill_dir, "documentlog-*.jsonl")):
+            # Renaming claims the file so concurrent processes never replay it twice.
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                os.rename(path, claimed)
+                with open(claimed, encoding="utf-8") as fh:
+                    records = [json.loads(line) for line in fh if line.strip()]
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not read document log spill %s: %s", path, exc)
+                continue
+            if self._write(records):
+                os.remove(claimed)
+                written += len(records)
+            else:
+                os.rename(claimed, path)
+                break
+        return written
+
+    def close(self):
+        """Stop the flusher thread and write what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """Return (and lazily create) the process-wide document log writer."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DocumentLogWriter(
+                getattr(settings, "DOCUMENT_LOG_BATCH_SIZE", 50),
+                getattr(settings, "DOCUMENT_LOG_FLUSH_INTERVAL", 2.0),
+                getattr(settings, "DOCUMENT_LOG_MAX_BUFFER", 10000),
+                getattr(settings, "DOCUMENT_LOG_SPILL_DIR", settings.BASE_DIR / "cache" / "document_log"),
+            )
+            atexit.register(_writer.close)
+        return _writer
+
+
+def log_document(document_type, language, reference_id, content):
+    """Queue a :class:`DocumentLog` record for the background writer."""
+    get_log_writer().log(document_type, language, reference_id, content)
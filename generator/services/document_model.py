@@ -0,0 +1,174 @@
+"""
+Intermediate document model shared by the PDF and DOCX serializers.
+
+A builder turns the previewed payload of one document type (office order,
+circular, policy; see :mod:`.drafts`) into a plain, picklable dict:
+
+    {
+        "doc_type": "circular",
+        "language": "en",
+        "filename": "Circular",
+        "stylesheets": ["document"],
+        "letterhead": {"logo": True, "lines": [...], "title": "Circular"},
+        "blocks": [{"kind": "date", ...}, {"kind": "body", ...}, ...],
+        "attachment_path": None,
+    }
+
+Block kinds: ``ref_date``, ``title``, ``date``, ``subject``, ``body``,
+``from``, ``to_list``, ``to_table`` and ``attachment``.  Adding a document
+type means registering one more builder with :func:`builder`.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+BUILDERS = {}
+
+MODEL_CACHE_SIZE = 256
+
+
+def builder(doc_type):
+    """Register the decorated function as the model builder for ``doc_type``."""
+    def register(func):
+        BUILDERS[doc_type] = func
+        return func
+    return register
+
+
+def _labels(lang, **pairs):
+    """Pick the Hindi or English label for each ``name=(en, hi)`` pair."""
+    index = 1 if lang == "hi" else 0
+    return {name: values[index] for name, values in pairs.items()}
+
+
+def _paragraphs(text):
+    """Split body text into paragraphs on blank lines."""
+    text = (text or "").replace("\r\n", "\n").strip()
+    if not text:
+        return []
+    return [p.strip() for p in text.split("\n\n") if p.strip()]
+
+
+# ------------------------------------------------------------------
+# Builders
+# ------------------------------------------------------------------
+@builder("office_order")
+def build_office_order(payload):
+    lang = payload.get("language", "en")
+    labels = _labels(lang, ref=("Ref:", "सं :"), date=("Date:", "दिनांक :"), to=("To:", "प्रति :"))
+    return {
+        "filename": "Office_Order",
+        "stylesheets": ["document", "office_order"],
+        "letterhead": {"logo": False, "lines": list(payload.get("header") or []), "title": None},
+        "blocks": [
+            {
+                "kind": "ref_date",
+                "reference": f"{labels['ref']} {payload.get('reference', '')}",
+                "date": f"{labels['date']} {payload.get('date', '')}",
+            },
+            {"kind": "title", "text": payload.get("title") or ""},
+            {"kind": "body", "paragraphs": _paragraphs(payload.get("body"))},
+            {"kind": "from", "text": payload.get("from") or ""},
+            {"kind": "to_list", "label": labels["to"], "items": list(payload.get("to") or []), "bullets": False},
+        ],
+    }
+
+
+def _dated_letter(payload, title, recipients):
+    lang = payload.get("language", "en")
+    labels = _labels(lang, date=("Date :", "दिनांक :"), subject=("Subject :", "विषय :"))
+    header = payload.get("header") or {}
+    lines = [header.get("org_name", ""), header.get("ministry", ""), header.get("government", "")]
+    return {
+        "stylesheets": ["document"],
+        "letterhead": {"logo": True, "lines": lines, "title": title},
+        "blocks": [
+            {"kind": "date", "label": labels["date"], "value": payload.get("date") or ""},
+            {"kind": "subject", "label": labels["subject"], "value": payload.get("subject") or ""},
+            {"kind": "body", "paragraphs": _paragraphs(payload.get("body"))},
+            {"kind": "from", "text": payload.get("from") or ""},
+        ] + recipients,
+    }
+
+
+@builder("circular")
+def build_circular(payload):
+    lang = payload.get("language", "en")
+    labels = _labels(
+        lang,
+        title=("Circular", "परिपत्र"),
+        sr=("Sr. No.", "क्र."),
+        name=("Name", "नाम"),
+        sign=("Sign", "हस्ताक्षर"),
+    )
+    name_key = "name_hi" if lang == "hi" else "name_en"
+    rows = [
+        [str(idx), person.get(name_key) or "", ""]
+        for idx, person in enumerate(payload.get("to_people") or [], 1)
+    ]
+    model = _dated_letter(payload, labels["title"], [{
+        "kind": "to_table",
+        "columns": [labels["sr"], labels["name"], labels["sign"]],
+        "widths": [15, 65, 20],
+        "rows": rows,
+    }])
+    model["filename"] = "Circular"
+    return model
+
+
+@builder("policy")
+def build_policy(payload):
+    lang = payload.get("language", "en")
+    labels = _labels(lang, title=("Policy", "नीति"), to=("To :", "प्रति :"), attached=("Attached :", "संलग्न :"))
+    model = _dated_letter(payload, labels["title"], [
+        {
+            "kind": "to_list",
+            "label": labels["to"],
+            "items": list(payload.get("to_designations") or []),
+            "bullets": True,
+        },
+        {"kind": "attachment", "label": labels["attached"], "name": payload.get("attached_pdf_name") or ""},
+    ])
+    model["filename"] = "Policy"
+    model["attachment_path"] = payload.get("uploaded_pdf_path")
+    return model
+
+
+# ------------------------------------------------------------------
+# Cached model construction
+# ------------------------------------------------------------------
+_models = OrderedDict()
+_lock = threading.Lock()
+
+
+def _payload_key(doc_type, payload):
+    blob = json.dumps([doc_type, payload], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def build_model(doc_type, payload):
+    """
+    Return the intermediate model for ``payload``, reusing a cached copy when
+    the same payload was built recently (so a second format costs only
+    serialization).  Raises ``KeyError`` for unknown document types.
+    """
+    key = _payload_key(doc_type, payload)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
+    model = {
+        "doc_type": doc_type,
+        "language": payload.get("language", "en"),
+        "attachment_path": None,
+    }
+    model.update(BUILDERS[doc_type](payload))
+
+    with _lock:
+        _models[key] = model
+        while len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+    return model
@@ -0,0 +1,129 @@
+"""
+Prebuilt DOCX letterhead templates.
+
+For every (document type, language) a base ``.docx`` is built once with the
+page margins, logo, bold centred header lines, title and paragraph styles
+already in place, and kept in memory as bytes.  Each request clones it with
+``new_document()`` and only appends its variable parts.  Bases are rebuilt
+when the asset registry version changes (for example a new logo).
+"""
+import logging
+import threading
+from io import BytesIO
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Inches, Pt
+
+from .assets import LOGO_PRINT_HEIGHT_IN, get_asset_registry
+from .config_registry import get_config, get_config_registry
+
+logger = logging.getLogger('generator')
+
+HEADER_STYLE = "Letterhead Header"
+TITLE_STYLE = "Letterhead Title"
+
+
+# ------------------------------------------------------------------
+# Letterhead content per document type
+# ------------------------------------------------------------------
+def _office_order_header(lang):
+    return get_config("office_order").header(lang)
+
+
+def _circular_header(lang):
+    return get_config("circular").header(lang)
+
+
+def _policy_header(lang):
+    return get_config("policy").header(lang)
+
+
+# (header lines, header font size, logo, title by language)
+LETTERHEADS = {
+    "office_order": (_office_order_header, None, False, None),
+    "circular": (_circular_header, 14, True, {"en": "Circular", "hi": "परिपत्र"}),
+    "policy": (_policy_header, 14, True, {"en": "Policy", "hi": "नीति"}),
+}
+
+
+# ------------------------------------------------------------------
+# Base document builder
+# ------------------------------------------------------------------
+def _add_styles(doc, header_size):
+    styles = doc.styles
+
+    header = styles.add_style(HEADER_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    header.base_style = styles["Normal"]
+    header.font.bold = True
+    if header_size:
+        header.font.size = Pt(header_size)
+    header.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    title = styles.add_style(TITLE_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    title.base_style = styles["Normal"]
+    title.font.bold = True
+    title.font.underline = True
+    title.font.size = Pt(16)
+    title.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def build_base(doc_type, lang):
+    """Build the letterhead base for ``doc_type``/``lang`` and return its bytes."""
+    header_lines, header_size, with_logo, titles = LETTERHEADS[doc_type]
+    doc = Document()
+    _add_styles(doc, header_size)
+
+    for section in doc.sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1)
+        section.right_margin = Inches(1)
+
+    if with_logo:
+        logo_stream = get_asset_registry().logo_stream()
+        if logo_stream is not None:
+            logo_paragraph = doc.add_paragraph()
+            logo_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            logo_paragraph.add_run().add_picture(logo_stream, height=Inches(LOGO_PRINT_HEIGHT_IN))
+            doc.add_paragraph()
+
+    for line in header_lines(lang):
+        doc.add_paragraph(line, style=HEADER_STYLE)
+
+    if titles:
+        doc.add_paragraph(titles.get(lang, titles["en"]), style=TITLE_STYLE)
+
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+# ------------------------------------------------------------------
+# In-memory template cache
+# ------------------------------------------------------------------
+_bases = {}
+_lock = threading.Lock()
+
+
+def get_base(doc_type, lang):
+    """Return the cached base bytes for ``doc_type``/``lang``, building on demand."""
+    key = (doc_type, lang, get_asset_registry().version, get_config_registry().version)
+    base = _bases.get(key)
+    if base is None:
+        with _lock:
+            base = _bases.get(key)
+            if base is None:
+                # Drop bases built for older asset or configuration versions.
+                for stale in [k for k in _bases if k[:2] == key[:2]]:
+                    del _bases[stale]
+                base = build_base(doc_type, lang)
+                _bases[key] = base
+                logger.info("Built DOCX letterhead base for %s/%s.", doc_type, lang)
+    return base
+
+
+def new_document(doc_type, lang):
+    """Clone the letterhead base for ``doc_type``/``lang`` into a new Document."""
+    return Document(BytesIO(get_base(doc_type, lang)))
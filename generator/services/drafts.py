@@ -0,0 +1,74 @@
+"""
+Server-side store for previewed document payloads.
+
+A preview's payload (header lines, body, bilingual recipient lists, upload
+path) is written once as a :class:`~generator.models.DocumentDraft` -
+compact JSON, zlib-compressed, under a short random id.  The session only
+maps each document type to its current draft id, so session reads and
+writes stay the same small size whatever the document.
+
+Drafts expire ``DOCUMENT_DRAFT_TTL_HOURS`` after the preview; a new
+preview of the same type replaces the session's previous draft.
+``manage.py purge_drafts`` deletes expired rows.
+"""
+import json
+import secrets
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import DocumentDraft
+
+SESSION_KEY = "drafts"
+DOC_TYPES = ("office_order", "circular", "policy")
+
+
+def _ttl():
+    return timedelta(hours=float(getattr(settings, "DOCUMENT_DRAFT_TTL_HOURS", 24)))
+
+
+def encode(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def save_draft(session, doc_type, data):
+    """Store ``data`` as the session's current ``doc_type`` draft and return its id."""
+    drafts = dict(session.get(SESSION_KEY) or {})
+    now = timezone.now()
+    draft = DocumentDraft.objects.create(
+        id=secrets.token_urlsafe(16),
+        doc_type=doc_type,
+        data=encode(data),
+        created_at=now,
+        expires_at=now + _ttl(),
+    )
+    previous = drafts.get(doc_type)
+    if previous:
+        DocumentDraft.objects.filter(pk=previous).delete()
+    drafts[doc_type] = draft.pk
+    session[SESSION_KEY] = drafts
+    return draft.pk
+
+
+def load_draft(session, doc_type):
+    """The session's current ``doc_type`` payload, or ``None`` if there is none or it expired."""
+    draft_id = (session.get(SESSION_KEY) or {}).get(doc_type)
+    if not draft_id:
+        return None
+    blob = (
+        DocumentDraft.objects.filter(pk=draft_id, doc_type=doc_type, expires_at__gt=timezone.now())
+        .values_list("data", flat=True)
+        .first()
+    )
+    return None if blob is None else decode(blob)
+
+
+def purge():
+    """Delete expired drafts; returns how many were removed."""
+    return DocumentDraft.objects.filter(expires_at__lte=timezone.now()).delete()[0]
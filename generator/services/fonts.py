@@ -0,0 +1,235 @@
+"""
+Embedded fonts for Hindi PDF output.
+
+Hindi documents are set in the fonts shipped under ``generator/fonts/``
+(Noto Serif Devanagari regular and bold, which carry Latin glyphs too)
+instead of whatever fontconfig finds on the host.  The files are read once
+per process; renderer workers preload them at start-up.
+
+Each document gets ``@font-face`` rules pointing at subsets cut to its
+characters:
+
+* a subset is keyed by font file and code point set, and kept in a small
+  in-process LRU and in a disk cache of its own (``FONT_SUBSET_CACHE_DIR``,
+  bounded by ``FONT_SUBSET_CACHE_MAX_BYTES``) that PDF traffic cannot evict,
+  so repeated renders of near-identical text reuse the same font data
+  instead of subsetting again;
+* printable ASCII is always included, so only the Devanagari in the text
+  varies the key;
+* OpenType layout closure keeps the conjuncts, half forms and vowel signs
+  the shaper produces from those characters.
+
+When the subsets cover all of the text, :class:`EmbeddedFonts` says so and
+the PDF is written with ``full_fonts``: WeasyPrint then embeds the cached
+subset as is instead of subsetting fonts again on every ``write_pdf``.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+
+from django.conf import settings
+
+from .render_cache import RenderCache
+
+logger = logging.getLogger('generator')
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+
+# Face name -> (file under FONT_DIR, CSS font-weight).
+FACES = {
+    "regular": ("NotoSerifDevanagari-Regular.ttf", 400),
+    "bold": ("NotoSerifDevanagari-Bold.ttf", 700),
+}
+
+# Always in every subset: printable ASCII, plus the joiners and the dotted
+# circle the shaper may insert while setting Devanagari.
+BASE_CODEPOINTS = frozenset(range(0x20, 0x7F)) | {0x200C, 0x200D, 0x25CC}
+
+# Characters that never need a glyph.
+_IGNORED = frozenset("\n\r\t\f\u00ad")
+
+# Subset URLs are answered from memory by the renderer's url_fetcher.
+URL_PREFIX = "file:///__embedded_fonts__/"
+
+EmbeddedFonts = namedtuple("EmbeddedFonts", "key css complete")
+EmbeddedFonts.__doc__ = """
+``@font-face`` stylesheet for one glyph set.  ``complete`` is true when the
+subsets cover every character of the text, so no fallback font is needed.
+"""
+
+
+def model_text(model):
+    """All text a document model puts on the page."""
+    parts = []
+
+    def walk(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                walk(item)
+
+    walk(model.get("letterhead"))
+    walk(model.get("blocks"))
+    return "".join(parts)
+
+
+def _subset(data, codepoints):
+    from fontTools import subset
+
+    options = subset.Options(hinting=False, notdef_outline=True)
+    font = subset.load_font(BytesIO(data), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    out = BytesIO()
+    subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+class _Font:
+    """One shipped font file: its bytes, digest and character coverage."""
+
+    def __init__(self, name, path, weight):
+        from fontTools.ttLib import TTFont
+
+        self.name = name
+        self.weight = weight
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.digest = hashlib.sha256(self.data).hexdigest()[:16]
+        self.codepoints = frozenset(TTFont(BytesIO(self.data), lazy=True).getBestCmap())
+
+
+class FontRegistry:
+    """The shipped fonts and a cache of their subsets (thread-safe)."""
+
+    def __init__(self, font_dir=FONT_DIR, max_subsets=64, disk_cache=None):
+        self.font_dir = str(font_dir)
+        self.max_subsets = max_subsets
+        self.disk_cache = disk_cache
+        self._fonts = None
+        self._subsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -- loading --------------------------------------------------------
+    def fonts(self):
+        """``{face: _Font}`` for the shipped faces that could be read."""
+        if self._fonts is None:
+            with self._lock:
+                if self._fonts is None:
+                    fonts = {}
+                    for name, (filename, weight) in FACES.items():
+                        path = os.path.join(self.font_dir, filename)
+                        try:
+                            fonts[name] = _Font(name, path, weight)
+                        except (OSError, ImportError) as exc:
+                            logger.warning("Font %s not available (%s); using system fonts.", path, exc)
+                    self._fonts = fonts
+        return self._fonts
+
+    @property
+    def version(self):
+        """Digest of the shipped font files; part of the PDF cache key."""
+        return ",".join(font.digest for font in self.fonts().values())
+
+    def preload(self, text=""):
+        """Read the font files now and, with ``text``, prepare its subsets."""
+        fonts = self.fonts()
+        if text:
+            self.embed(text)
+        return len(fonts)
+
+    # -- subsets --------------------------------------------------------
+    def _subset_key(self, font, codepoints):
+        blob = font.digest + ":" + ",".join(f"{cp:x}" for cp in sorted(codepoints))
+        return hashlib.sha256(blob.encode("ascii")).hexdigest()
+
+    def subset(self, font, codepoints):
+        """``(key, bytes)`` of ``font`` cut to ``codepoints``, from cache when possible."""
+        key = self._subset_key(font, codepoints)
+        with self._lock:
+            data = self._subsets.get(key)
+            if data is not None:
+                self._subsets.move_to_end(key)
+                return key, data
+        data = self.disk_cache.get(key) if self.disk_cache is not None else None
+        if data is None:
+            data = _subset(font.data, codepoints)
+            if self.disk_cache is not None:
+                self.disk_cache.set(key, data)
+        with self._lock:
+            self._subsets[key] = data
+            while len(self._subsets) > self.max_subsets:
+                self._subsets.popitem(last=False)
+        return key, data
+
+    def embed(self, text):
+        """
+        :class:`EmbeddedFonts` for ``text``, or ``None`` when the shipped
+        fonts are unavailable.
+        """
+        fonts = self.fonts()
+        if not fonts:
+            return None
+        used = {ord(char) for char in text if char not in _IGNORED}
+        rules, keys, complete = [], [], True
+        for font in fonts.values():
+            complete = complete and used <= font.codepoints
+            key, _data = self.subset(font, (used | BASE_CODEPOINTS) & font.codepoints)
+            keys.append(key)
+            rules.append((font, key))
+        key = hashlib.sha256("".join(keys).encode("ascii")).hexdigest()[:16]
+        # One family per glyph set: fontconfig must never pick another
+        # document's subset for this one.
+        family = f"Embedded {key}"
+        css = [
+            f'@font-face {{ font-family: "{family}"; src: url("{URL_PREFIX}{subset_key}.ttf"); '
+            f'font-weight: {font.weight}; }}'
+            for font, subset_key in rules
+        ]
+        css.append(f'html body {{ font-family: "{family}", serif; }}')
+        return EmbeddedFonts(key, "\n".join(css), complete)
+
+    def fetch(self, url):
+        """Answer a WeasyPrint URL fetch for a subset, or ``None`` if unknown."""
+        if not url.startswith(URL_PREFIX):
+            return None
+        key = url[len(URL_PREFIX):].rsplit(".", 1)[0]
+        with self._lock:
+            data = self._subsets.get(key)
+        if data is None and self.disk_cache is not None:
+            data = self.disk_cache.get(key)
+        if data is None:
+            return None
+        return {"string": data, "mime_type": "font/ttf", "redirected_url": url}
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_font_registry():
+    """Return (and lazily create) the process-wide font registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                disk_cache = RenderCache(
+                    getattr(settings, "FONT_SUBSET_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache", "fonts")),
+                    getattr(settings, "FONT_SUBSET_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                )
+                _registry = FontRegistry(
+                    max_subsets=int(getattr(settings, "FONT_SUBSET_CACHE_SIZE", 64)),
+                    disk_cache=disk_cache,
+                )
+    return _registry
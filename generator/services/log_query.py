@@ -0,0 +1,129 @@
+"""
+Filtered, keyset-paginated listing of :class:`~generator.models.DocumentLog`.
+
+Rows are returned newest first, ordered by ``(created_at, id)``.  Instead of
+an ``OFFSET`` (which reads and discards every earlier row) each page ends
+with an opaque cursor holding the last row's ``(created_at, id)``; the next
+page starts strictly after it.  Together with the ``(filter, created_at)``
+indexes every page is a bounded index range scan, so page 1 and page 10,000
+cost the same.
+"""
+import base64
+import binascii
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ..models import DocumentLog
+from .payloads import LOG_TYPES
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+FIELDS = ("id", "document_type", "language", "reference_id", "created_at")
+
+
+class LogQueryError(ValueError):
+    """Raised for an invalid filter, limit or cursor."""
+
+
+# ------------------------------------------------------------------
+# Cursors
+# ------------------------------------------------------------------
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        stamp, pk = raw.split("|")
+        created_at = parse_datetime(stamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise LogQueryError("Invalid cursor") from None
+    if created_at is None:
+        raise LogQueryError("Invalid cursor")
+    return created_at, pk
+
+
+# ------------------------------------------------------------------
+# Filters
+# ------------------------------------------------------------------
+def _moment(value, name):
+    """Parse a date or datetime filter into an aware datetime."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise LogQueryError(f"Invalid {name} {value!r}")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def resolve_document_type(value):
+    """``DocumentLog.document_type`` for a key (``circular``) or label (``Circular``)."""
+    if value in LOG_TYPES:
+        return LOG_TYPES[value]
+    if value in dict(DocumentLog.DOCUMENT_TYPES):
+        return value
+    raise LogQueryError(f"Unknown document type {value!r}")
+
+
+def filter_logs(params, queryset=None):
+    """
+    Apply the filters in ``params`` (a dict or ``QueryDict``):
+    ``type`` (``circular`` or ``Circular``), ``language``, ``reference``
+    (exact), ``since`` (inclusive) and ``until`` (exclusive) as ISO dates
+    or datetimes.
+    """
+    queryset = DocumentLog.objects.all() if queryset is None else queryset
+    if params.get("type"):
+        queryset = queryset.filter(document_type=resolve_document_type(params["type"]))
+    if params.get("language"):
+        queryset = queryset.filter(language=params["language"])
+    if params.get("reference"):
+        queryset = queryset.filter(reference_id=params["reference"])
+    if params.get("since"):
+        queryset = queryset.filter(created_at__gte=_moment(params["since"], "since"))
+    if params.get("until"):
+        queryset = queryset.filter(created_at__lt=_moment(params["until"], "until"))
+    return queryset
+
+
+def page_queryset(params, queryset=None):
+    """The ordered, filtered queryset for one page and the page size."""
+    try:
+        limit = int(params.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise LogQueryError("Invalid limit") from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise LogQueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    queryset = filter_logs(params, queryset)
+    if params.get("cursor"):
+        created_at, pk = decode_cursor(params["cursor"])
+        # Range on created_at (index friendly), then drop the rows of the
+        # boundary timestamp already returned.
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    return queryset.order_by("-created_at", "-id"), limit
+
+
+def page_logs(params, queryset=None):
+    """
+    One page of filtered logs: ``{"results": [...], "next_cursor": str|None}``.
+
+    ``limit`` (default 50, at most 200) sets the page size; ``cursor`` is
+    the ``next_cursor`` of the previous page.
+    """
+    queryset, limit = page_queryset(params, queryset)
+    rows = list(queryset.values(*FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"results": rows, "next_cursor": next_cursor}
@@ -0,0 +1,82 @@
+"""
+Document payloads for each document type.
+
+The preview views and the bulk API both turn user input into the payload
+dict that is kept as a draft (see :mod:`.drafts`) and fed to the rendering
+engine; the
+builders here are the single place that shape is defined.
+"""
+from django.utils import timezone
+
+from ..utils_new.formatters import format_date_ddmmyyyy, safe_designation
+from .config_registry import get_config
+from .recipients import get_recipient_directory
+
+
+def _date(raw_date):
+    return format_date_ddmmyyyy(raw_date) if raw_date else timezone.now().strftime("%d-%m-%Y")
+
+
+def office_order_payload(lang, raw_date, reference, body, from_position, to_recipients):
+    office_order = get_config("office_order")
+    if not reference:
+        reference = (
+            "बायसेग-एन/कार्यालय आदेश/2026/"
+            if lang == "hi"
+            else "BISAG-N/Office Order/2026/"
+        )
+    return {
+        "language": lang,
+        "header": list(office_order.header(lang)),
+        "title": office_order.title(lang),
+        "reference": reference,
+        "date": _date(raw_date),
+        "body": (body or "").strip(),
+        "from": safe_designation(from_position, lang),
+        "to": [safe_designation(x, lang) for x in to_recipients],
+    }
+
+
+def circular_payload(lang, raw_date, subject, body, from_position, to_ids):
+    circular = get_config("circular")
+    org_name, ministry, government = circular.header(lang)
+    return {
+        "language": lang,
+        "header": {"org_name": org_name, "ministry": ministry, "government": government},
+        "date": _date(raw_date),
+        "subject": subject,
+        "body": body,
+        "from": safe_designation(from_position, lang),
+        "to_people": get_recipient_directory().resolve(to_ids),
+    }
+
+
+def policy_payload(lang, raw_date, subject, body, from_position, to_recipients,
+                   attached_pdf_name="", attachment_id=None, pdf_path=None):
+    org_name, ministry, government = get_config("policy").header(lang)
+    return {
+        "language": lang,
+        "header": {"org_name": org_name, "ministry": ministry, "government": government},
+        "date": _date(raw_date),
+        "subject": subject,
+        "body": body,
+        "from": safe_designation(from_position, lang),
+        "to_designations": [safe_designation(x, lang) for x in to_recipients],
+        "attached_pdf_name": attached_pdf_name,
+        "uploaded_pdf_path": pdf_path,
+        "attachment_id": attachment_id,
+    }
+
+
+# Log label and DocumentLog reference for each type.
+LOG_TYPES = {
+    "office_order": "Office Order",
+    "circular": "Circular",
+    "policy": "Policy",
+}
+
+
+def reference_id(doc_type, payload):
+    if doc_type == "office_order":
+        return payload["reference"]
+    return f"{doc_type.upper()}-{payload['date']}"
@@ -0,0 +1,142 @@
+"""
+Low-memory merge of a rendered cover page with an uploaded PDF attachment.
+
+Instead of copying the attachment page by page into a new writer, the
+attachment's whole page tree is grafted under the writer's root ``/Pages``
+node as one subtree; inherited page attributes (resources, media box,
+rotation) therefore travel with it unchanged.  The merged document is
+written straight to a temporary file which the view serves with a
+``FileResponse``, so the merged bytes are never held in memory.
+
+Merge memory is not measured or capped at run time; it is bounded only
+indirectly, by ``POLICY_ATTACHMENT_MAX_BYTES`` and
+``POLICY_ATTACHMENT_MAX_PAGES``.  ``PdfReader`` still parses the whole
+attachment and the graft clones every page object, so the heap peak is
+about 12 KiB per page plus up to four times the attachment's size; the
+tests check a fixture at both limits against ``PEAK_PER_PAGE`` and
+``PEAK_PER_BYTE``.  ``PDF_MERGE_TRACE_MEMORY`` is a diagnostic only: it
+measures each merge with ``tracemalloc``, which slows it down, and logs the
+peak against ``PDF_MERGE_MEMORY_BUDGET``.
+"""
+import logging
+import os
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import NameObject, NumberObject
+
+logger = logging.getLogger('generator')
+
+
+class AttachmentTooLarge(Exception):
+    """Raised when an attachment exceeds the configured size or page limit."""
+
+
+# Upper bounds of the merge heap peak: bytes per attachment page plus bytes
+# per attachment byte.
+PEAK_PER_PAGE = 16 * 1024
+PEAK_PER_BYTE = 5
+
+
+def max_attachment_bytes():
+    return int(getattr(settings, "POLICY_ATTACHMENT_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def max_attachment_pages():
+    return int(getattr(settings, "POLICY_ATTACHMENT_MAX_PAGES", 500))
+
+
+# ------------------------------------------------------------------
+# Memory measurement
+# ------------------------------------------------------------------
+@contextmanager
+def measure_peak_memory(label):
+    """
+    Log the Python heap peak of the enclosed block when
+    ``PDF_MERGE_TRACE_MEMORY`` is on (a diagnostic; nothing is enforced).
+    """
+    if not getattr(settings, "PDF_MERGE_TRACE_MEMORY", False):
+        yield
+        return
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        _current, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+        budget = int(getattr(settings, "PDF_MERGE_MEMORY_BUDGET", 64 * 1024 * 1024))
+        log = logger.warning if peak > budget else logger.info
+        log("%s peak memory: %.1f MiB (budget %.1f MiB)", label, peak / 2**20, budget / 2**20)
+
+
+# ------------------------------------------------------------------
+# Merge
+# ------------------------------------------------------------------
+def _graft_page_tree(writer, reader):
+    """Attach ``reader``'s page tree as a single kid of the writer's root node."""
+    subtree = reader.trailer["/Root"]["/Pages"].get_object().clone(writer)
+    subtree_ref = subtree.indirect_reference or writer._add_object(subtree)
+
+    root_pages = writer.get_object(writer._pages)
+    subtree[NameObject("/Parent")] = writer._pages
+    root_pages["/Kids"].append(subtree_ref)
+    root_pages[NameObject("/Count")] = NumberObject(root_pages["/Count"] + subtree["/Count"])
+
+
+def merge_attachment(cover_pdf, attachment_path):
+    """
+    Merge ``cover_pdf`` (bytes) with the PDF at ``attachment_path``.
+
+    Returns an open temporary file positioned at the start of the merged
+    document; the caller owns it (``FileResponse`` closes it when done).
+    Raises :class:`AttachmentTooLarge` if the attachment is over limits.
+    """
+    size = os.path.getsize(attachment_path)
+    if size > max_attachment_bytes():
+        raise AttachmentTooLarge(f"attachment is {size} bytes")
+
+    with measure_peak_memory("Policy PDF merge"):
+        attachment = PdfReader(attachment_path)
+        page_count = len(attachment.pages)
+        if page_count > max_attachment_pages():
+            raise AttachmentTooLarge(f"attachment has {page_count} pages")
+
+        writer = PdfWriter()
+        for page in PdfReader(BytesIO(cover_pdf)).pages:
+            writer.add_page(page)
+        _graft_page_tree(writer, attachment)
+
+        output = tempfile.TemporaryFile(dir=getattr(settings, "PDF_MERGE_TMP_DIR", None))
+        try:
+            writer.write(output)
+            output.seek(0)
+        except BaseException:
+            output.close()
+            raise
+    return output
+
+
+def merge_uploaded(cover_pdf, attachment_path):
+    """
+    :func:`merge_attachment` for the policy downloads: returns the merged
+    file, or ``None`` when there is no upload or it cannot be merged (the
+    caller then serves the cover page alone).
+    """
+    if not attachment_path or not os.path.exists(attachment_path):
+        return None
+    try:
+        return merge_attachment(cover_pdf, attachment_path)
+    except AttachmentTooLarge as exc:
+        logger.warning("Policy attachment not merged, over limits: %s", exc)
+    except Exception as exc:
+        logger.exception("Error merging PDFs: %s", exc)
+    return None
@@ -0,0 +1,344 @@
+"""
+Pre-warmed WeasyPrint renderer pool.
+
+PDF rendering runs in a fixed set of long-lived worker processes instead of
+the Django request thread.  Each worker imports WeasyPrint, initialises
+fontconfig, and loads the asset registry (letterhead logo and parsed
+stylesheets) once at start-up.
+
+Submission is bounded: at most ``PDF_RENDER_WORKERS + PDF_RENDER_QUEUE_SIZE``
+jobs may be in flight.  Beyond that :class:`RendererBusy` is raised so the
+view can answer 503 instead of queueing without limit.  Each job is waited
+on for ``PDF_RENDER_TIMEOUT`` seconds before :class:`RenderTimeout` is raised.
+The timed-out job's pool is then retired: new jobs go to a fresh pool, the
+other jobs on the old one finish normally, and only after that are its
+remaining workers - the hung ones - stopped.  A pool that breaks anyway is
+replaced and its failed jobs are reported as :class:`RendererBusy`.
+
+Setting ``PDF_RENDER_WORKERS = 0`` renders inline in the calling process
+(useful for tests and single-process development servers).
+
+Jobs may name text to set in the embedded fonts (see :mod:`.fonts`); the
+worker turns it into an ``@font-face`` stylesheet, parsed and registered
+with fontconfig once per glyph set.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .assets import STYLESHEETS, get_asset_registry
+from .fonts import get_font_registry
+
+logger = logging.getLogger('generator')
+
+
+class RendererBusy(Exception):
+    """Raised when the render queue is saturated."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render job does not finish within its timeout."""
+
+
+# Embedded font stylesheets kept registered on one FontConfiguration; the
+# faces are never unregistered, so a fresh configuration is started beyond
+# this many.
+MAX_FONT_FACES = 256
+
+# ------------------------------------------------------------------
+# Worker-side state (one copy per worker process)
+# ------------------------------------------------------------------
+_font_config = None
+_font_sheets = OrderedDict()
+
+
+def _url_fetcher(url, *args, **kwargs):
+    from weasyprint import default_url_fetcher
+
+    asset = get_asset_registry().fetch(url) or get_font_registry().fetch(url)
+    if asset is not None:
+        return asset
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def _init_worker():
+    """Process initializer: set up Django, fonts and assets once."""
+    global _font_config
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_formal_generator.settings")
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+
+    registry = get_asset_registry()
+    for name in STYLESHEETS:
+        registry.stylesheet(name, _font_config)
+
+    # A throwaway layout pays fontconfig/pango and font loading start-up
+    # costs now rather than on the first real request.
+    warm_up = "warm-up नमस्ते"
+    try:
+        get_font_registry().preload()
+        sheet, complete = _embedded_fonts(warm_up)
+        HTML(string=f"<p>{warm_up}</p>").write_pdf(
+            stylesheets=[sheet] if sheet is not None else [], font_config=_font_config, full_fonts=complete
+        )
+    except Exception as exc:  # pragma: no cover - best effort
+        logger.warning("Renderer warm-up failed: %s", exc)
+
+
+def _embedded_fonts(text):
+    """
+    ``(stylesheet, complete)`` setting ``text`` in the embedded fonts, or
+    ``(None, False)`` when they are unavailable (worker side).
+    """
+    global _font_config
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    fonts = get_font_registry().embed(text)
+    if fonts is None:
+        return None, False
+    sheet = _font_sheets.get(fonts.key)
+    if sheet is None:
+        if len(_font_sheets) >= MAX_FONT_FACES:
+            _font_config = FontConfiguration()
+            _font_sheets.clear()
+        sheet = CSS(string=fonts.css, font_config=_font_config, url_fetcher=_url_fetcher)
+        _font_sheets[fonts.key] = sheet
+    else:
+        _font_sheets.move_to_end(fonts.key)
+    return sheet, fonts.complete
+
+
+def _start_worker(pids):
+    """Process initializer: report this worker's pid, then :func:`_init_worker`."""
+    pids.put(os.getpid())
+    _init_worker()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render_job(template_name, context, stylesheets, options, fonts_text=None):
+    """Render ``template_name`` with ``context`` to PDF bytes (worker side)."""
+    from django.template.loader import render_to_string
+    from weasyprint import HTML
+
+    sheets = []
+    if fonts_text:
+        sheet, complete = _embedded_fonts(fonts_text)
+        if sheet is not None:
+            sheets.append(sheet)
+            # Every glyph comes from the prepared subsets: embed them as is.
+            options = dict(options, full_fonts=complete)
+
+    registry = get_asset_registry()
+    html = render_to_string(template_name, dict(context, logo_path=registry.logo_url))
+    return HTML(
+        string=html,
+        base_url=str(settings.BASE_DIR),
+        url_fetcher=_url_fetcher,
+    ).write_pdf(
+        stylesheets=[registry.stylesheet(name, _font_config) for name in stylesheets] + sheets,
+        font_config=_font_config,
+        **options,
+    )
+
+
+def _render_batch(jobs):
+    """Render several :func:`_render_job` argument tuples in turn (worker side)."""
+    return [_render_job(*job) for job in jobs]
+
+
+# ------------------------------------------------------------------
+# Web-side pool management
+# ------------------------------------------------------------------
+class _Pool:
+    """One generation of the renderer pool: executor, queue slots, jobs."""
+
+    def __init__(self, workers, queue_size):
+        context = multiprocessing.get_context(getattr(settings, "PDF_RENDER_START_METHOD", "spawn"))
+        self._pids = context.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_start_worker,
+            initargs=(self._pids,),
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.futures = set()
+        self.abandoned = set()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = self.executor.submit(fn, *args)
+        with self.lock:
+            self.futures.add(future)
+
+        def done(future):
+            with self.lock:
+                self.futures.discard(future)
+                self.abandoned.discard(future)
+            self.slots.release()
+
+        # The slot is held until the worker is actually done, even if the
+        # caller gives up waiting, so timed-out jobs still count as load.
+        future.add_done_callback(done)
+        return future
+
+    def abandon(self, future):
+        with self.lock:
+            if not future.done():
+                self.abandoned.add(future)
+
+    def stop_workers(self):
+        """Terminate this pool's worker processes that are still alive."""
+        pids = set()
+        while not self._pids.empty():
+            pids.add(self._pids.get())
+        for process in multiprocessing.active_children():
+            if process.pid in pids:
+                process.terminate()
+
+    def reap(self):
+        """Wait for every job nobody gave up on, then stop the workers."""
+        while True:
+            with self.lock:
+                waiting = self.futures - self.abandoned
+            if not waiting:
+                break
+            wait(waiting, timeout=1)
+        self.stop_workers()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _workers():
+    return int(getattr(settings, "PDF_RENDER_WORKERS", os.cpu_count() or 1))
+
+
+def _get_pool():
+    """Return (and lazily start) the shared renderer pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = _workers()
+            _pool = _Pool(workers, int(getattr(settings, "PDF_RENDER_QUEUE_SIZE", workers * 2)))
+            # Start every worker now so the first requests find them warm.
+            for _ in range(workers):
+                _pool.executor.submit(_ping)
+            logger.info("PDF renderer pool started with %d workers.", workers)
+        return _pool
+
+
+def _detach(pool):
+    """Stop handing out ``pool``; false if it was already replaced."""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return False
+        _pool = None
+        return True
+
+
+def _retire(pool):
+    """Replace ``pool``; its running jobs finish before its workers are stopped."""
+    if _detach(pool):
+        pool.executor.shutdown(wait=False)
+        threading.Thread(target=pool.reap, name="pdf-renderer-reaper", daemon=True).start()
+
+
+def shutdown():
+    """Stop the renderer pool (used by tests and management commands)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+        pool.stop_workers()
+
+
+def _run(fn, *args, jobs=1):
+    """Run ``fn(*args)`` on the pool in one slot; ``jobs`` scales the timeout."""
+    if _workers() <= 0:
+        if _font_config is None:
+            _init_worker()
+        return fn(*args)
+
+    pool = _get_pool()
+    if not pool.slots.acquire(blocking=False):
+        raise RendererBusy("PDF render queue is full")
+
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool as exc:
+        pool.slots.release()
+        logger.error("PDF renderer pool is broken; restarting it.")
+        _detach(pool)
+        raise RendererBusy("PDF renderer is restarting") from exc
+    except BaseException:
+        pool.slots.release()
+        raise
+
+    timeout = float(getattr(settings, "PDF_RENDER_TIMEOUT", 30)) * jobs
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        if not future.cancel():
+            # Already running: a cancel does not stop it, so retire the pool.
+            logger.error("PDF render exceeded %gs; replacing the renderer pool.", timeout)
+            pool.abandon(future)
+            _retire(pool)
+        raise RenderTimeout(f"PDF render exceeded {timeout:g}s")
+    except BrokenProcessPool as exc:
+        logger.error("PDF renderer pool is broken; restarting it.")
+        _detach(pool)
+        raise RendererBusy("PDF renderer is restarting") from exc
+
+
+def render_pdf(template_name, context, stylesheets=(), fonts_text=None, **options):
+    """
+    Render ``template_name`` to PDF bytes on the renderer pool.
+
+    ``stylesheets`` names entries of the asset registry (for example
+    ``"circular"``); ``fonts_text`` is the text to set in the embedded
+    fonts, if any; ``options`` are passed through to ``HTML.write_pdf``.
+    Raises :class:`RendererBusy` when the queue is full and
+    :class:`RenderTimeout` when the job takes longer than
+    ``PDF_RENDER_TIMEOUT`` seconds.
+    """
+    return _run(_render_job, template_name, dict(context), list(stylesheets), options, fonts_text)
+
+
+def render_pdf_batch(jobs):
+    """
+    Render ``[(template_name, context, stylesheets, options, fonts_text), ...]``
+    as one pool job and return the PDFs in order.
+
+    The documents share a worker, its fonts and one queue slot (the timeout
+    is ``PDF_RENDER_TIMEOUT`` per document), so related documents such as
+    the two language versions of a bilingual issuance cost one submission.
+    """
+    jobs = [
+        (name, dict(context), list(stylesheets), dict(options), fonts_text)
+        for name, context, stylesheets, options, fonts_text in jobs
+    ]
+    if not jobs:
+        return []
+    return _run(_render_batch, jobs, jobs=len(jobs))
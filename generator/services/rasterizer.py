@@ -0,0 +1,177 @@
+"""
+Page-at-a-time rasterization of policy attachments for DOCX export.
+
+Each page of the attachment is rasterized on its own in a process pool
+(``RASTER_WORKERS``) and encoded straight to PNG or JPEG bytes, so no more
+than a small window of pages is ever held in memory and nothing is written
+to ``MEDIA_ROOT``.  Encoded pages are cached on disk per attachment hash,
+page, DPI and format, so re-downloading the same attachment skips poppler.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+
+from .render_cache import RenderCache
+
+logger = logging.getLogger('generator')
+
+FORMATS = {"png": "PNG", "jpeg": "JPEG"}
+
+
+class RasterizationUnavailable(Exception):
+    """Raised when poppler is not installed or the attachment cannot be read."""
+
+
+def raster_options():
+    """(dpi, fmt, jpeg_quality) from settings."""
+    dpi = int(getattr(settings, "POLICY_DOCX_DPI", 200))
+    fmt = str(getattr(settings, "POLICY_DOCX_IMAGE_FORMAT", "png")).lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in FORMATS:
+        logger.warning("Unsupported POLICY_DOCX_IMAGE_FORMAT %r, using png", fmt)
+        fmt = "png"
+    quality = int(getattr(settings, "POLICY_DOCX_JPEG_QUALITY", 85))
+    return dpi, fmt, quality
+
+
+def attachment_digest(path):
+    """SHA-256 of the attachment contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _page_key(digest, page, dpi, fmt, quality):
+    return hashlib.sha256(f"{digest}:{page}:{dpi}:{fmt}:{quality}".encode("ascii")).hexdigest()
+
+
+# ------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------
+def _rasterize_page(path, page, dpi, fmt, quality):
+    """Rasterize one 1-based ``page`` of ``path`` and return encoded bytes."""
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(path, dpi=dpi, first_page=page, last_page=page)
+    if not images:
+        raise ValueError(f"page {page} produced no image")
+    image = images[0]
+    out = BytesIO()
+    if fmt == "jpeg":
+        image.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+    else:
+        image.save(out, "PNG", dpi=(dpi, dpi))
+    image.close()
+    return out.getvalue()
+
+
+# ------------------------------------------------------------------
+# Web side
+# ------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_cache = None
+
+
+def _workers():
+    return int(getattr(settings, "RASTER_WORKERS", 2))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(
+                getattr(settings, "PDF_RENDER_START_METHOD", "spawn")
+            )
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=context)
+        return _pool
+
+
+def get_raster_cache():
+    """Return (and lazily initialize) the on-disk cache of rasterized pages."""
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(
+            getattr(settings, "RASTER_CACHE_DIR", settings.BASE_DIR / "cache" / "rasters"),
+            getattr(settings, "RASTER_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+        )
+    return _cache
+
+
+def _page_count(path):
+    from PyPDF2 import PdfReader
+
+    try:
+        return len(PdfReader(path).pages)
+    except Exception as exc:
+        raise RasterizationUnavailable(f"cannot read attachment: {exc}") from exc
+
+
+def rasterize_attachment(path, dpi=None, fmt=None):
+    """
+    Yield ``(page_number, image_bytes, fmt)`` for each page of ``path`` in order.
+
+    Pages are rasterized in parallel but yielded one at a time, with at most
+    ``2 * RASTER_WORKERS`` pages in flight.  Pages that fail are logged and
+    skipped; a missing poppler install raises :class:`RasterizationUnavailable`.
+    """
+    from pdf2image.exceptions import PDFInfoNotInstalledError
+
+    default_dpi, default_fmt, quality = raster_options()
+    dpi = dpi or default_dpi
+    fmt = fmt or default_fmt
+    digest = attachment_digest(path)
+    cache = get_raster_cache()
+    pages = _page_count(path)
+
+    workers = _workers()
+    pool = _get_pool() if workers > 0 else None
+    window = max(1, workers * 2)
+    pending = deque()
+    next_page = 1
+
+    def submit(page):
+        key = _page_key(digest, page, dpi, fmt, quality)
+        cached = cache.get(key)
+        if cached is not None or pool is None:
+            return page, key, cached
+        return page, key, pool.submit(_rasterize_page, path, page, dpi, fmt, quality)
+
+    # Pages are cached without evicting; the cache is trimmed once at the end.
+    try:
+        while next_page <= pages or pending:
+            while next_page <= pages and len(pending) < window:
+                pending.append(submit(next_page))
+                next_page += 1
+
+            page, key, result = pending.popleft()
+            try:
+                if result is None:
+                    data = _rasterize_page(path, page, dpi, fmt, quality)
+                elif isinstance(result, bytes):
+                    yield page, result, fmt
+                    continue
+                else:
+                    data = result.result()
+            except PDFInfoNotInstalledError as exc:
+                for _page, _key, other in pending:
+                    if hasattr(other, "cancel"):
+                        other.cancel()
+                raise RasterizationUnavailable("poppler is not installed") from exc
+            except Exception as exc:
+                logger.warning("Image processing error for page %d: %s", page, exc)
+                continue
+            cache.set(key, data, evict=False)
+            yield page, data, fmt
+    finally:
+        cache.trim()
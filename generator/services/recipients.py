@@ -0,0 +1,137 @@
+"""
+Recipient directory for circulars.
+
+Built once per version of the ``circular`` configuration (see
+:mod:`.config_registry`) and holding:
+
+* an id index, so the ids selected in a form resolve in O(k);
+* a sorted word list over ``name_en`` and ``name_hi`` for prefix search
+  (binary search, then a short scan of the matching words);
+* trigram postings over the same words, so a misspelt or mid-word
+  fragment (``kumr``, ``ingh``) still finds the person.
+
+Every query term must match a word of the person's names, by prefix or by
+trigram similarity; prefix matches rank first, then directory order.
+"""
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from ..utils_new.text import words as _words
+from .config_registry import get_config
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Share of a term's trigrams a word must contain to count as a fuzzy match,
+# and the shortest term matched fuzzily (shorter ones are prefix-only).
+TRIGRAM_MIN = 0.5
+FUZZY_MIN_LENGTH = 4
+
+FIELDS = ("id", "name_en", "name_hi", "designation_en", "designation_hi")
+NAME_FIELDS = ("name_en", "name_hi")
+
+
+class RecipientQueryError(ValueError):
+    """Raised for an invalid limit or offset."""
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RecipientDirectory:
+    """Indexed, read-only view of a list of people."""
+
+    def __init__(self, people):
+        self.people = tuple(people)
+        self.by_id = {str(person["id"]): person for person in self.people}
+        words, postings = set(), {}
+        for position, person in enumerate(self.people):
+            for field in NAME_FIELDS:
+                for word in _words(person.get(field)):
+                    words.add((word, position))
+                    for gram in _trigrams(word):
+                        postings.setdefault(gram, set()).add(position)
+        self._words = sorted(words)
+        self._trigrams = postings
+
+    # -- lookups ----------------------------------------------------------
+    def resolve(self, ids):
+        """People for the selected ``ids`` in selection order; unknown ids are skipped."""
+        return [self.by_id[key] for key in dict.fromkeys(map(str, ids)) if key in self.by_id]
+
+    def _prefix(self, term):
+        matches = set()
+        for word, position in self._words[bisect_left(self._words, (term,)):]:
+            if not word.startswith(term):
+                break
+            matches.add(position)
+        return matches
+
+    def _fuzzy(self, term):
+        grams = _trigrams(term)
+        counts = Counter(position for gram in grams for position in self._trigrams.get(gram, ()))
+        return {position: hits / len(grams) for position, hits in counts.items() if hits / len(grams) >= TRIGRAM_MIN}
+
+    def search(self, query, offset=0, limit=DEFAULT_LIMIT):
+        """
+        ``(people, total)`` for ``query``, best first, sliced by
+        ``offset``/``limit``.  An empty query pages through the directory.
+        """
+        terms = _words(query)
+        if not terms:
+            return list(self.people[offset:offset + limit]), len(self.people)
+
+        scores = None
+        for term in terms:
+            term_scores = self._fuzzy(term) if len(term) >= FUZZY_MIN_LENGTH else {}
+            term_scores.update(dict.fromkeys(self._prefix(term), 2.0))
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {position: score + term_scores[position]
+                          for position, score in scores.items() if position in term_scores}
+            if not scores:
+                return [], 0
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return [self.people[position] for position in ranked[offset:offset + limit]], len(ranked)
+
+    def page(self, params):
+        """One JSON page: ``{"results", "total", "next_offset"}`` for query ``params``."""
+        try:
+            limit = int(params.get("limit") or DEFAULT_LIMIT)
+            offset = int(params.get("offset") or 0)
+        except ValueError:
+            raise RecipientQueryError("Invalid limit or offset") from None
+        if not 1 <= limit <= MAX_LIMIT:
+            raise RecipientQueryError(f"limit must be between 1 and {MAX_LIMIT}")
+        if offset < 0:
+            raise RecipientQueryError("offset must not be negative")
+
+        people, total = self.search(params.get("q", ""), offset, limit)
+        return {
+            "results": [{field: person.get(field) for field in FIELDS} for person in people],
+            "total": total,
+            "next_offset": offset + limit if offset + limit < total else None,
+        }
+
+
+# ------------------------------------------------------------------
+# Shared instance, rebuilt when circular.json changes
+# ------------------------------------------------------------------
+_directory = None
+_source = None
+_lock = threading.Lock()
+
+
+def get_recipient_directory():
+    """Return the directory for the current circular configuration."""
+    global _directory, _source
+    config = get_config("circular")
+    if config is not _source:
+        with _lock:
+            if config is not _source:
+                _directory = RecipientDirectory(config.people)
+                _source = config
+    return _directory
@@ -0,0 +1,234 @@
+"""
+Content-addressed render cache for generated PDF documents.
+
+Rendered files are stored on local disk under ``RENDER_CACHE_DIR`` so that
+every worker process on the host shares the same cache.  Entries are keyed
+by a SHA-256 of the template name, the normalized session payload and the
+versions of the assets the render depends on.  The cache is bounded by
+``RENDER_CACHE_MAX_BYTES``; the least recently used entries (by file mtime,
+which is bumped on every hit) are evicted first.
+
+Each process keeps a running byte total of the directory, so a write costs
+no directory scan; the directory is only walked when that total passes the
+budget, and the total is reseeded from disk every ``RESEED_INTERVAL``
+seconds to pick up other processes' writes and evictions.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .assets import get_asset_registry
+
+logger = logging.getLogger('generator')
+
+# Keys that are derived per request and must not influence the cache key.
+VOLATILE_KEYS = ("logo_path", "uploaded_pdf_path", "attachment_id", "attachment_path")
+
+_FILE_SUFFIX = ".bin"
+
+# Seconds before a process recounts the directory instead of trusting its
+# running byte total.
+RESEED_INTERVAL = 300
+
+# Eviction trims the cache to this share of its budget, so a full cache is
+# not walked again on the very next write.
+EVICT_TO = 0.9
+
+
+# ------------------------------------------------------------------
+# Key helpers
+# ------------------------------------------------------------------
+def normalize_payload(payload):
+    """Return a copy of ``payload`` without per-request volatile keys."""
+    return {k: v for k, v in (payload or {}).items() if k not in VOLATILE_KEYS}
+
+
+def asset_versions(template_name):
+    """
+    Version stamp of everything a render depends on: the template name plus
+    the asset registry version (templates, stylesheets and logo).
+    """
+    return [template_name, get_asset_registry().version]
+
+
+def make_key(template_name, payload, versions=(), extra=None):
+    """Stable hash of (template, normalized payload, asset versions, extra)."""
+    blob = json.dumps(
+        {
+            "template": template_name,
+            "payload": normalize_payload(payload),
+            "assets": list(versions),
+            "extra": extra,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------------
+# Disk-backed LRU cache
+# ------------------------------------------------------------------
+class RenderCache:
+    """
+    Bounded, byte-size LRU cache stored as one file per entry.
+
+    Writes go through a temporary file and ``os.replace`` so concurrent
+    readers in other processes never see a partial entry.  Eviction is
+    race tolerant: a file removed by another process is simply skipped.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = int(max_bytes)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = None
+        self._counted_at = 0.0
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small for large caches.
+        return os.path.join(self.directory, key[:2], key + _FILE_SUFFIX)
+
+    def get(self, key):
+        """Return cached bytes for ``key`` or ``None`` on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("Render cache read failed for %s: %s", key, exc)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key, data, evict=True):
+        """
+        Store ``data`` under ``key`` and evict old entries if over budget.
+
+        With ``evict=False`` only the running total is updated; callers
+        writing many entries in a row then call :meth:`trim` once.
+        """
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as exc:
+            logger.warning("Render cache write failed for %s: %s", key, exc)
+            return
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += len(data) - replaced
+        if evict:
+            self.trim()
+
+    def entries(self):
+        """Yield ``(mtime, size, path)`` for every cached entry."""
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(_FILE_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def size(self):
+        return sum(size for _mtime, size, _path in self.entries())
+
+    def trim(self):
+        """:meth:`evict` if the running byte total is over budget (or stale)."""
+        with self._lock:
+            stale = self._bytes is None or time.monotonic() - self._counted_at > RESEED_INTERVAL
+            over = not stale and self._bytes > self.max_bytes
+        return self.evict() if stale or over else 0
+
+    def evict(self):
+        """
+        Recount the cache and, if it is over budget, remove least recently
+        used entries until it fits in ``EVICT_TO`` of the budget.
+        """
+        entries = list(self.entries())
+        total = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        if total > self.max_bytes:
+            total, removed = self._remove_oldest(entries, total)
+        with self._lock:
+            self._bytes = total
+            self._counted_at = time.monotonic()
+        return removed
+
+    def _remove_oldest(self, entries, total):
+        target = self.max_bytes * EVICT_TO
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning("Render cache eviction failed for %s: %s", path, exc)
+                continue
+            total -= size
+            removed += 1
+            if total <= target:
+                break
+        return total, removed
+
+    def clear(self):
+        for _mtime, _size, path in list(self.entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = 0
+            self._counted_at = time.monotonic()
+
+
+# ------------------------------------------------------------------
+# Lazy-loaded shared instance
+# ------------------------------------------------------------------
+_render_cache = None
+
+
+def get_render_cache():
+    """Return (and lazily initialize) the process-wide render cache."""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache(
+            getattr(settings, "RENDER_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache", "renders")),
+            getattr(settings, "RENDER_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+        )
+    return _render_cache
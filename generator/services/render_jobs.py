@@ -0,0 +1,198 @@
+"""
+Database-backed render queue.
+
+Downloads can be queued as :class:`~generator.models.RenderJob` rows and
+rendered by ``manage.py render_worker`` processes instead of the web
+request.  There is no broker: workers claim a job by a conditional
+``UPDATE`` that only succeeds while the job is queued or its previous
+lease has expired, so any number of workers on any host sharing the
+database (and ``MEDIA_ROOT``) can poll the same table.
+
+A claim holds the job for ``RENDER_JOB_LEASE`` seconds and the worker
+renews it every third of that while it renders, so a slow render keeps its
+job.  A worker that dies mid-render simply lets the lease lapse and another
+worker picks the job up.  Each attempt writes its own result file and only
+records it while still holding the lease; a worker that lost the job
+deletes its file instead.
+Failures are retried with exponential backoff up to the job's
+``max_attempts``.  Results are written to ``MEDIA_ROOT/render_jobs`` and
+removed with the job after ``RENDER_JOB_TTL_HOURS``.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import RenderJob
+from .pdf_merge import merge_uploaded
+from .rendering import render
+
+logger = logging.getLogger('generator')
+
+
+def result_dir():
+    return os.path.join(settings.MEDIA_ROOT, "render_jobs")
+
+
+def _lease_seconds():
+    return float(getattr(settings, "RENDER_JOB_LEASE", 120))
+
+
+def _retry_delay(attempts):
+    return min(60, 2 ** attempts)
+
+
+def enqueue(doc_type, payload, fmt):
+    """Queue a render of a previewed ``payload`` and return the job."""
+    return RenderJob.objects.create(
+        doc_type=doc_type,
+        format=fmt,
+        payload=payload,
+        max_attempts=int(getattr(settings, "RENDER_JOB_MAX_ATTEMPTS", 3)),
+    )
+
+
+# ------------------------------------------------------------------
+# Claiming
+# ------------------------------------------------------------------
+def _claimable(now):
+    return Q(status=RenderJob.QUEUED, available_at__lte=now) | Q(
+        status=RenderJob.RUNNING, lease_expires_at__lt=now
+    )
+
+
+def claim(owner, batch=5):
+    """
+    Lease the oldest available job to ``owner``; ``None`` if there is none.
+
+    Candidates are read first and then claimed one at a time with a
+    compare-and-set update, so concurrent workers never run the same job.
+    """
+    now = timezone.now()
+    candidates = (
+        RenderJob.objects.filter(_claimable(now))
+        .order_by("available_at")
+        .values_list("pk", flat=True)[:batch]
+    )
+    for job_id in candidates:
+        claimed = RenderJob.objects.filter(_claimable(now), pk=job_id).update(
+            status=RenderJob.RUNNING,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=_lease_seconds()),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return RenderJob.objects.get(pk=job_id)
+    return None
+
+
+def _settle(job, owner, **fields):
+    """Record the outcome if ``owner`` still holds the lease."""
+    return RenderJob.objects.filter(pk=job.pk, status=RenderJob.RUNNING, lease_owner=owner).update(
+        lease_owner="", lease_expires_at=None, **fields
+    )
+
+
+def _renew_lease(job, owner):
+    """Extend ``owner``'s lease on ``job``; false once another worker has it."""
+    return RenderJob.objects.filter(pk=job.pk, status=RenderJob.RUNNING, lease_owner=owner).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=_lease_seconds())
+    )
+
+
+@contextmanager
+def _heartbeat(job, owner):
+    """Renew the lease on ``job`` from a background thread for the block."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(_lease_seconds() / 3):
+                if not _renew_lease(job, owner):
+                    logger.warning("Render job %s lost its lease while rendering", job.pk)
+                    return
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"render-job-{job.pk.hex[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+# ------------------------------------------------------------------
+# Running
+# ------------------------------------------------------------------
+def render_output(doc_type, payload, fmt):
+    """Rendered document as a readable file object (policy PDFs include the upload)."""
+    content = render(doc_type, payload, (fmt,))[fmt]
+    if doc_type == "policy" and fmt == "pdf":
+        merged = merge_uploaded(content, payload.get("uploaded_pdf_path"))
+        if merged is not None:
+            return merged
+    return BytesIO(content)
+
+
+def _store(job, output):
+    directory = result_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{job.pk.hex}-{job.attempts}.{job.format}")
+    with output, tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+        shutil.copyfileobj(output, tmp)
+    os.replace(tmp.name, path)
+    return path
+
+
+def run(job, owner):
+    """Render a claimed ``job``; returns its final status."""
+    if job.attempts > job.max_attempts:
+        # Claimed again after its last attempt's worker died.
+        _settle(job, owner, status=RenderJob.FAILED, error="Worker lost", finished_at=timezone.now())
+        return RenderJob.FAILED
+
+    try:
+        with _heartbeat(job, owner):
+            path = _store(job, render_output(job.doc_type, job.payload, job.format))
+    except Exception as exc:
+        logger.exception("Render job %s failed (attempt %d): %s", job.pk, job.attempts, exc)
+        if job.attempts >= job.max_attempts:
+            _settle(job, owner, status=RenderJob.FAILED, error=f"{job.format.upper()} generation failed",
+                    finished_at=timezone.now())
+            return RenderJob.FAILED
+        _settle(job, owner, status=RenderJob.QUEUED,
+                available_at=timezone.now() + timedelta(seconds=_retry_delay(job.attempts)))
+        return RenderJob.QUEUED
+
+    if not _settle(job, owner, status=RenderJob.DONE, result_path=path, finished_at=timezone.now()):
+        # The lease ran out and another worker owns the job now.
+        logger.warning("Render job %s finished after its lease expired", job.pk)
+        os.remove(path)
+        return RenderJob.RUNNING
+    return RenderJob.DONE
+
+
+def purge(max_age_seconds):
+    """Delete finished jobs older than ``max_age_seconds`` and their files."""
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    old = RenderJob.objects.filter(status__in=[RenderJob.DONE, RenderJob.FAILED], finished_at__lt=cutoff)
+    for path in old.exclude(result_path="").values_list("result_path", flat=True):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning("Could not remove render result %s: %s", path, exc)
+    removed, _ = old.delete()
+    return removed
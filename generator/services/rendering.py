@@ -0,0 +1,300 @@
+"""
+Dual-format rendering engine.
+
+Both output formats are produced from the same intermediate model
+(:mod:`generator.services.document_model`):
+
+* PDF  – ``pdf_document.html`` rendered on the WeasyPrint renderer pool,
+  with results kept in the disk render cache; Hindi documents are set in
+  the embedded fonts of :mod:`.fonts`;
+* DOCX – the prebuilt letterhead base cloned and extended block by block.
+
+``render()`` can produce both formats concurrently in one job: the DOCX is
+serialized in a thread while the PDF job runs on the renderer pool.
+``render_bilingual()`` does the same for the English and Hindi versions of
+a document, rendering both PDFs in a single pool job.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Inches, Pt
+
+from .docx_templates import new_document
+from .document_model import build_model
+from .fonts import get_font_registry, model_text
+from .pdf_renderer import render_pdf, render_pdf_batch
+from .rasterizer import RasterizationUnavailable, rasterize_attachment
+from .render_cache import asset_versions, get_render_cache, make_key
+
+logger = logging.getLogger('generator')
+
+PDF_TEMPLATE = "generator/pdf_document.html"
+
+PDF_OPTIONS = {
+    "optimize_images": True,
+    "jpeg_quality": 85,
+    "presentational_hints": True,
+}
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# Printable width of an A4/Letter page with 1 in margins.
+DOCX_TEXT_WIDTH_IN = 6.0
+
+
+# ------------------------------------------------------------------
+# PDF
+# ------------------------------------------------------------------
+def _embeds_fonts(model):
+    return model["language"] == "hi" and getattr(settings, "PDF_EMBED_FONTS", True)
+
+
+def pdf_cache_key(model):
+    fonts = get_font_registry().version if _embeds_fonts(model) else None
+    return make_key(PDF_TEMPLATE, model, asset_versions(PDF_TEMPLATE), extra=fonts)
+
+
+def _pdf_job(model):
+    """:func:`render_pdf` arguments for ``model``."""
+    fonts_text = model_text(model) if _embeds_fonts(model) else None
+    return PDF_TEMPLATE, {"doc": model}, model["stylesheets"], PDF_OPTIONS, fonts_text
+
+
+def render_pdf_model(model):
+    """Serialize ``model`` to PDF bytes, using the render cache when possible."""
+    cache = get_render_cache()
+    key = pdf_cache_key(model)
+    pdf = cache.get(key)
+    if pdf is None:
+        template_name, context, stylesheets, options, fonts_text = _pdf_job(model)
+        pdf = render_pdf(template_name, context, stylesheets=stylesheets, fonts_text=fonts_text, **options)
+        cache.set(key, pdf)
+    return pdf
+
+
+def render_pdf_models(models):
+    """PDF bytes for each of ``models``; the cache misses are rendered as one pool job."""
+    cache = get_render_cache()
+    keys = [pdf_cache_key(model) for model in models]
+    pdfs = [cache.get(key) for key in keys]
+    missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    rendered = render_pdf_batch([_pdf_job(models[i]) for i in missing])
+    for i, pdf in zip(missing, rendered):
+        cache.set(keys[i], pdf)
+        pdfs[i] = pdf
+    return pdfs
+
+
+# ------------------------------------------------------------------
+# DOCX
+# ------------------------------------------------------------------
+def _bold_paragraph(doc, text, alignment=None, size=12):
+    p = doc.add_paragraph()
+    run = p.add_run(text)
+    run.bold = True
+    run.font.size = Pt(size)
+    if alignment is not None:
+        p.alignment = alignment
+    return p
+
+
+def _docx_ref_date(doc, block):
+    table = doc.add_table(rows=1, cols=2)
+    left, right = table.rows[0].cells
+    left.paragraphs[0].add_run(block["reference"]).bold = True
+    right.paragraphs[0].add_run(block["date"]).bold = True
+    right.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
+
+
+def _docx_title(doc, block):
+    p = doc.add_paragraph()
+    run = p.add_run(block["text"])
+    run.bold = True
+    run.underline = True
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def _docx_date(doc, block):
+    _bold_paragraph(doc, f"{block['label']} {block['value']}", WD_ALIGN_PARAGRAPH.RIGHT)
+
+
+def _docx_subject(doc, block):
+    _bold_paragraph(doc, f"{block['label']} {block['value']}")
+
+
+def _docx_body(doc, block):
+    for paragraph in block["paragraphs"] or [""]:
+        p = doc.add_paragraph()
+        p.add_run(paragraph).font.size = Pt(12)
+        p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+
+def _docx_from(doc, block):
+    _bold_paragraph(doc, block["text"], WD_ALIGN_PARAGRAPH.RIGHT)
+    doc.add_paragraph()
+
+
+def _docx_to_list(doc, block):
+    _bold_paragraph(doc, block["label"])
+    for item in block["items"]:
+        if block.get("bullets"):
+            p = doc.add_paragraph(style="List Bullet")
+            p.add_run(item).font.size = Pt(11)
+        else:
+            _bold_paragraph(doc, item)
+
+
+def _docx_to_table(doc, block):
+    if not block["rows"]:
+        return
+    columns = block["columns"]
+    table = doc.add_table(rows=1, cols=len(columns))
+    table.style = "Table Grid"
+
+    for cell, label in zip(table.rows[0].cells, columns):
+        cell.text = label
+        cell.paragraphs[0].runs[0].bold = True
+        cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    for row in block["rows"]:
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = value
+            cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    for column, percent in zip(table.columns, block.get("widths") or []):
+        column.width = Inches(DOCX_TEXT_WIDTH_IN * percent / 100)
+
+
+def _docx_attachment_pages(doc, path):
+    """Append the attachment's pages as images, one page at a time."""
+    doc.add_page_break()
+    try:
+        for idx, (_page, image, _fmt) in enumerate(rasterize_attachment(path)):
+            if idx > 0:
+                doc.add_page_break()
+            p = doc.add_paragraph()
+            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            p.add_run().add_picture(BytesIO(image), width=Inches(6.5))
+    except ImportError as imp_err:
+        logger.warning("pdf2image not available: %s", imp_err)
+        _italic_note(doc, "[PDF attachment module not available - download as PDF to view complete document]")
+    except RasterizationUnavailable as conv_error:
+        logger.warning("PDF conversion error (poppler likely missing): %s", conv_error)
+        _italic_note(doc, "Note: Attached PDF pages could not be converted to images.")
+        _italic_note(doc, "This requires 'poppler' to be installed on your system.", size=10)
+        _italic_note(doc, "Please download the complete document as PDF to view all pages.", size=10)
+    except Exception as exc:
+        logger.exception("Error processing PDF attachment: %s", exc)
+        _italic_note(doc, "[Error loading attached PDF - download as PDF for complete document]")
+
+
+def _italic_note(doc, text, size=None):
+    p = doc.add_paragraph()
+    run = p.add_run(text)
+    run.italic = True
+    if size:
+        run.font.size = Pt(size)
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def _docx_attachment(doc, block, model):
+    p = doc.add_paragraph()
+    p.add_run(f"{block['label']} {block['name']}").font.size = Pt(12)
+    path = model.get("attachment_path")
+    if path and os.path.exists(path):
+        _docx_attachment_pages(doc, path)
+
+
+DOCX_BLOCKS = {
+    "ref_date": _docx_ref_date,
+    "title": _docx_title,
+    "date": _docx_date,
+    "subject": _docx_subject,
+    "body": _docx_body,
+    "from": _docx_from,
+    "to_list": _docx_to_list,
+    "to_table": _docx_to_table,
+}
+
+
+def render_docx_model(model):
+    """Serialize ``model`` to DOCX bytes on top of the letterhead base."""
+    doc = new_document(model["doc_type"], model["language"])
+    for block in model["blocks"]:
+        if block["kind"] == "attachment":
+            _docx_attachment(doc, block, model)
+        else:
+            DOCX_BLOCKS[block["kind"]](doc, block)
+
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+SERIALIZERS = {
+    "pdf": render_pdf_model,
+    "docx": render_docx_model,
+}
+
+
+# ------------------------------------------------------------------
+# Engine entry point
+# ------------------------------------------------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="render")
+        return _executor
+
+
+def render(doc_type, payload, formats=("pdf",)):
+    """
+    Render ``payload`` of ``doc_type`` into each of ``formats``.
+
+    Returns ``{format: bytes}``.  With more than one format the serializers
+    run concurrently; the intermediate model is built once and shared.
+    """
+    model = build_model(doc_type, payload)
+    if len(formats) == 1:
+        fmt = formats[0]
+        return {fmt: SERIALIZERS[fmt](model)}
+
+    executor = _get_executor()
+    futures = {fmt: executor.submit(SERIALIZERS[fmt], model) for fmt in formats}
+    return {fmt: future.result() for fmt, future in futures.items()}
+
+
+def render_bilingual(doc_type, payloads, formats=("pdf",)):
+    """
+    Render the per-language ``payloads`` (``{"en": payload, "hi": payload}``)
+    of ``doc_type`` into each of ``formats``.
+
+    Returns ``{lang: {format: bytes}}``.  Every language's PDF comes from a
+    single renderer pool job; DOCX files are serialized in threads meanwhile.
+    """
+    models = {lang: build_model(doc_type, payload) for lang, payload in payloads.items()}
+    executor = _get_executor()
+    docx = {
+        lang: executor.submit(render_docx_model, model)
+        for lang, model in models.items() if "docx" in formats
+    }
+    files = {lang: {} for lang in models}
+    if "pdf" in formats:
+        for lang, pdf in zip(models, render_pdf_models(list(models.values()))):
+            files[lang]["pdf"] = pdf
+    for lang, future in docx.items():
+        files[lang]["docx"] = future.result()
+    return {lang: {fmt: files[lang][fmt] for fmt in formats} for lang in files}
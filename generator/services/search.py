@@ -0,0 +1,243 @@
+"""
+Full-text search over issued document bodies.
+
+On SQLite, ``generator_documentbody_fts`` is a contentless FTS5 index over
+:class:`~generator.models.DocumentBody`: each distinct body is indexed once,
+however many log rows share it, and the text itself lives only in the
+compressed body table.  Bodies are immutable, so there are no triggers -
+``DocumentBody.objects.intern`` indexes new bodies and ``prune`` removes
+them (``manage.py search_index --rebuild`` reindexes everything).  Being
+contentless, the index cannot build snippets; they are cut from the
+decompressed text of the returned hits.
+
+FTS5's ``unicode61`` tokenizer treats Devanagari vowel signs, virama and
+nukta (Unicode category M) as separators, which shreds Hindi words into
+single consonants.  ``TOKENIZE`` declares those marks as token characters
+so ``प्रभागों`` stays one term.
+
+Other database backends fall back to an unranked scan of recent logs.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils.html import escape
+
+from ..models import DocumentBody, DocumentLog
+from ..utils_new.text import DEVANAGARI_MARKS, WORD_RE
+from .log_query import FIELDS, resolve_document_type
+
+FTS_TABLE = "generator_documentbody_fts"
+LOG_TABLE = "generator_documentlog"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Most recent logs the non-SQLite fallback reads through.
+FALLBACK_SCAN = 5000
+SNIPPET_TOKENS = 16
+
+TOKENIZE = f"unicode61 remove_diacritics 2 tokenchars '{DEVANAGARI_MARKS}'"
+
+SCHEMA = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    content, content='', tokenize="{TOKENIZE}"
+)"""
+_TERM_RE = re.compile(r'[^\s"]+\*?')
+
+
+class SearchError(ValueError):
+    """Raised for an empty query or invalid search parameters."""
+
+
+def fts_available(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == "sqlite"
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word must match, quoted so
+    user input can never be parsed as FTS syntax; a trailing ``*`` keeps
+    prefix matching.
+    """
+    terms = []
+    for term in _TERM_RE.findall(query or ""):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    if not terms:
+        raise SearchError("Empty search query")
+    return " ".join(terms)
+
+
+# ------------------------------------------------------------------
+# Index maintenance (SQLite)
+# ------------------------------------------------------------------
+def install():
+    """Create the index if it is missing."""
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEMA)
+
+
+def index_bodies(bodies, using=DEFAULT_DB_ALIAS):
+    """Add ``(body id, text)`` pairs that are not indexed yet."""
+    if not bodies or not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        ids = [pk for pk, _ in bodies]
+        cursor.execute(
+            f"SELECT id FROM {FTS_TABLE}_docsize WHERE id IN ({', '.join(['%s'] * len(ids))})", ids
+        )
+        indexed = {row[0] for row in cursor.fetchall()}
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (%s, %s)",
+            [(pk, text) for pk, text in bodies if pk not in indexed],
+        )
+
+
+def unindex_bodies(bodies, using=DEFAULT_DB_ALIAS):
+    """Remove ``(body id, text)`` pairs; a contentless index needs the original text."""
+    if not bodies or not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', %s, %s)", bodies
+        )
+
+
+def _index_after(last, using=DEFAULT_DB_ALIAS):
+    indexed = 0
+    bodies = DocumentBody.objects.using(using).order_by("pk")
+    while batch := [(body.pk, body.text) for body in bodies.filter(pk__gt=last)[:1000]]:
+        index_bodies(batch, using)
+        last = batch[-1][0]
+        indexed += len(batch)
+    return indexed
+
+
+def rebuild():
+    """Drop and rebuild the whole index from the body table; returns the count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    install()
+    return _index_after(0)
+
+
+def catch_up():
+    """Index bodies past the highest indexed id (e.g. written by another backend)."""
+    install()
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {FTS_TABLE}_docsize")
+        last = cursor.fetchone()[0]
+    return _index_after(last)
+
+
+def optimize():
+    """Merge the index b-trees into one for the fastest queries."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+# ------------------------------------------------------------------
+# Search
+# ------------------------------------------------------------------
+def _limit(params):
+    try:
+        limit = int(params.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise SearchError("Invalid limit") from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise SearchError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def search(params, using=DEFAULT_DB_ALIAS):
+    """
+    Best matches for ``params["q"]``, optionally filtered by ``type`` and
+    ``language``.  Each result carries a ``snippet`` of the body with the
+    matched terms wrapped in ``<mark>``; results are ranked by BM25.
+    """
+    limit = _limit(params)
+    terms = _terms(params.get("q"))
+    filters, args = [], [match_expression(params.get("q"))]
+    if params.get("type"):
+        filters.append("d.document_type = %s")
+        args.append(resolve_document_type(params["type"]))
+    if params.get("language"):
+        filters.append("d.language = %s")
+        args.append(params["language"])
+
+    if not fts_available(using):
+        return _search_fallback(params, terms, limit, using)
+
+    where = "".join(f" AND {condition}" for condition in filters)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT d.id, bm25({FTS_TABLE}) "
+            f"FROM {FTS_TABLE} JOIN {LOG_TABLE} d ON d.body_id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s{where} ORDER BY bm25({FTS_TABLE}), d.created_at DESC LIMIT %s",
+            args + [limit],
+        )
+        hits = cursor.fetchall()
+    logs = DocumentLog.objects.using(using).filter(pk__in=[hit[0] for hit in hits]).select_related("body")
+    logs = {log.pk: log for log in logs.only(*FIELDS, "body__data")}
+    # bm25() is lower for better matches; report it as a positive score.
+    return [_result(logs[pk], terms, round(-score, 4)) for pk, score in hits if pk in logs]
+
+
+def _terms(query):
+    """``(token, is_prefix)`` pairs of the query, split and case-folded like the tokenizer does."""
+    terms = []
+    for term in _TERM_RE.findall(query or ""):
+        tokens = [token.casefold() for token in WORD_RE.findall(term)]
+        terms += [(token, False) for token in tokens[:-1]]
+        terms += [(token, term.endswith("*")) for token in tokens[-1:]]
+    return terms
+
+
+def _matches(token, terms):
+    token = token.casefold()
+    return any(token.startswith(term) if prefix else token == term for term, prefix in terms)
+
+
+def snippet(text, terms, size=SNIPPET_TOKENS):
+    """
+    About ``size`` tokens of ``text`` around the first match, HTML-escaped,
+    with matched tokens wrapped in ``<mark>``; ``None`` if no token matches.
+    """
+    tokens = list(WORD_RE.finditer(text))
+    first = next((i for i, token in enumerate(tokens) if _matches(token.group(), terms)), None)
+    if first is None:
+        return None
+    begin = max(0, min(first - size // 4, len(tokens) - size))
+    window = tokens[begin:begin + size]
+    parts, cursor = [], window[0].start()
+    for token in window:
+        parts.append(escape(text[cursor:token.start()]))
+        word = token.group()
+        parts.append(f"<mark>{escape(word)}</mark>" if _matches(word, terms) else escape(word))
+        cursor = token.end()
+    end = window[-1].end()
+    if begin + size >= len(tokens):
+        parts.append(escape(text[end:]))
+    return ("…" if begin else "") + "".join(parts) + ("…" if begin + size < len(tokens) else "")
+
+
+def _result(log, terms, score):
+    row = {field: getattr(log, field) for field in FIELDS}
+    text = log.content
+    return dict(row, snippet=snippet(text, terms) or escape(text[:200]), score=score)
+
+
+def _search_fallback(params, terms, limit, using):
+    queryset = DocumentLog.objects.using(using).select_related("body")
+    if params.get("type"):
+        queryset = queryset.filter(document_type=resolve_document_type(params["type"]))
+    if params.get("language"):
+        queryset = queryset.filter(language=params["language"])
+    results = []
+    for log in queryset.order_by("-created_at")[:FALLBACK_SCAN].iterator(chunk_size=500):
+        words = {token.casefold() for token in WORD_RE.findall(log.content)}
+        if all(any(_matches(word, [term]) for word in words) for term in terms):
+            results.append(_result(log, terms, None))
+            if len(results) == limit:
+                break
+    return results
@@ -1,16 +1,76 @@
 """
 Basic tests for the generator app.
 """
-from unittest.mock import patch, MagicMock
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch, MagicMock
 
+from asgiref.sync import sync_to_async
 from django.test import TestCase, Client
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import DocumentLog
-from .constants import DESIGNATION_MAP
+from .models import DocumentBody, DocumentDraft, DocumentLog, RenderJob
+from .data.constants import DESIGNATION_MAP
+from .services.ai_backends import BackendError, LocalBackend
+from .services.ai_cache import AICache, make_key as ai_cache_key
+from .services.ai_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, AIBusyError, QuotaScheduler, is_retryable
+from .services.ai_service import (
+    PROMPT_VERSION,
+    AIGenerationTimeout,
+    BilingualFormatError,
+    build_prompt,
+    generate_bilingual_async,
+    generate_body_async,
+)
+from .services.assets import AssetRegistry, LOGO_DPI, LOGO_PRINT_HEIGHT_IN
+from .services.config_registry import Config, ConfigRegistry, get_config
+from .services.docx_templates import HEADER_STYLE, TITLE_STYLE, new_document
+from .services import fonts
+from .services.document_log import DocumentLogWriter
+from .services.drafts import load_draft, purge as purge_drafts
+from .services.document_model import build_model
+from .services.pdf_merge import AttachmentTooLarge, merge_attachment
+from .services import pdf_renderer
+from .services.pdf_renderer import RendererBusy, RenderTimeout
+from .services import render_jobs
+from .services.recipients import RecipientDirectory, get_recipient_directory
+from .services.rasterizer import _page_key, attachment_digest, rasterize_attachment
+from .services.render_cache import RenderCache, make_key
+from .services.rendering import pdf_cache_key, render, render_bilingual
 from .views.helpers import format_date_ddmmyyyy, safe_designation
 
 
+def _log_writer_patch():
+    """Patch in a document log writer without a background thread."""
+    spill = tempfile.TemporaryDirectory()
+    writer = DocumentLogWriter(batch_size=50, flush_interval=None, max_buffer=1000, spill_dir=spill.name)
+    return writer, spill, patch("generator.services.document_log._writer", writer)
+
+
+def setUpModule():
+    # Views never start the flusher thread under test, so log rows are only
+    # written when a test flushes explicitly, inside its own transaction.
+    _writer, spill, patcher = _log_writer_patch()
+    patcher.start()
+    unittest.addModuleCleanup(patcher.stop)
+    unittest.addModuleCleanup(spill.cleanup)
+
+
+def _isolate_log_writer(test):
+    """Give ``test`` a fresh, empty document log writer."""
+    writer, spill, patcher = _log_writer_patch()
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    test.addCleanup(spill.cleanup)
+    return writer
+
+
 # ------------------------------------------------------------------
 # Helper unit tests
 # ------------------------------------------------------------------
@@ -62,6 +122,183 @@ class DocumentLogModelTests(TestCase):
         self.assertIn("Policy", types)
 
 
+class DocumentBodyTests(TestCase):
+    BODY = "सभी प्रभागों से अनुरोध है कि अग्नि सुरक्षा अभ्यास में भाग लें। " * 20
+
+    def test_identical_bodies_are_stored_once_compressed(self):
+        DocumentLog.objects.create(document_type="Circular", language="hi", reference_id="C-1", content=self.BODY)
+        DocumentLog.objects.bulk_create([
+            DocumentLog(document_type="Circular", language="hi", reference_id=f"C-{i}", content=self.BODY)
+            for i in range(2, 5)
+        ] + [DocumentLog(document_type="Policy", language="en", reference_id="P-1", content="Leave policy")])
+        self.assertEqual(DocumentBody.objects.count(), 2)
+        body = DocumentBody.objects.get(logs__reference_id="C-1")
+        self.assertEqual(body.logs.count(), 4)
+        self.assertLess(len(body.data), body.size // 4)
+        self.assertEqual(DocumentLog.objects.get(reference_id="C-3").content, self.BODY)
+
+    def test_writer_and_update_go_through_the_store(self):
+        writer, spill, writer_patch = _log_writer_patch()
+        self.addCleanup(spill.cleanup)
+        with writer_patch:
+            for i in range(3):
+                writer.log("Circular", "en", f"C-{i}", "Same body")
+            writer.flush()
+        self.assertEqual(DocumentBody.objects.count(), 1)
+        DocumentLog.objects.filter(reference_id="C-0").update(content="Edited body")
+        self.assertEqual(DocumentLog.objects.get(reference_id="C-0").content, "Edited body")
+        self.assertEqual(DocumentBody.objects.count(), 2)
+
+    def test_prune_drops_orphans_and_their_index_entries(self):
+        from .services.search import search
+
+        DocumentLog.objects.create(document_type="Policy", language="en", reference_id="P-1", content="Travel policy")
+        DocumentLog.objects.create(document_type="Policy", language="en", reference_id="P-2", content="Leave policy")
+        DocumentLog.objects.filter(reference_id="P-1").delete()
+        self.assertEqual(DocumentBody.objects.prune(), 1)
+        self.assertEqual(DocumentBody.objects.count(), 1)
+        self.assertEqual(search({"q": "travel"}), [])
+        self.assertEqual([row["reference_id"] for row in search({"q": "policy"})], ["P-2"])
+
+
+class DocumentLogWriterTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill_dir = tmp.name
+        self.writer = DocumentLogWriter(batch_size=10, flush_interval=None, max_buffer=10, spill_dir=tmp.name)
+
+    def test_batched_write_keeps_generation_time(self):
+        for i in range(3):
+            self.writer.log("Circular", "en", f"CIRCULAR-{i}", "body")
+        stamp = timezone.now()
+        self.assertEqual(DocumentLog.objects.count(), 0)
+        self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(DocumentLog.objects.count(), 3)
+        self.assertTrue(all(log.created_at <= stamp for log in DocumentLog.objects.all()))
+
+    def test_failed_flush_spills_and_replays(self):
+        self.writer.log("Policy", "hi", "POLICY-1", "body")
+        with patch.object(DocumentLog.objects, "bulk_create", side_effect=RuntimeError("database is locked")):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(len(os.listdir(self.spill_dir)), 1)
+
+        self.writer.log("Policy", "hi", "POLICY-2", "body")
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+        self.assertEqual(
+            sorted(DocumentLog.objects.values_list("reference_id", flat=True)), ["POLICY-1", "POLICY-2"]
+        )
+
+    def test_full_buffer_spills_instead_of_growing(self):
+        for i in range(12):
+            self.writer.log("Circular", "en", f"CIRCULAR-{i}", "")
+        self.assertEqual(self.writer.pending, 10)
+        self.assertEqual(self.writer.flush(), 12)
+
+
+class DocumentLogQueryTests(TestCase):
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        from django.contrib.auth.models import User
+
+        march = datetime(2026, 3, 10, tzinfo=dt_timezone.utc)
+        rows = []
+        for i in range(7):
+            # Pairs share a timestamp so the cursor has to break ties on id.
+            rows.append(DocumentLog(
+                document_type="Circular" if i % 2 else "Office Order",
+                language="hi" if i < 4 else "en",
+                reference_id=f"REF-{i}",
+                content="body",
+                created_at=march + timedelta(days=i // 2),
+            ))
+        DocumentLog.objects.bulk_create(rows)
+        self.client = Client()
+        self.client.force_login(User.objects.create_user("admin", password="x", is_staff=True))
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, cursor = [], ""
+        while True:
+            page = self.client.get(reverse("document_logs"), {"limit": 2, "cursor": cursor}).json()
+            seen += [row["reference_id"] for row in page["results"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), [f"REF-{i}" for i in range(7)])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen[0], "REF-6")
+
+    def test_filters(self):
+        url = reverse("document_logs")
+        hindi_circulars = self.client.get(url, {
+            "type": "circular", "language": "hi", "since": "2026-03-01", "until": "2026-04-01",
+        }).json()["results"]
+        self.assertEqual([row["reference_id"] for row in hindi_circulars], ["REF-3", "REF-1"])
+        by_reference = self.client.get(url, {"reference": "REF-5"}).json()["results"]
+        self.assertEqual(len(by_reference), 1)
+
+    def test_invalid_parameters_and_access(self):
+        url = reverse("document_logs")
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"type": "memo"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"limit": 1000}).status_code, 400)
+        self.assertEqual(Client().get(url).status_code, 302)
+
+
+class DocumentSearchTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        DocumentLog.objects.bulk_create([
+            DocumentLog(document_type="Circular", language="hi", reference_id="CIRCULAR-1",
+                        content="सभी प्रभागों से अनुरोध है कि अग्नि सुरक्षा अभ्यास में भाग लें।"),
+            DocumentLog(document_type="Office Order", language="en", reference_id="ORDER-1",
+                        content="The fire safety drill is rescheduled. Fire wardens will assist."),
+            DocumentLog(document_type="Policy", language="en", reference_id="POLICY-1",
+                        content="Leave policy for all divisions."),
+        ])
+        self.client = Client()
+        self.client.force_login(User.objects.create_user("admin", password="x", is_staff=True))
+
+    def _search(self, **params):
+        return self.client.get(reverse("document_search"), params)
+
+    def test_hindi_words_are_whole_terms(self):
+        results = self._search(q="प्रभागों").json()["results"]
+        self.assertEqual([row["reference_id"] for row in results], ["CIRCULAR-1"])
+        self.assertIn("<mark>प्रभागों</mark>", results[0]["snippet"])
+        # A lone consonant is not a term of its own.
+        self.assertEqual(self._search(q="प").json()["results"], [])
+
+    def test_ranked_english_search_with_filters_and_prefix(self):
+        results = self._search(q="fire").json()["results"]
+        self.assertEqual(results[0]["reference_id"], "ORDER-1")
+        self.assertEqual(self._search(q="divis*", type="policy").json()["results"][0]["reference_id"], "POLICY-1")
+        self.assertEqual(self._search(q="fire", language="hi").json()["results"], [])
+
+    def test_index_follows_updates_and_deletes(self):
+        DocumentLog.objects.filter(reference_id="POLICY-1").update(content="Travel policy")
+        self.assertEqual(self._search(q="leave").json()["results"], [])
+        self.assertEqual(len(self._search(q="travel").json()["results"]), 1)
+        DocumentLog.objects.filter(reference_id="POLICY-1").delete()
+        self.assertEqual(self._search(q="travel").json()["results"], [])
+        # User input is quoted, never parsed as FTS syntax.
+        self.assertEqual(self._search(q='NEAR(" OR').status_code, 200)
+        self.assertEqual(self._search(q="  ").status_code, 400)
+
+    def test_snippets_are_html_escaped(self):
+        from .services.search import _result
+
+        log = DocumentLog.objects.create(document_type="Circular", language="en", reference_id="XSS-1",
+                                         content='<script>alert("drill")</script> Drill <b>notice</b>')
+        snippet = self._search(q="drill").json()["results"][0]["snippet"]
+        self.assertNotIn("<script>", snippet)
+        self.assertIn("alert(&quot;<mark>drill</mark>&quot;)&lt;/script&gt;", snippet)
+        self.assertIn("<mark>Drill</mark> &lt;b&gt;notice&lt;/b&gt;", snippet)
+        self.assertNotIn("<script>", _result(log, [("absent", False)], 0)["snippet"])
+
+
 # ------------------------------------------------------------------
 # View / URL tests
 # ------------------------------------------------------------------
@@ -79,18 +316,31 @@ class HomeViewTests(TestCase):
         self.assertContains(response, "Director General")
 
 
+def _isolate_ai_cache(test):
+    """Point the shared AI body cache at a throwaway file for ``test``."""
+    tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(tmp.cleanup)
+    cache = AICache(os.path.join(tmp.name, "ai.sqlite3"), ttl=60, max_entries=100)
+    patcher = patch("generator.services.ai_cache._ai_cache", cache)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return cache
+
+
 class OfficeOrderViewTests(TestCase):
     def setUp(self):
         self.client = Client()
+        self.ai_cache = _isolate_ai_cache(self)
+        self.log_writer = _isolate_log_writer(self)
 
     def test_generate_body_get_not_allowed(self):
         response = self.client.get(reverse("generate_body"))
         self.assertEqual(response.status_code, 400)
 
-    @patch("generator.views.office_order.get_gemini_model")
+    @patch("generator.services.ai_backends.get_gemini_model")
     def test_generate_body_post(self, mock_get_model):
         mock_model = MagicMock()
-        mock_model.generate_content.return_value = MagicMock(text="Generated body text")
+        mock_model.generate_content_async = AsyncMock(return_value=MagicMock(text="Generated body text"))
         mock_get_model.return_value = mock_model
 
         response = self.client.post(reverse("generate_body"), {
@@ -99,6 +349,72 @@ class OfficeOrderViewTests(TestCase):
         })
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.content.decode(), "Generated body text")
+        prompt = mock_model.generate_content_async.call_args.args[0]
+        self.assertTrue(prompt.endswith("Topic:\nTest prompt"))
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    def test_generate_body_timeout(self, mock_get_model):
+        async def slow(prompt):
+            await asyncio.sleep(1)
+
+        mock_get_model.return_value = MagicMock(generate_content_async=slow)
+        with self.settings(AI_TIMEOUT=0.05):
+            response = self.client.post(reverse("generate_body"), {"body_prompt": "x", "language": "en"})
+        self.assertEqual(response.status_code, 504)
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    def test_generate_body_cached_unless_regenerate(self, mock_get_model):
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(side_effect=[
+            MagicMock(text="First draft"), MagicMock(text="Second draft"),
+        ])
+        mock_get_model.return_value = mock_model
+
+        url = reverse("generate_body")
+        first = self.client.post(url, {"body_prompt": "Holiday on Monday", "language": "en"})
+        repeat = self.client.post(url, {"body_prompt": "  holiday on monday. ", "language": "en"})
+        fresh = self.client.post(url, {"body_prompt": "Holiday on Monday", "language": "en", "regenerate": "1"})
+        self.assertEqual(first.content.decode(), "First draft")
+        self.assertEqual(repeat.content.decode(), "First draft")
+        self.assertEqual(fresh.content.decode(), "Second draft")
+        self.assertEqual(mock_model.generate_content_async.call_count, 2)
+        self.assertEqual(self.ai_cache.stats()["hits"], 1)
+
+    async def _read_stream(self, url, data):
+        response = await self.async_client.post(url, data)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    async def test_generate_body_stream(self, mock_get_model):
+        async def chunks():
+            for text in ("Hereby ", "ordered\nthat"):
+                yield MagicMock(text=text)
+
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(return_value=chunks())
+        mock_get_model.return_value = mock_model
+
+        url = reverse("generate_body_stream")
+        body = await self._read_stream(url, {"body_prompt": "Stream me", "language": "en"})
+        self.assertEqual(
+            body,
+            'event: chunk\ndata: "Hereby "\n\n'
+            'event: chunk\ndata: "ordered\\nthat"\n\n'
+            'event: done\ndata: ""\n\n',
+        )
+        self.assertEqual(mock_model.generate_content_async.call_args.kwargs, {"stream": True})
+
+        # The completed stream is cached for the next request.
+        cached = await self._read_stream(url, {"body_prompt": "Stream me", "language": "en"})
+        self.assertIn('data: "Hereby ordered\\nthat"', cached)
+        self.assertEqual(mock_model.generate_content_async.call_count, 1)
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    async def test_generate_body_stream_error_event(self, mock_get_model):
+        mock_get_model.return_value = MagicMock(generate_content_async=AsyncMock(side_effect=RuntimeError("quota")))
+        body = await self._read_stream(reverse("generate_body_stream"), {"body_prompt": "x", "language": "en"})
+        self.assertTrue(body.startswith("event: error\n"))
 
     def test_result_office_order_get_redirects(self):
         response = self.client.get(reverse("result"))
@@ -114,6 +430,8 @@ class OfficeOrderViewTests(TestCase):
             "to_recipients[]": ["Senior Manager"],
         })
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(DocumentLog.objects.count(), 0)  # buffered until the next flush
+        self.log_writer.flush()
         self.assertEqual(DocumentLog.objects.count(), 1)
 
     def test_download_pdf_no_session(self):
@@ -124,6 +442,37 @@ class OfficeOrderViewTests(TestCase):
         response = self.client.get(reverse("download_docx"))
         self.assertEqual(response.status_code, 400)
 
+    def _post_office_order(self, body="Test body"):
+        self.client.post(reverse("result"), {
+            "language": "en",
+            "date": "2026-02-16",
+            "reference": "BISAG-N/Test/2026/",
+            "body": body,
+            "from_position": "Director General",
+            "to_recipients[]": ["Senior Manager"],
+        })
+
+    @patch("generator.services.rendering.render_pdf")
+    def test_download_pdf_renderer_busy(self, mock_render):
+        mock_render.side_effect = RendererBusy()
+        self._post_office_order(body="Busy body")
+        with tempfile.TemporaryDirectory() as tmp, self.settings(RENDER_CACHE_DIR=tmp):
+            with patch("generator.services.render_cache._render_cache", None):
+                response = self.client.get(reverse("download_pdf"))
+        self.assertEqual(response.status_code, 503)
+
+    @patch("generator.services.rendering.render_pdf")
+    def test_download_pdf_uses_render_cache(self, mock_render):
+        mock_render.return_value = b"%PDF-1.7 test"
+        self._post_office_order()
+        with tempfile.TemporaryDirectory() as tmp, self.settings(RENDER_CACHE_DIR=tmp):
+            with patch("generator.services.render_cache._render_cache", None):
+                first = self.client.get(reverse("download_pdf"))
+                second = self.client.get(reverse("download_pdf"))
+        self.assertEqual(first.content, b"%PDF-1.7 test")
+        self.assertEqual(second.content, b"%PDF-1.7 test")
+        self.assertEqual(mock_render.call_count, 1)
+
 
 class CircularViewTests(TestCase):
     def setUp(self):
@@ -150,6 +499,956 @@ class PolicyViewTests(TestCase):
         response = self.client.get(reverse("result_policy"))
         self.assertEqual(response.status_code, 302)
 
+    def _post_policy(self, pdf_bytes):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        return self.client.post(reverse("result_policy"), {
+            "language": "en",
+            "date": "2026-02-16",
+            "subject": "Test policy",
+            "body": "Policy body",
+            "from_position": "Director General",
+            "to_recipients[]": ["Interns"],
+            "attached_pdf_name": "Annexure",
+            "policy_pdf": SimpleUploadedFile("annex.pdf", pdf_bytes, content_type="application/pdf"),
+        })
+
+    def test_policy_preview_references_attachment(self):
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            small = self._post_policy(_make_pdf(1, "annex"))
+            large = self._post_policy(_make_pdf(50, "annex"))
+        self.assertNotContains(large, "base64")
+        self.assertEqual(len(small.content), len(large.content))
+
+    def test_policy_attachment_range_and_caching(self):
+        pdf = _make_pdf(2, "annex")
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            self._post_policy(pdf)
+            url = reverse("policy_attachment", args=[load_draft(self.client.session, "policy")["attachment_id"]])
+
+            full = self.client.get(url)
+            self.assertEqual(full.status_code, 200)
+            self.assertEqual(b"".join(full.streaming_content), pdf)
+
+            partial = self.client.get(url, HTTP_RANGE="bytes=0-9")
+            self.assertEqual(partial.status_code, 206)
+            self.assertEqual(b"".join(partial.streaming_content), pdf[:10])
+            self.assertEqual(partial["Content-Range"], f"bytes 0-9/{len(pdf)}")
+
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=full["ETag"])
+            self.assertEqual(cached.status_code, 304)
+
+            other = Client().get(url)
+            self.assertEqual(other.status_code, 404)
+
+
+# ------------------------------------------------------------------
+# Document draft tests
+# ------------------------------------------------------------------
+class DocumentDraftTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        _isolate_log_writer(self)
+
+    def _preview(self, body):
+        return self.client.post(reverse("result_circular"), {
+            "language": "en", "date": "2026-02-16", "subject": "Drafts", "body": body,
+            "from_position": "Director General", "to[]": ["1"],
+        })
+
+    def _session_size(self):
+        from django.contrib.sessions.models import Session
+
+        return len(Session.objects.get(pk=self.client.session.session_key).session_data)
+
+    def test_session_holds_only_the_draft_id(self):
+        self._preview("Short body")
+        small = self._session_size()
+        self._preview("A much longer body. " * 500)
+        self.assertEqual(self._session_size(), small)
+        self.assertEqual(DocumentDraft.objects.count(), 1)  # the new preview replaced the old draft
+        self.assertEqual(load_draft(self.client.session, "circular")["body"], "A much longer body. " * 500)
+
+    def test_download_reads_the_draft(self):
+        self._preview("Body")
+        self.assertEqual(self.client.get(reverse("download_circular_docx")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("download_docx")).status_code, 400)
+
+    def test_expired_drafts_are_gone_and_purged(self):
+        self._preview("Body")
+        DocumentDraft.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(load_draft(self.client.session, "circular"))
+        self.assertEqual(self.client.get(reverse("download_circular_pdf")).status_code, 400)
+        self.assertEqual(purge_drafts(), 1)
+        self.assertEqual(DocumentDraft.objects.count(), 0)
+
+
+# ------------------------------------------------------------------
+# Render cache tests
+# ------------------------------------------------------------------
+class RenderCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_key_ignores_volatile_fields(self):
+        a = make_key("t.html", {"body": "x", "logo_path": "file:///a.png"})
+        b = make_key("t.html", {"body": "x", "logo_path": "file:///b.png"})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, make_key("t.html", {"body": "y"}))
+
+    def test_get_set_roundtrip(self):
+        cache = RenderCache(self.tmp.name, 1024)
+        self.assertIsNone(cache.get("ab" * 32))
+        cache.set("ab" * 32, b"%PDF-data")
+        self.assertEqual(cache.get("ab" * 32), b"%PDF-data")
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(self.tmp.name, 250)
+        for i, key in enumerate(("aa" * 32, "bb" * 32, "cc" * 32)):
+            cache.set(key, b"x" * 100)
+            path = cache._path(key)
+            os.utime(path, (1000 + i, 1000 + i))
+        self.assertLessEqual(cache.size(), 250)
+        self.assertIsNone(cache.get("aa" * 32))
+        self.assertIsNotNone(cache.get("cc" * 32))
+
+    def test_directory_scanned_only_over_budget(self):
+        cache = RenderCache(self.tmp.name, 1000)
+        cache.set("%064x" % 0, b"x" * 100)  # first write counts the directory
+        with patch.object(cache, "entries", wraps=cache.entries) as entries:
+            for i in range(1, 10):
+                cache.set("%064x" % i, b"x" * 100)
+            self.assertEqual(entries.call_count, 0)
+            cache.set("%064x" % 10, b"x" * 100)
+            self.assertEqual(entries.call_count, 1)
+        self.assertLessEqual(cache.size(), 900)
+
+
+# ------------------------------------------------------------------
+# Asset registry tests
+# ------------------------------------------------------------------
+class AssetRegistryTests(TestCase):
+    def test_logo_is_prescaled(self):
+        from PIL import Image
+
+        registry = AssetRegistry()
+        registry.refresh(force=True)
+        with Image.open(registry.logo_stream()) as image:
+            self.assertEqual(image.height, round(LOGO_PRINT_HEIGHT_IN * LOGO_DPI))
+
+    def test_fetch_serves_logo_from_memory(self):
+        registry = AssetRegistry()
+        registry.refresh(force=True)
+        asset = registry.fetch(registry.logo_url)
+        self.assertEqual(asset["mime_type"], "image/png")
+        self.assertIsNone(registry.fetch("file:///elsewhere.png"))
+
+    def test_stylesheet_sources_loaded(self):
+        registry = AssetRegistry()
+        registry.refresh(force=True)
+        self.assertIn("@page", registry.stylesheet_source("office_order"))
+        self.assertTrue(registry.version)
+
+
+class FontRegistryTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.disk = RenderCache(tmp.name, 64 * 1024 * 1024)
+
+    def test_subsets_cached_per_glyph_set(self):
+        registry = fonts.FontRegistry(disk_cache=self.disk)
+        with patch("generator.services.fonts._subset", wraps=fonts._subset) as subset:
+            first = registry.embed("कार्यालय आदेश 12")
+            again = registry.embed("आदेश कार्यालय 34")
+            from_disk = fonts.FontRegistry(disk_cache=self.disk).embed("कार्यालय आदेश")
+        # One subset per face, reused for the same characters in another order.
+        self.assertEqual(subset.call_count, len(fonts.FACES))
+        self.assertEqual(first.key, again.key)
+        self.assertEqual(first.key, from_disk.key)
+
+    def test_subset_keeps_shaping_glyphs(self):
+        import re
+        from io import BytesIO
+        from fontTools.ttLib import TTFont
+
+        registry = fonts.FontRegistry(disk_cache=self.disk)
+        embedded = registry.embed("क्षत्रिय 中")
+        self.assertFalse(embedded.complete)
+        self.assertTrue(registry.embed("क्षत्रिय").complete)
+
+        url = re.search(r'url\("([^"]+)"\)', embedded.css).group(1)
+        font = TTFont(BytesIO(registry.fetch(url)["string"]))
+        self.assertIn(ord("क"), font.getBestCmap())
+        self.assertIn("GSUB", font)
+        self.assertLess(font["maxp"].numGlyphs, 1080)
+        self.assertIsNone(registry.fetch("file:///elsewhere.ttf"))
+
+    @patch("generator.services.rendering.render_pdf", return_value=b"%PDF-1.7 test")
+    def test_only_hindi_pdfs_embed_fonts(self, mock_render):
+        english = dict(CIRCULAR_PAYLOAD, language="en")
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as font_tmp, \
+                self.settings(RENDER_CACHE_DIR=tmp, FONT_SUBSET_CACHE_DIR=font_tmp):
+            with patch("generator.services.render_cache._render_cache", None), \
+                    patch("generator.services.fonts._registry", None):
+                render("circular", CIRCULAR_PAYLOAD, ("pdf",))
+                # Subsets have a cache of their own, apart from the PDFs.
+                self.assertEqual(fonts.get_font_registry().disk_cache.directory, font_tmp)
+                render("circular", english, ("pdf",))
+                with self.settings(PDF_EMBED_FONTS=False):
+                    key = pdf_cache_key(build_model("circular", CIRCULAR_PAYLOAD))
+                self.assertNotEqual(key, pdf_cache_key(build_model("circular", CIRCULAR_PAYLOAD)))
+        hindi, english = (call.kwargs["fonts_text"] for call in mock_render.call_args_list)
+        self.assertIn("ए. कुमार", hindi)
+        self.assertIsNone(english)
+
+
+class ConfigRegistryTests(TestCase):
+    def setUp(self):
+        import shutil
+        from django.conf import settings
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        shutil.copytree(os.path.join(settings.BASE_DIR, "config"), tmp.name, dirs_exist_ok=True)
+        self.policy_path = os.path.join(tmp.name, "policy.json")
+        self.registry = ConfigRegistry(tmp.name, check_interval=0)
+        self.registry.refresh(force=True)
+
+    def _edit_policy(self, text):
+        # Write-and-rename like an editor or deploy tool: a new inode.
+        with open(self.policy_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(self.policy_path + ".tmp", self.policy_path)
+
+    def test_precomputed_lookups(self):
+        circular = get_config("circular")
+        self.assertEqual(len(circular.header("hi")), 3)
+        self.assertEqual(circular.people_by_id["1"]["designation_en"], "Director General")
+        self.assertEqual(get_config("office_order").title("hi"), "कार्यालय आदेश")
+        self.assertEqual(get_config("advertisement").data, {})
+
+    def test_edit_is_reloaded_without_restart(self):
+        version = self.registry.version
+        self._edit_policy(json.dumps({
+            "title_en": "Policy", "title_hi": "नीति", "header": {"en": ["New Institute"], "hi": []},
+        }))
+        policy = self.registry.get("policy")
+        self.assertEqual(policy.header("en"), ("New Institute", "", ""))
+        self.assertNotEqual(self.registry.version, version)
+
+    def test_invalid_edit_keeps_previous_config(self):
+        before = self.registry.get("policy").header("en")
+        with self.assertLogs("generator", "ERROR") as logs:
+            self._edit_policy(json.dumps({"title_en": "Policy", "header": {"en": "one line"}}))
+            self.assertEqual(self.registry.get("policy").header("en"), before)
+            self._edit_policy("{not json")
+            self.assertEqual(self.registry.get("policy").header("en"), before)
+        self.assertIn("policy.title_hi: missing", logs.output[0])
+
+
+class RecipientDirectoryTests(TestCase):
+    def _person(self, i, name_en, name_hi=""):
+        return {"id": i, "name_en": name_en, "name_hi": name_hi or name_en,
+                "designation_en": "Manager", "designation_hi": "प्रबंधक"}
+
+    def test_prefix_fuzzy_and_hindi_search_in_a_large_directory(self):
+        people = [self._person(i, f"Employee {i:04d} Sharma") for i in range(5000)]
+        people.append(self._person(5000, "Shri Harender Singh", "श्री हरेंद्र सिंह"))
+        directory = RecipientDirectory(people)
+        for query in ("hare", "Harender", "harendr singh", "हरेंद्र", "सिंह"):
+            found, total = directory.search(query)
+            self.assertEqual((total, found[0]["id"]), (1, 5000), query)
+        found, total = directory.search("employee 00")
+        self.assertEqual((total, len(found)), (100, 20))
+        self.assertEqual(directory.resolve(["5000", 7, "7", "missing"]), [people[5000], people[7]])
+
+    def test_endpoint_pages_through_matches(self):
+        url = reverse("recipient_search")
+        seen, offset = [], 0
+        while offset is not None:
+            page = self.client.get(url, {"q": "singh", "limit": 2, "offset": offset}).json()
+            seen += [row["id"] for row in page["results"]]
+            offset = page["next_offset"]
+        self.assertEqual(len(seen), page["total"])
+        self.assertEqual(len(set(seen)), len(seen))
+        self.assertEqual(self.client.get(url, {"limit": 500}).status_code, 400)
+
+    def test_home_no_longer_embeds_the_roster(self):
+        home = self.client.get(reverse("home"))
+        self.assertNotContains(home, "Harender Singh")
+        self.assertContains(home, reverse("recipient_search"))
+        # A reloaded circular.json gets a fresh directory.
+        config = Config("circular", {"people": [self._person(1, "New Person")]})
+        with patch("generator.services.recipients.get_config", return_value=config):
+            self.assertEqual(get_recipient_directory().search("new")[1], 1)
+
+
+# ------------------------------------------------------------------
+# DOCX letterhead template tests
+# ------------------------------------------------------------------
+class DocxTemplateTests(TestCase):
+    def test_circular_base_has_letterhead(self):
+        doc = new_document("circular", "hi")
+        styles = [p.style.name for p in doc.paragraphs]
+        self.assertEqual(styles.count(HEADER_STYLE), 3)
+        self.assertEqual(doc.paragraphs[-1].style.name, TITLE_STYLE)
+        self.assertEqual(doc.paragraphs[-1].text, "परिपत्र")
+        self.assertEqual(len(doc.inline_shapes), 1)
+
+    def test_clones_are_independent(self):
+        first = new_document("office_order", "en")
+        first.add_paragraph("only in first")
+        second = new_document("office_order", "en")
+        self.assertNotIn("only in first", [p.text for p in second.paragraphs])
+
+
+# ------------------------------------------------------------------
+# Rendering engine tests
+# ------------------------------------------------------------------
+CIRCULAR_PAYLOAD = {
+    "language": "hi",
+    "date": "16-02-2026",
+    "subject": "Test",
+    "body": "First paragraph.\n\nSecond paragraph.",
+    "from": "Director General",
+    "header": {"org_name": "BISAG-N", "ministry": "MeitY", "government": "GoI"},
+    "to_people": [{"name_en": "A. Kumar", "name_hi": "ए. कुमार"}],
+}
+
+
+class RenderingEngineTests(TestCase):
+    def test_model_blocks_and_labels(self):
+        model = build_model("circular", CIRCULAR_PAYLOAD)
+        kinds = [block["kind"] for block in model["blocks"]]
+        self.assertEqual(kinds, ["date", "subject", "body", "from", "to_table"])
+        self.assertEqual(model["letterhead"]["title"], "परिपत्र")
+        self.assertEqual(model["blocks"][2]["paragraphs"], ["First paragraph.", "Second paragraph."])
+        self.assertEqual(model["blocks"][-1]["rows"], [["1", "ए. कुमार", ""]])
+
+    def test_docx_serialization_follows_model(self):
+        from io import BytesIO
+        from docx import Document
+
+        doc = Document(BytesIO(render("circular", CIRCULAR_PAYLOAD, ("docx",))["docx"]))
+        texts = [p.text for p in doc.paragraphs]
+        self.assertIn("विषय : Test", texts)
+        self.assertIn("Second paragraph.", texts)
+        self.assertEqual(doc.tables[0].rows[1].cells[1].text, "ए. कुमार")
+
+    @patch("generator.services.rendering.render_pdf")
+    def test_both_formats_in_one_job(self, mock_render):
+        mock_render.return_value = b"%PDF-1.7 test"
+        with tempfile.TemporaryDirectory() as tmp, self.settings(RENDER_CACHE_DIR=tmp):
+            with patch("generator.services.render_cache._render_cache", None):
+                result = render("circular", CIRCULAR_PAYLOAD, ("pdf", "docx"))
+        self.assertEqual(result["pdf"], b"%PDF-1.7 test")
+        self.assertTrue(result["docx"].startswith(b"PK"))
+        context = mock_render.call_args.args[1]
+        self.assertEqual(context["doc"]["doc_type"], "circular")
+
+    @patch("generator.services.rendering.render_pdf_batch")
+    def test_bilingual_pdfs_in_one_pool_job(self, mock_batch):
+        mock_batch.return_value = [b"%PDF en", b"%PDF hi"]
+        payloads = {"en": dict(CIRCULAR_PAYLOAD, language="en"), "hi": CIRCULAR_PAYLOAD}
+        with tempfile.TemporaryDirectory() as tmp, self.settings(RENDER_CACHE_DIR=tmp):
+            with patch("generator.services.render_cache._render_cache", None):
+                result = render_bilingual("circular", payloads, ("pdf", "docx"))
+                again = render_bilingual("circular", payloads, ("pdf",))
+        self.assertEqual((result["en"]["pdf"], result["hi"]["pdf"]), (b"%PDF en", b"%PDF hi"))
+        self.assertTrue(result["hi"]["docx"].startswith(b"PK"))
+        jobs = mock_batch.call_args_list[0].args[0]
+        self.assertEqual([job[1]["doc"]["language"] for job in jobs], ["en", "hi"])
+        # Cached on the second pass: nothing left to submit.
+        self.assertEqual(mock_batch.call_args_list[1].args[0], [])
+        self.assertEqual(again["hi"]["pdf"], b"%PDF hi")
+
+    def test_cache_key_ignores_attachment_path(self):
+        model = build_model("policy", {"language": "en", "uploaded_pdf_path": "/tmp/a.pdf"})
+        other = dict(model, attachment_path="/tmp/b.pdf")
+        self.assertEqual(pdf_cache_key(model), pdf_cache_key(other))
+
+
+# ------------------------------------------------------------------
+# AI service tests
+# ------------------------------------------------------------------
+class AIServiceTests(TestCase):
+    def setUp(self):
+        self.cache = _isolate_ai_cache(self)
+
+    def test_cache_ttl_and_lru(self):
+        cache = AICache(self.cache.path, ttl=60, max_entries=2)
+        for name in ("a", "b"):
+            cache.set(name, "circular", "en", name.upper())
+        cache.get("a")
+        cache.set("c", "circular", "en", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+
+        with patch("generator.services.ai_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get("c"))
+
+    def test_counters_buffered_and_eviction_past_threshold(self):
+        cache = AICache(self.cache.path, ttl=60, max_entries=10, flush_interval=60)
+        for i in range(11):
+            cache.set(str(i), "circular", "en", "body")
+        self.assertEqual(cache.get("0"), "body")
+        conn = cache._connect()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM ai_stats").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM ai_bodies").fetchone()[0], 11)
+
+        cache.set("11", "circular", "en", "body")
+        self.assertEqual(cache.stats()["entries"], 10)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.get("0"), "body")  # touched before the eviction
+
+    def test_key_depends_on_prompt_version_and_language(self):
+        base = ai_cache_key("policy", "en", "1", "QISMS documents on FTP")
+        self.assertEqual(base, ai_cache_key("policy", "en", "1", "qisms  documents on ftp."))
+        self.assertNotEqual(base, ai_cache_key("policy", "hi", "1", "QISMS documents on FTP"))
+        self.assertNotEqual(base, ai_cache_key("policy", "en", "2", "QISMS documents on FTP"))
+
+    def test_dated_prompt_not_served_on_a_later_day(self):
+        from datetime import date
+
+        model = MagicMock(generate_content_async=AsyncMock(side_effect=[
+            MagicMock(text="Monday's order"), MagicMock(text="Tuesday's order"),
+        ]))
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                patch("generator.services.ai_service.date") as mock_date:
+            mock_date.today.return_value = date(2026, 2, 16)
+            monday = asyncio.run(generate_body_async("office_order", "en", "Transfer"))
+            self.assertEqual(asyncio.run(generate_body_async("office_order", "en", "Transfer")), monday)
+            mock_date.today.return_value = date(2026, 2, 17)
+            tuesday = asyncio.run(generate_body_async("office_order", "en", "Transfer"))
+        self.assertEqual((monday, tuesday), ("Monday's order", "Tuesday's order"))
+        self.assertIn("17-02-2026", model.generate_content_async.call_args.args[0])
+
+    def test_identical_requests_share_one_call(self):
+        calls = []
+
+        async def fake_call(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.02)
+            return MagicMock(text="Shared body")
+
+        async def run():
+            return await asyncio.gather(*[generate_body_async("circular", "en", "Holiday") for _ in range(5)])
+
+        model = MagicMock(generate_content_async=fake_call)
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model):
+            results = asyncio.run(run())
+        self.assertEqual(results, ["Shared body"] * 5)
+        self.assertEqual(len(calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["upstream_calls"], stats["coalesced_local"]), (1, 4))
+        self.assertAlmostEqual(stats["coalescing_ratio"], 0.8)
+
+    def test_waits_for_other_worker_holding_lease(self):
+        key = ai_cache_key("circular", "en", PROMPT_VERSION, "Holiday")
+        self.assertTrue(self.cache.acquire_lease(key, "other-worker", ttl=5))
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.05)
+            self.cache.set(key, "circular", "en", "From the other worker")
+            self.cache.release_lease(key, "other-worker")
+
+        async def run():
+            result, _ = await asyncio.gather(
+                generate_body_async("circular", "en", "Holiday"), other_worker_finishes()
+            )
+            return result
+
+        model = MagicMock(generate_content_async=AsyncMock())
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model):
+            self.assertEqual(asyncio.run(run()), "From the other worker")
+        model.generate_content_async.assert_not_called()
+        self.assertEqual(self.cache.stats()["coalesced_remote"], 1)
+
+    def test_follower_gives_up_after_lease_wait(self):
+        key = ai_cache_key("circular", "en", PROMPT_VERSION, "Holiday")
+        self.assertTrue(self.cache.acquire_lease(key, "stuck-worker", ttl=60))
+        model = MagicMock(generate_content_async=AsyncMock())
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                self.settings(AI_LEASE_WAIT=0.2):
+            with self.assertRaises(AIGenerationTimeout):
+                asyncio.run(generate_body_async("circular", "en", "Holiday"))
+        model.generate_content_async.assert_not_called()
+
+    def test_leader_renews_short_lease(self):
+        key = ai_cache_key("circular", "en", PROMPT_VERSION, "Holiday")
+        held = []
+
+        async def slow_call(prompt):
+            await asyncio.sleep(0.4)
+            held.append(self.cache.lease_held(key))
+            return MagicMock(text="Body")
+
+        model = MagicMock(generate_content_async=slow_call)
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                self.settings(AI_LEASE_TTL=0.15):
+            self.assertEqual(asyncio.run(generate_body_async("circular", "en", "Holiday")), "Body")
+        self.assertEqual(held, [True])
+        self.assertFalse(self.cache.lease_held(key))
+
+    def test_concurrency_limit(self):
+        active = []
+        peak = []
+
+        async def fake_call(prompt):
+            active.append(prompt)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+            return MagicMock(text=" body ")
+
+        async def run():
+            return await asyncio.gather(*[generate_body_async("circular", "en", str(i)) for i in range(6)])
+
+        model = MagicMock(generate_content_async=fake_call)
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                self.settings(AI_MAX_CONCURRENCY=2):
+            results = asyncio.run(run())
+        self.assertEqual(results, ["body"] * 6)
+        self.assertEqual(max(peak), 2)
+
+
+    def test_bilingual_bodies_from_one_call(self):
+        answer = '```json\n{"en": "Office closed.", "hi": "कार्यालय बंद रहेगा।"}\n```'
+        model = MagicMock(generate_content_async=AsyncMock(return_value=MagicMock(text=answer)))
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model):
+            bodies = asyncio.run(generate_bilingual_async("circular", "Holiday"))
+            hindi = asyncio.run(generate_body_async("circular", "hi", "holiday"))
+        self.assertEqual(bodies, {"en": "Office closed.", "hi": "कार्यालय बंद रहेगा।"})
+        self.assertEqual(hindi, "कार्यालय बंद रहेगा।")
+        self.assertEqual(model.generate_content_async.call_count, 1)
+        prompt = model.generate_content_async.call_args.args[0]
+        self.assertIn('{"en": "<English body>", "hi": "<Hindi body>"}', prompt)
+
+    def test_malformed_bilingual_answer_is_not_cached(self):
+        model = MagicMock(generate_content_async=AsyncMock(return_value=MagicMock(text='{"en": "Only English"}')))
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model):
+            with self.assertRaises(BilingualFormatError):
+                asyncio.run(generate_bilingual_async("circular", "Holiday"))
+        self.assertIsNone(self.cache.get(ai_cache_key("circular", "en", PROMPT_VERSION, "Holiday")))
+
+
+class AIBackendTests(TestCase):
+    OPTIONS = {
+        "latency": {"distribution": "fixed", "seconds": 0},
+        "error_rate": 0.0,
+        "error_statuses": [429],
+        "chunk_words": 3,
+        "chunk_delay": 0,
+        "seed": 1,
+    }
+
+    def test_local_backend_is_deterministic_and_bilingual(self):
+        backend = LocalBackend(dict(self.OPTIONS))
+        en_prompt = build_prompt("circular", "en", "office closed on Friday")
+        hi_prompt = build_prompt("circular", "hi", "शुक्रवार को कार्यालय बंद")
+        first = asyncio.run(backend.generate(en_prompt))
+        self.assertEqual(first, asyncio.run(backend.generate(en_prompt)))
+        self.assertIn("office closed on Friday", first)
+        self.assertIn("शुक्रवार को कार्यालय बंद", asyncio.run(backend.generate(hi_prompt)))
+
+    def test_local_backend_streams_same_text(self):
+        backend = LocalBackend(dict(self.OPTIONS))
+        prompt = build_prompt("policy", "en", "leave rules")
+
+        async def collect():
+            return [part async for part in await backend.stream(prompt)]
+
+        parts = asyncio.run(collect())
+        self.assertGreater(len(parts), 1)
+        self.assertEqual("".join(parts).strip(), LocalBackend.text_for(prompt))
+
+    def test_local_backend_errors_are_retryable(self):
+        backend = LocalBackend(dict(self.OPTIONS, error_rate=1.0))
+        with self.assertRaises(BackendError) as ctx:
+            asyncio.run(backend.generate("Topic:\nx"))
+        self.assertTrue(is_retryable(ctx.exception))
+
+
+# ------------------------------------------------------------------
+# Gemini scheduler tests
+# ------------------------------------------------------------------
+class QuotaSchedulerTests(TestCase):
+    def setUp(self):
+        self.cache = _isolate_ai_cache(self)
+
+    def test_interactive_served_before_batch(self):
+        order = []
+
+        async def run():
+            scheduler = QuotaScheduler(requests_per_minute=600, tokens_per_minute=10 ** 6)
+            scheduler.requests.level = 0
+
+            async def call(name, priority):
+                await scheduler.acquire(1, priority, deadline=2)
+                order.append(name)
+
+            batch = asyncio.ensure_future(call("batch", PRIORITY_BATCH))
+            await asyncio.sleep(0)
+            await asyncio.gather(batch, call("interactive", PRIORITY_INTERACTIVE))
+
+        asyncio.run(run())
+        self.assertEqual(order, ["interactive", "batch"])
+
+    def test_queue_deadline_raises_busy(self):
+        async def run():
+            scheduler = QuotaScheduler(requests_per_minute=6, tokens_per_minute=10 ** 6)
+            scheduler.requests.level = 0
+            await scheduler.acquire(1, deadline=0.05)
+
+        with self.assertRaises(AIBusyError) as ctx:
+            asyncio.run(run())
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+    def test_retries_rate_limited_calls(self):
+        from google.api_core.exceptions import ResourceExhausted
+
+        model = MagicMock()
+        model.generate_content_async = AsyncMock(side_effect=[
+            ResourceExhausted("quota"), ResourceExhausted("quota"), MagicMock(text="Finally"),
+        ])
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                patch("generator.services.ai_service.retry_delay", return_value=0):
+            body = asyncio.run(generate_body_async("policy", "en", "Leave rules"))
+        self.assertEqual(body, "Finally")
+        self.assertEqual(self.cache.stats()["retries"], 2)
+
+    def test_exhausted_retries_return_busy_response(self):
+        from google.api_core.exceptions import ServiceUnavailable
+
+        model = MagicMock(generate_content_async=AsyncMock(side_effect=ServiceUnavailable("down")))
+        with patch("generator.services.ai_backends.get_gemini_model", return_value=model), \
+                patch("generator.services.ai_service.retry_delay", return_value=0), \
+                self.settings(AI_MAX_RETRIES=1):
+            response = Client().post(reverse("generate_policy_body"), {"body_prompt": "x", "language": "en"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(model.generate_content_async.call_count, 2)
+
+
+# ------------------------------------------------------------------
+# Bulk generation tests
+# ------------------------------------------------------------------
+class BulkGenerationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.ai_cache = _isolate_ai_cache(self)
+        self.log_writer = _isolate_log_writer(self)
+        staff = User.objects.create_user("admin", password="x", is_staff=True)
+        self.async_client.force_login(staff)
+
+    async def _zip(self, response):
+        import json
+        import zipfile
+        from io import BytesIO
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        data = b"".join([chunk async for chunk in response.streaming_content])
+        archive = zipfile.ZipFile(BytesIO(data))
+        return archive, json.loads(archive.read("manifest.json"))
+
+    async def test_json_specs_with_per_item_errors(self):
+        import json
+
+        documents = [
+            {"type": "circular", "language": "hi", "subject": "Test", "body": "Body", "to": ["1"],
+             "filename": "Circular IT"},
+            {"type": "memo", "body": "Body"},
+            {"type": "office_order", "language": "en", "body": "Order", "from": "Director General"},
+        ]
+        response = await self.async_client.post(
+            reverse("bulk_generate"),
+            json.dumps({"documents": documents, "formats": ["docx"]}),
+            content_type="application/json",
+        )
+        archive, manifest = await self._zip(response)
+        self.assertEqual((manifest["succeeded"], manifest["failed"]), (2, 1))
+        self.assertEqual(manifest["documents"][1]["error"], "Unknown document type 'memo'")
+        self.assertIn("0001_Circular_IT.docx", archive.namelist())
+        self.assertIn("0003_Office_Order.docx", archive.namelist())
+        await sync_to_async(self.log_writer.flush)()
+        self.assertEqual(await DocumentLog.objects.acount(), 2)
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    async def test_csv_prompt_generated_at_batch_priority(self, mock_get_model):
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(return_value=MagicMock(text="Generated"))
+        mock_get_model.return_value = mock_model
+        csv_body = "type,language,subject,prompt,from,to\ncircular,en,Drill,fire drill,Director General,1;2\n"
+
+        with patch("generator.services.bulk.generate_body_async", wraps=generate_body_async) as generate:
+            response = await self.async_client.post(
+                reverse("bulk_generate") + "?formats=docx", csv_body, content_type="text/csv"
+            )
+            archive, manifest = await self._zip(response)
+        self.assertEqual(manifest["documents"][0]["files"], ["0001_Circular.docx"])
+        self.assertEqual(generate.call_args.kwargs["priority"], PRIORITY_BATCH)
+        self.assertEqual(mock_model.generate_content_async.call_count, 1)
+
+    @patch("generator.services.ai_backends.get_gemini_model")
+    async def test_bilingual_spec_issues_both_languages(self, mock_get_model):
+        answer = '{"en": "Drill at noon.", "hi": "दोपहर में अभ्यास।"}'
+        mock_model = MagicMock()
+        mock_model.generate_content_async = AsyncMock(return_value=MagicMock(text=answer))
+        mock_get_model.return_value = mock_model
+        csv_body = "type,language,subject,prompt,from,to\ncircular,both,Drill,fire drill,Director General,1\n"
+
+        response = await self.async_client.post(
+            reverse("bulk_generate") + "?formats=docx", csv_body, content_type="text/csv"
+        )
+        archive, manifest = await self._zip(response)
+        self.assertEqual(manifest["documents"][0]["files"], ["0001_Circular_en.docx", "0001_Circular_hi.docx"])
+        self.assertEqual(mock_model.generate_content_async.call_count, 1)
+        await sync_to_async(self.log_writer.flush)()
+        languages = [log.language async for log in DocumentLog.objects.order_by("language")]
+        self.assertEqual(languages, ["en", "hi"])
+
+    async def test_rejects_bad_requests(self):
+        url = reverse("bulk_generate")
+        bad = await self.async_client.post(url, "[]", content_type="application/json")
+        self.assertEqual(bad.status_code, 400)
+        await self.async_client.alogout()
+        anonymous = await self.async_client.post(url, "[]", content_type="application/json")
+        self.assertEqual(anonymous.status_code, 302)
+
+
+# ------------------------------------------------------------------
+# Render job queue tests
+# ------------------------------------------------------------------
+class RenderJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _enqueue(self, client, fmt="docx"):
+        client.post(reverse("result_circular"), {
+            "language": "en", "date": "2026-02-16", "subject": "Queued", "body": "Body",
+            "from_position": "Director General", "to[]": ["1"],
+        })
+        response = client.post(reverse("render_job_create", args=["circular", fmt]))
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_worker_renders_job_for_polling_session(self):
+        client = Client()
+        job = self._enqueue(client)
+        self.assertEqual(client.get(job["status_url"]).json()["status"], "queued")
+
+        claimed = render_jobs.claim("worker-1")
+        self.assertEqual(str(claimed.pk), job["id"])
+        self.assertEqual(render_jobs.run(claimed, "worker-1"), RenderJob.DONE)
+
+        status = client.get(job["status_url"]).json()
+        self.assertEqual(status["status"], "done")
+        download = client.get(status["download_url"])
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"PK"))
+        self.assertIn("attachment;", download["Content-Disposition"])
+        self.assertEqual(Client().get(job["status_url"]).status_code, 404)
+
+    def test_lease_blocks_other_workers_until_expired(self):
+        self._enqueue(Client())
+        job = render_jobs.claim("worker-1")
+        self.assertIsNone(render_jobs.claim("worker-2"))
+
+        RenderJob.objects.filter(pk=job.pk).update(lease_expires_at=job.lease_expires_at - timedelta(hours=1))
+        taken = render_jobs.claim("worker-2")
+        self.assertEqual((taken.pk, taken.attempts), (job.pk, 2))
+        # The first worker finishing late must not overwrite the new owner's lease.
+        self.assertEqual(render_jobs.run(job, "worker-1"), RenderJob.RUNNING)
+        self.assertEqual(RenderJob.objects.get(pk=job.pk).lease_owner, "worker-2")
+        self.assertEqual(os.listdir(render_jobs.result_dir()), [])
+
+    def test_lease_renewed_while_rendering(self):
+        from io import BytesIO
+
+        def slow_render(doc_type, payload, fmt):
+            time.sleep(0.25)
+            return BytesIO(b"PK")
+
+        self._enqueue(Client())
+        job = render_jobs.claim("worker-1")
+        with self.settings(RENDER_JOB_LEASE=0.15), \
+                patch("generator.services.render_jobs.render_output", slow_render), \
+                patch("generator.services.render_jobs._renew_lease", return_value=1) as renew:
+            self.assertEqual(render_jobs.run(job, "worker-1"), RenderJob.DONE)
+        self.assertGreaterEqual(renew.call_count, 2)
+        self.assertEqual(os.listdir(render_jobs.result_dir()), [f"{job.pk.hex}-1.docx"])
+
+    @patch("generator.services.render_jobs.render", side_effect=RendererBusy("full"))
+    def test_failures_retry_then_fail(self, _render):
+        self._enqueue(Client(), fmt="pdf")
+        RenderJob.objects.update(max_attempts=2)
+
+        self.assertEqual(render_jobs.run(render_jobs.claim("w"), "w"), RenderJob.QUEUED)
+        self.assertIsNone(render_jobs.claim("w"))  # backing off
+        RenderJob.objects.update(available_at=timezone.now())
+        self.assertEqual(render_jobs.run(render_jobs.claim("w"), "w"), RenderJob.FAILED)
+        self.assertEqual(RenderJob.objects.get().error, "PDF generation failed")
+
+
+# ------------------------------------------------------------------
+# PDF renderer pool tests
+# ------------------------------------------------------------------
+class PdfRendererPoolTests(TestCase):
+    def _settings(self, workers, timeout):
+        self.addCleanup(pdf_renderer.shutdown)
+        return self.settings(PDF_RENDER_WORKERS=workers, PDF_RENDER_QUEUE_SIZE=0, PDF_RENDER_TIMEOUT=timeout,
+                             PDF_RENDER_START_METHOD="fork")
+
+    @patch("generator.services.pdf_renderer._init_worker", os.getpid)
+    def test_timed_out_job_does_not_pin_its_slot(self):
+        with self._settings(workers=1, timeout=1):
+            with self.assertRaises(RenderTimeout):
+                pdf_renderer._run(time.sleep, 60)
+            # The only slot would still be held by the sleeping worker.
+            self.assertEqual(pdf_renderer._run(abs, -3), 3)
+
+    @patch("generator.services.pdf_renderer._init_worker", os.getpid)
+    def test_timeout_leaves_other_running_jobs_alone(self):
+        import threading
+
+        results = []
+
+        def other_render():
+            time.sleep(1)
+            results.append(pdf_renderer._run(time.sleep, 1.5))
+
+        with self._settings(workers=2, timeout=2):
+            other = threading.Thread(target=other_render)
+            other.start()
+            with self.assertRaises(RenderTimeout):
+                pdf_renderer._run(time.sleep, 60)
+            other.join()
+        # Still running when the first job timed out, and not killed with it.
+        self.assertEqual(results, [None])
+
+
+# ------------------------------------------------------------------
+# Policy attachment merge tests
+# ------------------------------------------------------------------
+def _make_pdf(pages, label):
+    from io import BytesIO
+    from reportlab.pdfgen import canvas
+
+    buf = BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(pages):
+        c.drawString(100, 700, f"{label} page {i + 1}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+class PdfMergeTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        tmp.write(_make_pdf(5, "annex"))
+        tmp.close()
+        self.attachment = tmp.name
+        self.addCleanup(os.remove, tmp.name)
+
+    def test_merge_grafts_attachment_after_cover(self):
+        from PyPDF2 import PdfReader
+
+        with self.settings(PDF_MERGE_TRACE_MEMORY=True):
+            merged = merge_attachment(_make_pdf(1, "cover"), self.attachment)
+        with merged:
+            reader = PdfReader(merged)
+            self.assertEqual(len(reader.pages), 6)
+            self.assertIn("cover page 1", reader.pages[0].extract_text())
+            self.assertIn("annex page 5", reader.pages[5].extract_text())
+
+    def test_peak_memory_at_limits(self):
+        import tracemalloc
+        from io import BytesIO
+        from reportlab.pdfgen import canvas
+
+        from .services.pdf_merge import PEAK_PER_BYTE, PEAK_PER_PAGE
+
+        buf = BytesIO()
+        c = canvas.Canvas(buf, pageCompression=0)
+        for i in range(200):
+            for line in range(40):
+                c.drawString(50, 800 - line * 19, f"annex page {i + 1} line {line + 1} " * 3)
+            c.showPage()
+        c.save()
+        with open(self.attachment, "wb") as f:
+            f.write(buf.getvalue())
+        size = len(buf.getvalue())
+
+        with self.settings(POLICY_ATTACHMENT_MAX_PAGES=200, POLICY_ATTACHMENT_MAX_BYTES=size):
+            tracemalloc.start()
+            try:
+                merge_attachment(_make_pdf(1, "cover"), self.attachment).close()
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peak, PEAK_PER_PAGE * 200 + PEAK_PER_BYTE * size)
+
+    def test_merge_rejects_too_many_pages(self):
+        with self.settings(POLICY_ATTACHMENT_MAX_PAGES=3):
+            with self.assertRaises(AttachmentTooLarge):
+                merge_attachment(_make_pdf(1, "cover"), self.attachment)
+
+
+class RasterizerTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.attachment = os.path.join(self.tmp.name, "annex.pdf")
+        with open(self.attachment, "wb") as f:
+            f.write(_make_pdf(3, "annex"))
+
+    def test_cached_pages_skip_poppler(self):
+        cache = RenderCache(os.path.join(self.tmp.name, "rasters"), 1024 * 1024)
+        digest = attachment_digest(self.attachment)
+        for page in (1, 2, 3):
+            cache.set(_page_key(digest, page, 100, "jpeg", 85), f"img{page}".encode())
+
+        with self.settings(RASTER_WORKERS=0, POLICY_DOCX_JPEG_QUALITY=85), \
+                patch("generator.services.rasterizer._cache", cache), \
+                patch("generator.services.rasterizer._rasterize_page") as mock_page:
+            pages = list(rasterize_attachment(self.attachment, dpi=100, fmt="jpeg"))
+
+        mock_page.assert_not_called()
+        self.assertEqual([p[0] for p in pages], [1, 2, 3])
+        self.assertEqual(pages[2][1], b"img3")
+
+    def test_pages_rasterized_and_cached_in_order(self):
+        cache = RenderCache(os.path.join(self.tmp.name, "rasters"), 1024 * 1024)
+        with self.settings(RASTER_WORKERS=0), \
+                patch("generator.services.rasterizer._cache", cache), \
+                patch("generator.services.rasterizer._rasterize_page") as mock_page:
+            mock_page.side_effect = lambda path, page, *a: f"page{page}".encode()
+            first = [p[1] for p in rasterize_attachment(self.attachment)]
+            second = [p[1] for p in rasterize_attachment(self.attachment)]
+
+        self.assertEqual(first, [b"page1", b"page2", b"page3"])
+        self.assertEqual(second, first)
+        self.assertEqual(mock_page.call_count, 3)
+
+    def test_cache_trimmed_once_per_attachment(self):
+        cache = RenderCache(os.path.join(self.tmp.name, "rasters"), 10)
+        with self.settings(RASTER_WORKERS=0), \
+                patch("generator.services.rasterizer._cache", cache), \
+                patch("generator.services.rasterizer._rasterize_page", return_value=b"x" * 8), \
+                patch.object(cache, "evict", wraps=cache.evict) as evict:
+            self.assertEqual(len(list(rasterize_attachment(self.attachment))), 3)
+        self.assertEqual(evict.call_count, 1)
+        self.assertLessEqual(cache.size(), 10)
+
 
 # ------------------------------------------------------------------
 # Constants tests
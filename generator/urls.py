@@ -7,19 +7,39 @@ urlpatterns = [
 
     # OFFICE ORDER
     path("generate-body/", views.generate_body, name="generate_body"),
+    path("generate-body/stream/", views.generate_body_stream, name="generate_body_stream"),
     path("result/", views.result_office_order, name="result"),
     path("download/pdf/", views.download_pdf, name="download_pdf"),
     path("download/docx/", views.download_docx, name="download_docx"),
 
     # CIRCULAR
+    path("circular/recipients/", views.recipient_search, name="recipient_search"),
     path("circular/generate-body/", views.generate_circular_body, name="generate_circular_body"),
+    path("circular/generate-body/stream/", views.generate_circular_body_stream, name="generate_circular_body_stream"),
     path("circular/result/", views.result_circular, name="result_circular"),
     path("circular/pdf/", views.download_circular_pdf, name="download_circular_pdf"),
     path("circular/docx/", views.download_circular_docx, name="download_circular_docx"),
 
     # POLICY
     path("policy/generate-body/", views.generate_policy_body, name="generate_policy_body"),
+    path("policy/generate-body/stream/", views.generate_policy_body_stream, name="generate_policy_body_stream"),
     path("policy/result/", views.result_policy, name="result_policy"),
     path("policy/pdf/", views.download_policy_pdf, name="download_policy_pdf"),
     path("policy/docx/", views.download_policy_docx, name="download_policy_docx"),
+    path("policy/attachment/<slug:attachment_id>/", views.policy_attachment, name="policy_attachment"),
+
+    # QUEUED RENDERS
+    path("jobs/<uuid:job_id>/", views.render_job_status, name="render_job_status"),
+    path("jobs/<uuid:job_id>/download/", views.render_job_download, name="render_job_download"),
+    path("jobs/<slug:doc_type>/<slug:fmt>/", views.render_job_create, name="render_job_create"),
+
+    # BULK (staff only)
+    path("bulk/", views.bulk_generate, name="bulk_generate"),
+
+    # ISSUED DOCUMENTS (staff only)
+    path("logs/", views.document_logs, name="document_logs"),
+    path("logs/search/", views.document_search, name="document_search"),
+
+    # METRICS (staff only)
+    path("metrics/ai/", views.ai_metrics, name="ai_metrics"),
 ]
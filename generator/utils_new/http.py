@@ -0,0 +1,92 @@
+"""
+HTTP helpers: conditional and ranged file responses.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header against a resource of ``size``
+    bytes.  Returns ``(start, end)`` inclusive, ``None`` when there is no
+    usable range header, or ``False`` when the range is unsatisfiable.
+    Multi-range requests are answered with the full body.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _iter_slice(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, content_type, filename=None, max_age=3600):
+    """
+    Stream ``path`` with ETag / Last-Modified validation, ``Range`` support
+    and private caching headers.
+    """
+    st = os.stat(path)
+    etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    last_modified = http_date(st.st_mtime)
+
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        byte_range = parse_range(request.headers.get("Range"), st.st_size)
+        if request.headers.get("If-Range") not in (None, etag, last_modified):
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{st.st_size}"
+        elif byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_slice(path, start, length), status=206, content_type=content_type
+            )
+            response["Content-Length"] = str(length)
+            response["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+            response["Content-Length"] = str(st.st_size)
+
+        if filename and response.status_code in (200, 206):
+            response["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Cache-Control"] = f"private, max-age={max_age}"
+    return response
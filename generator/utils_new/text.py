@@ -0,0 +1,20 @@
+"""
+Word splitting shared by the full-text search and the recipient directory.
+"""
+import re
+import unicodedata
+
+# Devanagari combining marks: signs, nukta, vowel signs, virama, stress and vowel marks.
+# Unicode puts them in category M, so ``\w`` alone would split Hindi words at them.
+DEVANAGARI_MARKS = "".join(
+    chr(code)
+    for start, end in ((0x0900, 0x0903), (0x093A, 0x094F), (0x0951, 0x0957), (0x0962, 0x0963))
+    for code in range(start, end + 1)
+)
+
+WORD_RE = re.compile(rf"[\w{DEVANAGARI_MARKS}]+")
+
+
+def words(text):
+    """Case-folded words of ``text``, Hindi words kept whole."""
+    return WORD_RE.findall(unicodedata.normalize("NFC", text or "").casefold())
@@ -8,13 +8,16 @@ from .home import home  # noqa: F401
 
 from .office_order import (  # noqa: F401
     generate_body,
+    generate_body_stream,
     result_office_order,
     download_pdf,
     download_docx,
 )
 
 from .circular import (  # noqa: F401
+    recipient_search,
     generate_circular_body,
+    generate_circular_body_stream,
     result_circular,
     download_circular_pdf,
     download_circular_docx,
@@ -22,7 +25,20 @@ from .circular import (  # noqa: F401
 
 from .policy import (  # noqa: F401
     generate_policy_body,
+    generate_policy_body_stream,
     result_policy,
     download_policy_pdf,
     download_policy_docx,
+    policy_attachment,
 )
+
+from .bulk import bulk_generate  # noqa: F401
+
+from .jobs import (  # noqa: F401
+    render_job_create,
+    render_job_status,
+    render_job_download,
+)
+
+from .logs import document_logs, document_search  # noqa: F401
+from .metrics import ai_metrics  # noqa: F401
@@ -0,0 +1,141 @@
+"""
+Bulk generation view – many documents in one streamed ZIP (staff only).
+"""
+import json
+import logging
+import zipfile
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.text import get_valid_filename
+
+from ..services.ai_service import BILINGUAL, AIBusyError, AIGenerationTimeout, BilingualFormatError
+from ..services.bulk import DEFAULT_FILENAMES, BulkSpecError, parse_formats, parse_specs, run_bulk
+from ..services.document_log import log_document
+from ..services.payloads import LOG_TYPES, reference_id
+from ..services.pdf_renderer import RendererBusy, RenderTimeout
+
+logger = logging.getLogger('generator')
+
+
+class _ZipSink:
+    """Write-only file object; ``ZipFile`` falls back to streaming mode on it."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _error_message(exc):
+    if isinstance(exc, BulkSpecError):
+        return str(exc)
+    if isinstance(exc, AIBusyError):
+        return "AI service is busy"
+    if isinstance(exc, AIGenerationTimeout):
+        return "AI generation timed out"
+    if isinstance(exc, BilingualFormatError):
+        return "AI answer was not in the bilingual format"
+    if isinstance(exc, RendererBusy):
+        return "PDF renderer is busy"
+    if isinstance(exc, RenderTimeout):
+        return "Rendering timed out"
+    return "Generation failed"
+
+
+def _entry_name(index, spec, fmt, lang):
+    name = DEFAULT_FILENAMES.get(spec.get("type"), "Document")
+    if (spec.get("filename") or "").strip():
+        try:
+            name = get_valid_filename(spec["filename"])
+        except SuspiciousFileOperation:
+            pass
+    if spec.get("language") == BILINGUAL:
+        name = f"{name}_{lang}"
+    return f"{index + 1:04d}_{name}.{fmt}"
+
+
+async def _zip_stream(specs, formats):
+    sink = _ZipSink()
+    manifest = []
+    with zipfile.ZipFile(sink, "w") as archive:
+        async for index, spec, documents, error in run_bulk(specs, formats):
+            item = {"index": index, "type": spec.get("type"), "language": spec.get("language")}
+            if error is None:
+                item["status"] = "ok"
+                item["files"] = []
+                for lang, (payload, files) in documents.items():
+                    for fmt, content in files.items():
+                        name = _entry_name(index, spec, fmt, lang)
+                        # PDFs and DOCX are already compressed.
+                        archive.writestr(name, content, compress_type=zipfile.ZIP_STORED)
+                        item["files"].append(name)
+                    log_document(
+                        LOG_TYPES[spec["type"]], payload["language"],
+                        reference_id(spec["type"], payload), payload["body"] or "",
+                    )
+            else:
+                item["status"] = "error"
+                item["error"] = _error_message(error)
+            manifest.append(item)
+            yield sink.drain()
+
+        manifest.sort(key=lambda item: item["index"])
+        archive.writestr(
+            "manifest.json",
+            json.dumps({
+                "total": len(manifest),
+                "succeeded": sum(item["status"] == "ok" for item in manifest),
+                "failed": sum(item["status"] == "error" for item in manifest),
+                "documents": manifest,
+            }, ensure_ascii=False, indent=2),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+    yield sink.drain()
+
+
+@staff_member_required
+async def bulk_generate(request):
+    """
+    Render a list of document specs and stream them back as a ZIP.
+
+    The body is JSON (``{"documents": [...], "formats": ["pdf", "docx"]}``)
+    or CSV (``text/csv``, formats from ``?formats=pdf;docx``); a ``file``
+    upload of either kind is accepted too.  Entries are written as soon as
+    they finish, and ``manifest.json`` at the end reports each item's
+    status.  Malformed requests are rejected with 400 before streaming.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+
+    upload = request.FILES.get("file")
+    if upload is not None:
+        raw = upload.read()
+        content_type = "text/csv" if upload.name.lower().endswith(".csv") else "application/json"
+    else:
+        raw = request.body
+        content_type = request.content_type or ""
+
+    try:
+        specs, formats = parse_specs(raw, content_type)
+        if request.GET.get("formats"):
+            formats = parse_formats(request.GET["formats"])
+    except BulkSpecError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    logger.info("Bulk generation of %d documents (%s)", len(specs), ", ".join(formats))
+    response = StreamingHttpResponse(_zip_stream(specs, formats), content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="documents.zip"'
+    response["X-Accel-Buffering"] = "no"
+    return response
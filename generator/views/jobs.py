@@ -0,0 +1,74 @@
+"""
+Queued downloads – enqueue a render job, poll its status, fetch the result.
+"""
+import os
+
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+
+from ..models import RenderJob
+from ..services import render_jobs
+from ..services.drafts import DOC_TYPES, load_draft
+from ..services.rendering import CONTENT_TYPES
+from ..utils_new.http import serve_file
+
+DOWNLOAD_NAMES = {
+    "office_order": "Office_Order",
+    "circular": "Circular",
+    "policy": "Policy",
+}
+
+# Job ids remembered per session (only their owner may poll them).
+MAX_SESSION_JOBS = 20
+
+
+def _session_job(request, job_id):
+    if str(job_id) not in request.session.get("render_jobs", []):
+        raise Http404("Job not found")
+    try:
+        return RenderJob.objects.get(pk=job_id)
+    except RenderJob.DoesNotExist:
+        raise Http404("Job not found")
+
+
+def _status(job):
+    status = {"id": str(job.pk), "status": job.status, "attempts": job.attempts}
+    if job.status == RenderJob.DONE:
+        status["download_url"] = reverse("render_job_download", args=[job.pk])
+    elif job.status == RenderJob.FAILED:
+        status["error"] = job.error
+    return status
+
+
+def render_job_create(request, doc_type, fmt):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+    if doc_type not in DOC_TYPES or fmt not in CONTENT_TYPES:
+        raise Http404("Unknown document")
+
+    data = load_draft(request.session, doc_type)
+    if not data:
+        return JsonResponse({"error": "No document generated"}, status=400)
+
+    job = render_jobs.enqueue(doc_type, data, fmt)
+    request.session["render_jobs"] = (request.session.get("render_jobs", []) + [str(job.pk)])[-MAX_SESSION_JOBS:]
+    response = JsonResponse(dict(_status(job), status_url=reverse("render_job_status", args=[job.pk])), status=202)
+    response["Location"] = reverse("render_job_status", args=[job.pk])
+    return response
+
+
+def render_job_status(request, job_id):
+    return JsonResponse(_status(_session_job(request, job_id)))
+
+
+def render_job_download(request, job_id):
+    job = _session_job(request, job_id)
+    if job.status != RenderJob.DONE or not os.path.exists(job.result_path):
+        raise Http404("Result not available")
+    response = serve_file(
+        request, job.result_path, CONTENT_TYPES[job.format],
+        filename=f"{DOWNLOAD_NAMES[job.doc_type]}.{job.format}",
+    )
+    if response.has_header("Content-Disposition"):
+        response["Content-Disposition"] = response["Content-Disposition"].replace("inline", "attachment", 1)
+    return response
@@ -0,0 +1,39 @@
+"""
+Issued-document register for staff – filtered listing and full-text search (JSON).
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from ..services.log_query import LogQueryError, page_logs
+from ..services.search import SearchError, search
+
+
+@staff_member_required
+def document_logs(request):
+    """
+    Issued documents, newest first, as JSON.
+
+    Query parameters: ``type``, ``language``, ``reference``, ``since``,
+    ``until``, ``limit`` and ``cursor`` (from the previous page's
+    ``next_cursor``).
+    """
+    try:
+        page = page_logs(request.GET)
+    except LogQueryError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(page)
+
+
+@staff_member_required
+def document_search(request):
+    """
+    Full-text search over issued document bodies, best match first.
+
+    Query parameters: ``q`` (all words must match, ``word*`` for a prefix),
+    ``type``, ``language`` and ``limit``.
+    """
+    try:
+        results = search(request.GET)
+    except (SearchError, LogQueryError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"results": results})
@@ -0,0 +1,13 @@
+"""
+Operational metrics for staff.
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from ..services.ai_cache import get_ai_cache
+
+
+@staff_member_required
+def ai_metrics(request):
+    """AI cache and request-coalescing counters as JSON."""
+    return JsonResponse(get_ai_cache().stats())
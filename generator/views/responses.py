@@ -0,0 +1,116 @@
+"""
+Shared download helpers for the document-type views.
+"""
+import asyncio
+import json
+import logging
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+
+from ..services.ai_service import (
+    BILINGUAL,
+    AIBusyError,
+    AIGenerationTimeout,
+    generate_bilingual_async,
+    generate_body_async,
+    stream_body_async,
+)
+from ..services.pdf_renderer import RendererBusy, RenderTimeout
+from ..services.rendering import CONTENT_TYPES, render
+
+logger = logging.getLogger('generator')
+
+
+def render_document(doc_type, data, fmt):
+    """
+    Render previewed ``data`` of ``doc_type`` to ``fmt``.
+
+    Returns ``(content, None)`` on success or ``(None, error_response)``.
+    """
+    label = doc_type.replace("_", " ")
+    try:
+        return render(doc_type, data, (fmt,))[fmt], None
+    except RendererBusy:
+        return None, HttpResponse(
+            "PDF renderer is busy, please try again", status=503, headers={"Retry-After": "5"}
+        )
+    except RenderTimeout as exc:
+        logger.error("%s generation timed out (%s): %s", fmt.upper(), label, exc)
+        return None, HttpResponse(f"{fmt.upper()} generation timed out", status=504)
+    except Exception as exc:
+        logger.exception("%s generation failed (%s): %s", fmt.upper(), label, exc)
+        return None, HttpResponse(f"{fmt.upper()} generation failed", status=500)
+
+
+def document_response(content, fmt, filename):
+    """Attachment response for rendered ``content``."""
+    response = HttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+async def ai_body_response(doc_type, lang, topic, regenerate=False):
+    """
+    Generate the body text for ``doc_type`` and wrap it in a response.
+
+    For ``lang`` ``"both"`` the English and Hindi bodies come from one call
+    and are returned as JSON ``{"en": ..., "hi": ...}``.
+    """
+    label = doc_type.replace("_", " ")
+    try:
+        if lang == BILINGUAL:
+            return JsonResponse(await generate_bilingual_async(doc_type, topic, regenerate=regenerate))
+        body = await generate_body_async(doc_type, lang, topic, regenerate=regenerate)
+    except AIBusyError as exc:
+        logger.warning("Gemini busy (%s): %s", label, exc)
+        return JsonResponse(
+            {"error": "AI service is busy. Please try again shortly.", "retry_after": exc.retry_after},
+            status=503,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    except AIGenerationTimeout as exc:
+        logger.error("Gemini API timeout (%s): %s", label, exc)
+        return JsonResponse({"error": "AI generation timed out. Please try again."}, status=504)
+    except Exception as exc:
+        logger.exception("Gemini API error (%s): %s", label, exc)
+        return JsonResponse({"error": "AI generation failed. Please try again."}, status=500)
+    return HttpResponse(body)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def ai_stream_response(doc_type, lang, topic, regenerate=False):
+    """
+    Stream the body text for ``doc_type`` as Server-Sent Events.
+
+    Emits ``chunk`` events with JSON-encoded text fragments, then a single
+    ``done`` or ``error`` event.  When the client disconnects the ASGI
+    server cancels the iterator, which also closes the Gemini stream.
+    """
+    label = doc_type.replace("_", " ")
+
+    async def events():
+        try:
+            async for text in stream_body_async(doc_type, lang, topic, regenerate=regenerate):
+                yield _sse("chunk", text)
+        except asyncio.CancelledError:
+            logger.info("AI stream cancelled by client (%s)", label)
+            raise
+        except AIBusyError as exc:
+            logger.warning("Gemini busy (%s): %s", label, exc)
+            yield _sse("error", "AI service is busy. Please try again shortly.")
+        except AIGenerationTimeout as exc:
+            logger.error("Gemini API timeout (%s): %s", label, exc)
+            yield _sse("error", "AI generation timed out. Please try again.")
+        except Exception as exc:
+            logger.exception("Gemini API error (%s): %s", label, exc)
+            yield _sse("error", "AI generation failed. Please try again.")
+        else:
+            yield _sse("done", "")
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response